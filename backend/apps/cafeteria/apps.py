@@ -1,6 +1,26 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
 
 class CafeteriaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.cafeteria'
+
+    def ready(self):
+        # Registra las señales que alimentan el índice del chatbot
+        from . import signals  # noqa: F401
+
+        # BUHO_RAG_WARMUP=1: carga el RAG en segundo plano al arrancar el servidor
+        if os.getenv('BUHO_RAG_WARMUP', '0') == '1' and self._is_server_process():
+            from .views import start_rag_warmup
+            start_rag_warmup()
+
+    @staticmethod
+    def _is_server_process():
+        """Evita cargar el modelo en migrate/test y en el proceso vigilante del autoreload de runserver."""
+        command = sys.argv[1] if len(sys.argv) > 1 else ''
+        if command == 'runserver':
+            return os.environ.get('RUN_MAIN') == 'true'
+        return command not in {'migrate', 'makemigrations', 'test', 'shell', 'check', 'collectstatic'}
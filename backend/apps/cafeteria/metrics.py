@@ -0,0 +1,116 @@
+"""
+Métricas del chatbot en memoria del proceso, expuestas en formato de texto de Prometheus.
+
+Cada worker de Django lleva sus propios contadores: el endpoint /metrics/ reporta solo el proceso
+que atiende la petición (pensado para scrapearse por worker o con un solo proceso).
+"""
+
+import threading
+from bisect import bisect_left
+
+# Segundos: desde etapas de microsegundos (parseo) hasta generaciones largas en CPU
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        # labels -> [conteo por bucket (sin acumular), suma, total]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += n
+                    lines.append(f'{self.name}_bucket{_labels(key + (("le", bound),))} {cumulative}')
+                lines.append(f'{self.name}_sum{_labels(key)} {round(total, 6)}')
+                lines.append(f'{self.name}_count{_labels(key)} {count}')
+        return lines
+
+
+CHAT_REQUESTS = Counter('buho_chat_requests_total', 'Consultas al chatbot respondidas, por ruta (llm, fast_path, cache).')
+CHAT_ERRORS = Counter('buho_chat_errors_total', 'Consultas al chatbot que fallaron, por tipo de error.')
+CHAT_SECONDS = Histogram('buho_chat_request_seconds', 'Duración de BuhoRAG.query por consulta.')
+CHAT_STAGE_SECONDS = Histogram('buho_chat_stage_seconds', 'Duración de cada etapa de BuhoRAG.query.')
+PROMPT_TOKENS = Counter('buho_chat_prompt_tokens_total', 'Tokens de prompt enviados al LLM.')
+COMPLETION_TOKENS = Counter('buho_chat_completion_tokens_total', 'Tokens generados por el LLM.')
+PREFILL_SAVED_TOKENS = Counter('buho_chat_prefill_saved_tokens_total', 'Tokens de prefill ahorrados por la KV-cache del prompt de sistema.')
+INDEX_REBUILDS = Counter('buho_rag_index_rebuilds_total', 'Construcciones completas del índice disparadas por una consulta.')
+INDEX_UPDATES = Counter('buho_rag_index_updated_docs_total', 'Documentos re-codificados al aplicar cambios pendientes del admin.')
+
+METRICS = (CHAT_REQUESTS, CHAT_ERRORS, CHAT_SECONDS, CHAT_STAGE_SECONDS, PROMPT_TOKENS, COMPLETION_TOKENS,
+           PREFILL_SAVED_TOKENS, INDEX_REBUILDS, INDEX_UPDATES)
+
+
+def chat_path(result):
+    if result.get('fast_path'):
+        return 'fast_path'
+    return 'cache' if result.get('cached') else 'llm'
+
+
+def observe_chat_result(result):
+    """Suma a las métricas la instrumentación de un resultado de BuhoRAG.query."""
+    CHAT_REQUESTS.inc(path=chat_path(result))
+    timings = result.get('timings') or {}
+    if 'total' in timings:
+        CHAT_SECONDS.observe(timings['total'] / 1000)
+    for stage, ms in timings.items():
+        if stage != 'total':
+            CHAT_STAGE_SECONDS.observe(ms / 1000, stage=stage)
+    PROMPT_TOKENS.inc(result.get('prompt_tokens', 0))
+    COMPLETION_TOKENS.inc(result.get('completion_tokens', 0))
+    PREFILL_SAVED_TOKENS.inc(result.get('prefill_saved_tokens', 0))
+    INDEX_REBUILDS.inc(int(bool(result.get('index_rebuilt'))))
+    INDEX_UPDATES.inc(result.get('index_updates', 0))
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
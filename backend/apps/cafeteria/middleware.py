@@ -0,0 +1,93 @@
+"""
+Conteo de consultas SQL por petición (desarrollo y pruebas).
+
+QueryCountMiddleware registra cada consulta con `connection.execute_wrapper` (no necesita DEBUG=True)
+y agrega a la respuesta:
+  X-DB-Query-Count  -> consultas ejecutadas
+  X-DB-Time-Ms      -> tiempo total en la base de datos
+  Server-Timing     -> db;dur=...  (visible en la pestaña Network del navegador)
+
+Si una petición pasa de QUERY_COUNT_WARN_THRESHOLD consultas se registra un warning con las
+"formas" de consulta repetidas (mismo SQL con distintos parámetros): la huella típica de un N+1.
+Se activa con QUERY_INSPECTOR_ENABLED (settings); apagado, Django lo descarta al arrancar.
+
+En respuestas en streaming solo se cuentan las consultas hechas antes de empezar a enviar el cuerpo.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Listas de parámetros de IN (...) de largo variable: se colapsan para agrupar por forma
+IN_LIST_RE = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+NUMBER_RE = re.compile(r'\b\d+\b')
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+
+
+def query_shape(sql):
+    """SQL sin valores concretos: dos consultas con la misma forma solo difieren en sus parámetros."""
+    shape = STRING_RE.sub('?', sql)
+    shape = NUMBER_RE.sub('?', shape)
+    shape = IN_LIST_RE.sub('(...)', shape)
+    return ' '.join(shape.split())
+
+
+def repeated_shapes(queries, limit=5):
+    """[(forma, veces)] de las formas que se ejecutaron más de una vez, de la más repetida a la menos."""
+    counts = Counter(query_shape(sql) for sql, _ in queries)
+    return [(shape, n) for shape, n in counts.most_common() if n > 1][:limit]
+
+
+class QueryLog:
+    """execute_wrapper que guarda (sql, segundos) de cada consulta de la petición."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def total_seconds(self):
+        return sum(seconds for _, seconds in self.queries)
+
+
+class QueryCountMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSPECTOR_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        log = QueryLog()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(log))
+            response = self.get_response(request)
+
+        count = len(log.queries)
+        db_ms = log.total_seconds * 1000
+        response['X-DB-Query-Count'] = str(count)
+        response['X-DB-Time-Ms'] = f'{db_ms:.2f}'
+        response['Server-Timing'] = f'db;dur={db_ms:.2f};desc="{count} queries"'
+
+        threshold = settings.QUERY_COUNT_WARN_THRESHOLD
+        if count > threshold:
+            shapes = '\n'.join(f'  {n}x {shape}' for shape, n in repeated_shapes(log.queries))
+            logger.warning(
+                f"🐢 {request.method} {request.path}: {count} consultas SQL ({db_ms:.1f} ms, umbral {threshold})"
+                + (f"\nConsultas repetidas:\n{shapes}" if shapes else "")
+            )
+        return response
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.8 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cafeteria', '0006_menus_categoria'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resenas',
+            index=models.Index(fields=['fecha_registro'], name='resenas_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resenas',
+            index=models.Index(fields=['id_tiendita', 'fecha_registro'], name='resenas_tiendita_fecha_idx'),
+        ),
+    ]
@@ -1,5 +1,11 @@
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Avg, Count, Exists, F, OuterRef, Q
+from django.db.models.functions import Round
 from django.core.validators import MaxValueValidator, MinValueValidator
+from django.utils import timezone
 
 class Facultades(models.Model):
     id_facultad = models.AutoField(primary_key=True)
@@ -11,6 +17,38 @@ class Facultades(models.Model):
         managed = True
         db_table = 'Facultades'
 
+class TienditasQuerySet(models.QuerySet):
+    def open_at(self, when=None):
+        """
+        Cafeterías abiertas a una hora (datetime.time); por defecto, ahora en hora del campus.
+        Soporta horarios que cruzan la medianoche; apertura == cierre es abierto todo el día.
+        Las cafeterías sin horario no se incluyen.
+        """
+        if when is None:
+            when = timezone.localtime(timezone=ZoneInfo(settings.CAMPUS_TIME_ZONE)).time()
+        same_day = Q(hora_apertura__lt=F('hora_cierre'), hora_apertura__lte=when, hora_cierre__gt=when)
+        overnight = Q(hora_apertura__gt=F('hora_cierre')) & (Q(hora_apertura__lte=when) | Q(hora_cierre__gt=when))
+        all_day = Q(hora_apertura=F('hora_cierre'))
+        return self.filter(same_day | overnight | all_day)
+
+    def with_ratings(self):
+        """
+        Anota rating_avg (2 decimales, None sin reseñas), rating_count y rating_1..rating_5
+        (reseñas por número de estrellas). Es un solo JOIN + GROUP BY sobre resenas.
+        """
+        stars = {f'rating_{n}': Count('resenas', filter=Q(resenas__calificacion=n)) for n in range(1, 6)}
+        return self.annotate(
+            rating_avg=Round(Avg('resenas__calificacion'), 2),
+            rating_count=Count('resenas'),
+            **stars
+        )
+
+    def reviewed_by(self, id_usuario):
+        """Anota reviewed: si el usuario ya dejó al menos una reseña en cada cafetería."""
+        mine = Resenas.objects.filter(id_tiendita=OuterRef('pk'), id_usuario=id_usuario)
+        return self.annotate(reviewed=Exists(mine))
+
+
 class Tienditas(models.Model):
     id_tiendita = models.AutoField(primary_key=True)
     nombre = models.CharField(max_length=255)
@@ -29,6 +67,8 @@ class Tienditas(models.Model):
 
     # (Quitamos categoria y rango_precio de aquí)
 
+    objects = TienditasQuerySet.as_manager()
+
     class Meta:
         managed = True
         db_table = 'Tienditas'
@@ -72,4 +112,9 @@ class Resenas(models.Model):
     class Meta:
         managed = True
         db_table = 'resenas'
-        ordering = ['-fecha_registro']
\ No newline at end of file
+        ordering = ['-fecha_registro']
+        # Paginación por cursor: listado general y reseñas de una cafetería, por fecha
+        indexes = [
+            models.Index(fields=['fecha_registro'], name='resenas_fecha_idx'),
+            models.Index(fields=['id_tiendita', 'fecha_registro'], name='resenas_tiendita_fecha_idx'),
+        ]
\ No newline at end of file
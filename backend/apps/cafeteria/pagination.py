@@ -0,0 +1,37 @@
+"""
+Paginación por cursor (keyset) para los listados de la API.
+
+Cada página es `WHERE orden > último_visto ORDER BY orden LIMIT n` sobre un índice, en vez de
+OFFSET: las páginas profundas cuestan lo mismo que la primera aunque Menus y Resenas crezcan.
+La respuesta trae {"next", "previous", "results"}; `next` es null en la última página.
+
+Con ?ordering= sobre un campo que se repite (precio, calificación) se agrega la llave primaria como
+desempate: el cursor de DRF guarda la posición del primer campo más un desplazamiento dentro de los
+empates, y ese desplazamiento solo es estable si los empates salen siempre en el mismo orden.
+
+Tamaño de página: ?page_size=N, con default API_PAGE_SIZE y tope API_MAX_PAGE_SIZE (settings).
+Un viewset que deba devolver todo su listado lo declara con `pagination_class = None`.
+"""
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class PrimaryKeyCursorPagination(CursorPagination):
+    """Orden por llave primaria: estable e indexado en todas las tablas."""
+    ordering = 'pk'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        pk_names = {'pk', queryset.model._meta.pk.name}
+        if not pk_names & {field.lstrip('-') for field in ordering}:
+            # Desempate en la misma dirección que el orden pedido
+            ordering += ('-pk' if ordering[0].startswith('-') else 'pk',)
+        return ordering
+
+
+class ResenasCursorPagination(PrimaryKeyCursorPagination):
+    """Reseñas de la más reciente a la más antigua (índices sobre fecha_res en el modelo)."""
+    ordering = ('-fecha_registro', '-pk')
@@ -0,0 +1,170 @@
+# backend/apps/cafeteria/rag_sync.py
+"""
+Conversión de modelos al formato de rag_data.json
+La usan export_for_rag.py (exportación completa) y las señales (cambios incrementales).
+"""
+
+import json
+import os
+import unicodedata
+
+
+# ----------------------------------------
+# Limpieza de textos (mismo resultado que rag_data_fixed.json; la usa también fix_encoding.py)
+# ----------------------------------------
+
+def remove_accents(text):
+    """
+    Convierte caracteres acentuados a su versión sin acento
+    á → a, é → e, í → i, ó → o, ú → u, ñ → n
+    """
+    if not isinstance(text, str):
+        return text
+
+    # Normalizar el texto (descomponer caracteres con acento)
+    nfd = unicodedata.normalize('NFD', text)
+
+    # Filtrar solo los caracteres base (sin marcas diacríticas)
+    without_accents = ''.join(
+        char for char in nfd
+        if unicodedata.category(char) != 'Mn'  # Mn = Marcas no espaciadoras (acentos)
+    )
+
+    return without_accents
+
+
+def fix_broken_encoding(text):
+    """
+    Arregla caracteres mal codificados como "??????"
+    """
+    if not isinstance(text, str):
+        return text
+
+    # Mapeo de caracteres rotos comunes
+    replacements = {
+        # Minúsculas
+        'Ã¡': 'a',  # á
+        'Ã©': 'e',  # é
+        'Ã­': 'i',  # í
+        'Ã³': 'o',  # ó
+        'Ãº': 'u',  # ú
+        'Ã±': 'n',  # ñ
+        'Ã¼': 'u',  # ü
+
+        # Mayúsculas
+        'Ã': 'A',   # Á
+        'Ã': 'E',   # É
+        'Ã': 'I',   # Í
+        'Ã': 'O',   # Ó
+        'Ã': 'U',   # Ú
+        'Ã': 'N',   # Ñ
+
+        # Patrones con signos de interrogación
+        '?????': '',  # Eliminar completamente
+        '??????': '', # Eliminar completamente
+    }
+
+    result = text
+    for wrong, correct in replacements.items():
+        result = result.replace(wrong, correct)
+
+    # Eliminar cualquier carácter de interrogación residual seguido de caracteres especiales
+    result = result.replace('?', '')
+
+    return result
+
+
+def clean_string(text):
+    """
+    Limpia un texto: corrige encoding roto y quita acentos
+    """
+    if not isinstance(text, str):
+        return text
+
+    # Paso 1: Arreglar caracteres rotos
+    text = fix_broken_encoding(text)
+
+    # Paso 2: Quitar acentos de lo que quedó
+    text = remove_accents(text)
+
+    return text
+
+
+def clean_dict(obj):
+    """
+    Limpia recursivamente un diccionario/lista/string
+    """
+    if isinstance(obj, dict):
+        return {k: clean_dict(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [clean_dict(item) for item in obj]
+    elif isinstance(obj, str):
+        return clean_string(obj)
+    else:
+        return obj
+
+
+
+
+def menu_to_rag_dict(menu):
+    """Menus -> dict con el mismo formato que el JSON exportado"""
+    return {
+        'id_menu': menu.id_menu,
+        'nombre': menu.nombre,
+        'descripcion': menu.descripcion or '',
+        'precio': str(menu.precio if menu.precio is not None else '0.00'),
+        'id_tiendita': menu.id_tiendita_id,
+        'categoria': menu.categoria or ''
+    }
+
+
+def tiendita_to_rag_dict(t):
+    """Tienditas -> dict (incluye el nombre de la facultad, que va dentro del documento)"""
+    facultad = t.id_facultad
+    return {
+        'id_tiendita': t.id_tiendita,
+        'nombre': t.nombre,
+        'direccion': t.direccion or '',
+        'foro_url': t.foro_url or '',
+        'id_facultad': facultad.id_facultad if facultad else None,
+        'facultad_nombre': facultad.nombre if facultad else '',
+        'latitud': str(t.latitud) if t.latitud else None,
+        'longitud': str(t.longitud) if t.longitud else None,
+        'hora_apertura': str(t.hora_apertura) if t.hora_apertura else None,
+        'hora_cierre': str(t.hora_cierre) if t.hora_cierre else None
+    }
+
+
+def facultad_to_rag_dict(f):
+    """Facultades -> dict"""
+    return {
+        'id_facultad': f.id_facultad,
+        'nombre': f.nombre,
+        'descripcion': f.descripcion,
+        'localizacion': f.localizacion
+    }
+
+
+def export_rag_data():
+    """Menús, cafeterías y facultades de la base de datos con el formato de rag_data.json (sin limpiar)"""
+    # Import diferido: fix_encoding.py usa la limpieza de este módulo sin configurar Django
+    from .models import Menus, Tienditas, Facultades
+
+    return {
+        'menus': [menu_to_rag_dict(m) for m in Menus.objects.all()],
+        'tienditas': [tiendita_to_rag_dict(t) for t in Tienditas.objects.select_related('id_facultad')],
+        'facultades': [facultad_to_rag_dict(f) for f in Facultades.objects.all()],
+    }
+
+
+def write_rag_snapshot(path):
+    """
+    Escribe la base de datos ya limpia (formato de rag_data_fixed.json) en `path`, con reemplazo atómico.
+    Con esto el motor arranca con lo que hay hoy en la base, sin exportar ni limpiar a mano.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(clean_dict(export_rag_data()), f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
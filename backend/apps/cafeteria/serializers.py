@@ -5,10 +5,22 @@ from django.utils import timezone
 from .models import Tienditas, Facultades, Menus, Usuarios, Resenas
 
 class TienditasSerializer(serializers.ModelSerializer):
+    # Vienen de TienditasQuerySet.with_ratings() / reviewed_by(); si el queryset no los anota, no se incluyen
+    rating_avg = serializers.FloatField(read_only=True)
+    rating_count = serializers.IntegerField(read_only=True)
+    rating_histogram = serializers.SerializerMethodField()
+    reviewed = serializers.BooleanField(read_only=True)
+
     class Meta:
         model = Tienditas
         fields = '__all__'
 
+    def get_rating_histogram(self, obj):
+        """{"1": n, ..., "5": n}: reseñas por número de estrellas."""
+        if not hasattr(obj, 'rating_1'):
+            return None
+        return {str(n): getattr(obj, f'rating_{n}') for n in range(1, 6)}
+
 class FacultadesSerializer(serializers.ModelSerializer):
     class Meta:
         model = Facultades
@@ -19,6 +31,24 @@ class MenusSerializer(serializers.ModelSerializer):
         model = Menus
         fields = '__all__'
 
+class TienditaDetalleSerializer(TienditasSerializer):
+    """
+    Cafetería completa para /api/Tienditas/{id}/full/. Espera el queryset de la vista:
+    select_related('id_facultad') y los menús precargados en `menu_items`.
+    """
+    facultad = FacultadesSerializer(source='id_facultad', read_only=True)
+    menus = serializers.SerializerMethodField()
+
+    def get_menus(self, obj):
+        """[{"categoria": ..., "platillos": [...]}] en el orden en que vienen los menús (por categoría)."""
+        grupos = {}
+        for menu in obj.menu_items:
+            grupos.setdefault(menu.categoria, []).append(menu)
+        return [
+            {'categoria': categoria, 'platillos': MenusSerializer(platillos, many=True).data}
+            for categoria, platillos in grupos.items()
+        ]
+
 # --- ESTA ES LA CLASE QUE DEBES CORREGIR ---
 class UsuariosSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,58 @@
+# backend/apps/cafeteria/signals.py
+"""
+Señales que mantienen al día el índice del chatbot.
+Cada cambio en Menus, Tienditas o Facultades se encola en el motor RAG vivo,
+que re-embebe solo el documento de la cafetería afectada.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Menus, Tienditas, Facultades
+from .rag_sync import clean_dict, menu_to_rag_dict, tiendita_to_rag_dict, facultad_to_rag_dict
+
+
+def _notify(model, action, record):
+    # Import diferido: views importa serializers y vistas que a su vez usan estos modelos
+    from .views import enqueue_rag_change
+    # Mismo formato que rag_data_fixed.json (sin acentos ni caracteres rotos)
+    record = clean_dict(record)
+    transaction.on_commit(lambda: enqueue_rag_change(model, action, record), robust=True)
+
+
+@receiver(post_save, sender=Menus)
+def menu_saved(sender, instance, **kwargs):
+    _notify('menus', 'save', menu_to_rag_dict(instance))
+
+
+@receiver(post_delete, sender=Menus)
+def menu_deleted(sender, instance, **kwargs):
+    _notify('menus', 'delete', {'id_menu': instance.id_menu, 'id_tiendita': instance.id_tiendita_id})
+
+
+def _invalidate_geo():
+    from .views import invalidate_geo_index
+    transaction.on_commit(invalidate_geo_index)
+
+
+@receiver(post_save, sender=Tienditas)
+def tiendita_saved(sender, instance, **kwargs):
+    _invalidate_geo()
+    _notify('tienditas', 'save', tiendita_to_rag_dict(instance))
+
+
+@receiver(post_delete, sender=Tienditas)
+def tiendita_deleted(sender, instance, **kwargs):
+    _invalidate_geo()
+    _notify('tienditas', 'delete', {'id_tiendita': instance.id_tiendita})
+
+
+@receiver(post_save, sender=Facultades)
+def facultad_saved(sender, instance, **kwargs):
+    _notify('facultades', 'save', facultad_to_rag_dict(instance))
+
+
+@receiver(post_delete, sender=Facultades)
+def facultad_deleted(sender, instance, **kwargs):
+    _notify('facultades', 'delete', {'id_facultad': instance.id_facultad})
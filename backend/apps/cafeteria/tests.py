@@ -1,3 +1,306 @@
-from django.test import TestCase
+"""
+Presupuesto de consultas SQL de la API.
 
-# Create your tests here.
+Cada endpoint del router (config/urls.py) tiene un número fijo de consultas que no depende del
+tamaño de las tablas: se verifica con 10, 1,000 y 10,000 filas. Si un cambio agrega un N+1
+(p. ej. un campo anidado sin select_related) la cuenta crece con las filas y la prueba falla.
+"""
+
+import logging
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from config.urls import router
+
+from .middleware import query_shape, repeated_shapes
+from .models import Facultades, Menus, Resenas, Tienditas, Usuarios
+from .views import invalidate_geo_index
+
+# Las cafeterías con menús y reseñas: la primera se usa para los detalles
+CAFETERIAS_CON_DATOS = 10
+
+# Consultas por endpoint (nombre de la ruta del router, parámetros del GET, consultas)
+QUERY_BUDGETS = {
+    'api-root': ({}, 0),
+    'tienditas-list': ({}, 1),
+    'tienditas-detail': ({}, 1),
+    'tienditas-nearby': ({'lat': '29.0822', 'lon': '-110.9615', 'k': '5'}, 2),  # GeoIndex + in_bulk
+    'tienditas-full': ({'reviews': '10'}, 3),  # cafetería, menús, reseñas
+    'menus-list': ({}, 1),
+    'menus-detail': ({}, 1),
+    'facultades-list': ({}, 1),
+    'facultades-detail': ({}, 1),
+    'usuarios-list': ({}, 1),
+    'usuarios-detail': ({}, 1),
+    'resenas-list': ({}, 1),
+    'resenas-detail': ({}, 1),
+}
+
+
+def seed(rows):
+    """`rows` filas en cada tabla; menús y reseñas repartidos entre las primeras cafeterías."""
+    facultades = Facultades.objects.bulk_create(
+        Facultades(nombre=f'Facultad {i}') for i in range(rows)
+    )
+    tiendas = Tienditas.objects.bulk_create(
+        Tienditas(
+            nombre=f'Cafetería {i}',
+            id_facultad=facultades[i],
+            latitud=Decimal('29.08') + Decimal(i % 100) / 10000,
+            longitud=Decimal('-110.96') - Decimal(i % 100) / 10000,
+            hora_apertura=time(7),
+            hora_cierre=time(20),
+        )
+        for i in range(rows)
+    )
+    con_datos = tiendas[:CAFETERIAS_CON_DATOS]
+    Menus.objects.bulk_create(
+        Menus(
+            id_tiendita=con_datos[i % len(con_datos)],
+            nombre=f'Platillo {i}',
+            precio=Decimal(20 + i % 60),
+            categoria=('Desayunos', 'Comidas', 'Bebidas', None)[i % 4],
+        )
+        for i in range(rows)
+    )
+    usuarios = Usuarios.objects.bulk_create(
+        Usuarios(nombre_usuario=f'usuario{i}', contrasena='x', email=f'usuario{i}@example.com')
+        for i in range(rows)
+    )
+    ahora = timezone.now()
+    Resenas.objects.bulk_create(
+        Resenas(
+            id_tiendita=con_datos[i % len(con_datos)],
+            id_usuario=usuarios[i],
+            calificacion=1 + i % 5,
+            comentario='Muy rico',
+            fecha_registro=ahora - timedelta(minutes=i),
+        )
+        for i in range(rows)
+    )
+
+
+class QueryBudgetMixin:
+    ROWS = None
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(cls.ROWS)
+        cls.detail_pks = {
+            'tienditas': Tienditas.objects.order_by('pk').values_list('pk', flat=True).first(),
+            'menus': Menus.objects.order_by('pk').values_list('pk', flat=True).first(),
+            'facultades': Facultades.objects.order_by('pk').values_list('pk', flat=True).first(),
+            'usuarios': Usuarios.objects.order_by('pk').values_list('pk', flat=True).first(),
+            'resenas': Resenas.objects.order_by('pk').values_list('pk', flat=True).first(),
+        }
+
+    def url_for(self, name):
+        basename, _, kind = name.rpartition('-')
+        if kind in ('detail', 'full'):
+            return reverse(name, args=[self.detail_pks[basename]])
+        return reverse(name)
+
+    def test_every_endpoint_within_budget(self):
+        for name, (params, budget) in QUERY_BUDGETS.items():
+            with self.subTest(endpoint=name, rows=self.ROWS):
+                # El GeoIndex de /nearby/ se cachea entre peticiones: siempre se mide en frío
+                invalidate_geo_index()
+                with self.assertNumQueries(budget):
+                    response = self.client.get(self.url_for(name), params)
+                self.assertEqual(response.status_code, 200)
+
+    def test_filtered_lists_within_budget(self):
+        tienda = self.detail_pks['tienditas']
+        # Los filtros ?id_tiendita= de django-filter validan que la cafetería exista: una consulta más
+        for url, params, budget in (
+            ('tienditas-list', {'ordering': '-rating_avg', 'min_rating': '3', 'open_at': '12:00'}, 1),
+            ('tienditas-list', {'reviewed_by': self.detail_pks['usuarios']}, 1),
+            ('menus-list', {'id_tiendita': tienda, 'page_size': '500'}, 2),
+            ('resenas-list', {'id_tiendita': tienda, 'page_size': '500'}, 2),
+        ):
+            with self.subTest(endpoint=url, params=params, rows=self.ROWS):
+                with self.assertNumQueries(budget):
+                    response = self.client.get(reverse(url), params)
+                self.assertEqual(response.status_code, 200)
+
+
+class QueryBudget10RowsTests(QueryBudgetMixin, TestCase):
+    ROWS = 10
+
+
+class QueryBudget1kRowsTests(QueryBudgetMixin, TestCase):
+    ROWS = 1_000
+
+
+class QueryBudget10kRowsTests(QueryBudgetMixin, TestCase):
+    ROWS = 10_000
+
+
+class QueryBudgetCoverageTests(TestCase):
+    def test_every_router_endpoint_has_a_budget(self):
+        names = {pattern.name for pattern in router.urls}
+        self.assertEqual(names - set(QUERY_BUDGETS), set(), "Endpoints del router sin presupuesto de consultas")
+
+
+class RatingAggregateTests(TestCase):
+    """Valores de rating_avg / rating_count / rating_histogram, ?min_rating=, orden y ?reviewed_by=."""
+
+    @classmethod
+    def setUpTestData(cls):
+        ana, beto = Usuarios.objects.bulk_create([
+            Usuarios(nombre_usuario='ana', contrasena='x', email='ana@example.com'),
+            Usuarios(nombre_usuario='beto', contrasena='x', email='beto@example.com'),
+        ])
+        cls.ana = ana
+        alta, baja, _ = Tienditas.objects.bulk_create([
+            Tienditas(nombre='Alta'),
+            Tienditas(nombre='Baja'),
+            Tienditas(nombre='Sin reseñas'),
+        ])
+        Resenas.objects.bulk_create([
+            Resenas(id_tiendita=alta, id_usuario=ana, calificacion=5),
+            Resenas(id_tiendita=alta, id_usuario=beto, calificacion=4),
+            Resenas(id_tiendita=alta, id_usuario=beto, calificacion=4),
+            Resenas(id_tiendita=baja, id_usuario=beto, calificacion=2),
+            Resenas(id_tiendita=baja, id_usuario=beto, calificacion=1),
+        ])
+
+    def get_list(self, params=None):
+        response = self.client.get(reverse('tienditas-list'), params or {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_aggregates_per_cafeteria(self):
+        tiendas = {t['nombre']: t for t in self.get_list()}
+        self.assertEqual(tiendas['Alta']['rating_avg'], 4.33)
+        self.assertEqual(tiendas['Alta']['rating_count'], 3)
+        self.assertEqual(tiendas['Alta']['rating_histogram'], {'1': 0, '2': 0, '3': 0, '4': 2, '5': 1})
+        self.assertEqual(tiendas['Baja']['rating_avg'], 1.5)
+        self.assertEqual(tiendas['Baja']['rating_count'], 2)
+        self.assertEqual(tiendas['Baja']['rating_histogram'], {'1': 1, '2': 1, '3': 0, '4': 0, '5': 0})
+
+    def test_cafeteria_without_reviews(self):
+        tienda = Tienditas.objects.get(nombre='Sin reseñas')
+        response = self.client.get(reverse('tienditas-detail', args=[tienda.pk]))
+        self.assertIsNone(response.json()['rating_avg'])
+        self.assertEqual(response.json()['rating_count'], 0)
+        self.assertEqual(response.json()['rating_histogram'], {'1': 0, '2': 0, '3': 0, '4': 0, '5': 0})
+
+    def test_min_rating(self):
+        self.assertEqual([t['nombre'] for t in self.get_list({'min_rating': '4'})], ['Alta'])
+        # Sin reseñas no hay promedio: no pasa ningún mínimo
+        self.assertEqual(sorted(t['nombre'] for t in self.get_list({'min_rating': '1'})), ['Alta', 'Baja'])
+        for value in ('6', 'abc'):
+            with self.subTest(min_rating=value):
+                response = self.client.get(reverse('tienditas-list'), {'min_rating': value})
+                self.assertEqual(response.status_code, 400)
+
+    def test_ordering_by_rating(self):
+        # En SQLite los nulos van al final en orden descendente
+        self.assertEqual(
+            [t['nombre'] for t in self.get_list({'ordering': '-rating_avg'})],
+            ['Alta', 'Baja', 'Sin reseñas'],
+        )
+        self.assertEqual(
+            [t['nombre'] for t in self.get_list({'ordering': 'rating_count'})],
+            ['Sin reseñas', 'Baja', 'Alta'],
+        )
+
+    def test_reviewed_by(self):
+        tiendas = self.get_list({'reviewed_by': self.ana.pk})
+        self.assertEqual({t['nombre']: t['reviewed'] for t in tiendas}, {'Alta': True, 'Baja': False, 'Sin reseñas': False})
+        self.assertNotIn('reviewed', self.get_list()[0])
+        response = self.client.get(reverse('tienditas-list'), {'reviewed_by': 'ana'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CursorOrderingTests(TestCase):
+    """?ordering= sobre campos con empates (precio, calificación): cada fila sale una sola vez."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # 60 precios y 5 calificaciones distintas para 200 filas
+        seed(200)
+
+    def walk(self, url, params):
+        rows = []
+        response = self.client.get(reverse(url), {**params, 'page_size': '7'})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            rows.extend(response.json()['results'])
+            if not response.json()['next']:
+                return rows
+            response = self.client.get(response.json()['next'])
+
+    def test_pages_cover_every_row_once(self):
+        for url, pk, field, ordering in (
+            ('menus-list', 'id_menu', 'precio', 'precio'),
+            ('menus-list', 'id_menu', 'precio', '-precio'),
+            ('resenas-list', 'id_resena', 'calificacion', 'calificacion'),
+            ('resenas-list', 'id_resena', 'calificacion', '-calificacion'),
+        ):
+            with self.subTest(endpoint=url, ordering=ordering):
+                rows = self.walk(url, {'ordering': ordering})
+                pks = [row[pk] for row in rows]
+                self.assertEqual(len(pks), 200)
+                self.assertEqual(len(set(pks)), 200)
+                # Empates desempatados por llave primaria, en la dirección pedida
+                keys = [(Decimal(str(row[field])), row[pk]) for row in rows]
+                self.assertEqual(keys, sorted(keys, reverse=ordering.startswith('-')))
+
+
+@override_settings(QUERY_INSPECTOR_ENABLED=True, QUERY_COUNT_WARN_THRESHOLD=20)
+class QueryCountMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(10)
+
+    def test_headers_report_query_count_and_db_time(self):
+        response = self.client.get(reverse('resenas-list'))
+        self.assertEqual(response['X-DB-Query-Count'], '1')
+        self.assertGreaterEqual(float(response['X-DB-Time-Ms']), 0)
+        self.assertTrue(response['Server-Timing'].startswith('db;dur='))
+
+    @override_settings(QUERY_COUNT_WARN_THRESHOLD=0)
+    def test_logs_requests_over_threshold(self):
+        with self.assertLogs('apps.cafeteria.middleware', level=logging.WARNING) as logs:
+            self.client.get(reverse('tienditas-full', args=[Tienditas.objects.first().pk]))
+        self.assertIn('3 consultas SQL', logs.output[0])
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=False)
+    def test_disabled_adds_no_headers(self):
+        response = self.client.get(reverse('resenas-list'))
+        self.assertNotIn('X-DB-Query-Count', response)
+
+    def test_repeated_shapes_group_queries_by_parameters(self):
+        queries = [
+            ('SELECT * FROM "Usuarios" WHERE "id_usuarios" = %s', 0.001),
+            ('SELECT * FROM "Usuarios" WHERE "id_usuarios" = %s', 0.001),
+            ('SELECT * FROM "Menus" WHERE "id_tiendita" IN (%s, %s)', 0.001),
+            ('SELECT * FROM "Menus" WHERE "id_tiendita" IN (%s, %s, %s)', 0.001),
+            ('SELECT * FROM "Tienditas" LIMIT 21', 0.001),
+        ]
+        self.assertEqual(repeated_shapes(queries), [
+            ('SELECT * FROM "Usuarios" WHERE "id_usuarios" = %s', 2),
+            ('SELECT * FROM "Menus" WHERE "id_tiendita" IN (...)', 2),
+        ])
+        self.assertEqual(query_shape("SELECT 1 WHERE nombre = 'Café' AND id = 7"), 'SELECT ? WHERE nombre = ? AND id = ?')
+
+
+class MetricsAccessTests(TestCase):
+    @override_settings(METRICS_TOKEN='')
+    def test_disabled_without_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secreto')
+    def test_requires_bearer_token(self):
+        # Detrás de un proxy todas las peticiones llegan desde 127.0.0.1: la IP no basta
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 404)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer otro').status_code, 404)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('buho_chat_errors_total', response.content.decode())
@@ -6,25 +6,43 @@ Incluye: Autenticación, CRUD de recursos, Chatbot RAG
 
 import sys
 import os
+import hmac
+import importlib.util
+import json
 import logging
+import math
+import threading
+import time
+from contextlib import closing
+from datetime import datetime
 
 # Django & DRF imports
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Prefetch
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.hashers import check_password, make_password
 from django.utils import timezone
 from rest_framework import viewsets, filters, generics, status
 from rest_framework.views import APIView
 from rest_framework.serializers import ModelSerializer
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django_filters.rest_framework import DjangoFilterBackend
 
+from .metrics import CHAT_ERRORS, observe_chat_result, render_metrics
+from .pagination import ResenasCursorPagination
+from .rag_sync import write_rag_snapshot
 # Modelos y Serializadores
 from .models import Tienditas, Facultades, Menus, Usuarios, Resenas
 from .serializers import (
     TienditasSerializer,
+    TienditaDetalleSerializer,
     FacultadesSerializer,
     MenusSerializer,
     UsuariosSerializer,
@@ -121,16 +139,181 @@ class UsuarioActualView(APIView):
         return Response({'status': 'ok'})
 
 
+# ========================================
+# CERCANÍA (mismo GeoIndex que usa el RAG)
+# ========================================
+
+# Los cambios hechos en este worker invalidan el índice al momento; los de otros workers, al expirar
+GEO_CACHE_SECONDS = float(os.getenv('BUHO_GEO_CACHE_SECONDS', 60))
+NEARBY_MAX_RESULTS = 50
+
+# /api/Tienditas/{id}/full/: reseñas recientes incluidas (?reviews=N hasta el máximo)
+FULL_RECENT_REVIEWS = 10
+FULL_MAX_REVIEWS = 50
+
+_geo_cache = {'index': None, 'built_at': 0.0}
+_geo_lock = threading.Lock()
+
+
+def get_geo_index():
+    """GeoIndex con las coordenadas de todas las cafeterías (NumPy se importa al primer uso)."""
+    from geo import GeoIndex
+
+    with _geo_lock:
+        expired = time.monotonic() - _geo_cache['built_at'] > GEO_CACHE_SECONDS
+        if _geo_cache['index'] is None or expired:
+            rows = Tienditas.objects.values('id_tiendita', 'latitud', 'longitud')
+            _geo_cache['index'] = GeoIndex.from_records(rows)
+            _geo_cache['built_at'] = time.monotonic()
+        return _geo_cache['index']
+
+
+def invalidate_geo_index():
+    _geo_cache['index'] = None
+
+
 # ========================================
 # VIEWSETS DE RECURSOS
 # ========================================
 
+def parse_open_filter(params):
+    """
+    ?open_now=1 -> abiertas ahora (hora del campus); ?open_at=HH:MM -> abiertas a esa hora.
+    Devuelve (activo, hora); hora None significa "ahora".
+    """
+    open_at = params.get('open_at')
+    if open_at:
+        try:
+            return True, datetime.strptime(open_at, '%H:%M').time()
+        except ValueError:
+            raise ValidationError({'open_at': 'Formato esperado HH:MM'})
+    if params.get('open_now') in ('1', 'true', 'True'):
+        return True, None
+    return False, None
+
+
+def parse_rating_filter(params):
+    """?min_rating=4 -> promedio mínimo de estrellas (1 a 5), o None."""
+    min_rating = params.get('min_rating')
+    if not min_rating:
+        return None
+    try:
+        min_rating = float(min_rating)
+    except ValueError:
+        raise ValidationError({'min_rating': 'Debe ser un número entre 1 y 5'})
+    if not 1 <= min_rating <= 5:
+        raise ValidationError({'min_rating': 'Debe ser un número entre 1 y 5'})
+    return min_rating
+
+
 class TienditasViewSet(viewsets.ModelViewSet):
-    """CRUD de Cafeterías"""
+    """
+    CRUD de Cafeterías, con calificaciones agregadas en la base de datos:
+    rating_avg, rating_count y rating_histogram (reseñas por estrellas).
+    Filtros: ?search=, ?open_now=1, ?open_at=HH:MM, ?min_rating=4 (también aplican a /nearby/)
+    Orden: ?ordering=-rating_avg, ?ordering=-rating_count, ?ordering=nombre
+    ?reviewed_by=<id_usuario> agrega 'reviewed' (si ese usuario ya reseñó cada cafetería)
+    """
     queryset = Tienditas.objects.all()
     serializer_class = TienditasSerializer
-    filter_backends = [filters.SearchFilter]
+    # Sin paginación: una fila por cafetería del campus, y el orden por calificación (agregado,
+    # con nulos) no sirve como cursor. El mapa y el inicio usan el listado completo.
+    pagination_class = None
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['nombre']
+    ordering_fields = ['rating_avg', 'rating_count', 'nombre', 'id_tiendita']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve', 'nearby', 'full'):
+            return queryset
+
+        params = self.request.query_params
+        queryset = queryset.with_ratings()
+        if self.action in ('list', 'nearby'):
+            active, when = parse_open_filter(params)
+            if active:
+                queryset = queryset.open_at(when)
+            min_rating = parse_rating_filter(params)
+            if min_rating is not None:
+                queryset = queryset.filter(rating_avg__gte=min_rating)
+
+        reviewed_by = params.get('reviewed_by')
+        if reviewed_by:
+            if not reviewed_by.isdigit():
+                raise ValidationError({'reviewed_by': 'Debe ser un id de usuario'})
+            queryset = queryset.reviewed_by(int(reviewed_by))
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        Cafeterías más cercanas a un punto, con su distancia en metros.
+        GET /api/Tienditas/nearby/?lat=29.08&lon=-110.96&k=5
+        GET /api/Tienditas/nearby/?lat=29.08&lon=-110.96&radius=500   (solo las que están a <= 500 m)
+        """
+        try:
+            lat = float(request.query_params['lat'])
+            lon = float(request.query_params['lon'])
+            k = int(request.query_params.get('k', 5))
+            radius = request.query_params.get('radius')
+            radius = float(radius) if radius else None
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Parámetros requeridos: lat y lon (opcionales: k, radius en metros)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180) or k < 1 or (radius is not None and radius <= 0):
+            return Response({'error': 'Parámetros fuera de rango'}, status=status.HTTP_400_BAD_REQUEST)
+        k = min(k, NEARBY_MAX_RESULTS)
+
+        geo = get_geo_index()
+        # Con filtros algunas de las k más cercanas pueden quedar fuera: se ordenan todas
+        filtered = parse_open_filter(request.query_params)[0] or parse_rating_filter(request.query_params) is not None
+        limit = len(geo) if filtered else k
+        hits = geo.within(lat, lon, radius, limit=limit) if radius is not None else geo.nearest(lat, lon, k=limit)
+        tiendas = self.get_queryset().in_bulk([tid for tid, _ in hits])
+
+        results = []
+        for tid, dist in hits:
+            if tid in tiendas:
+                data = self.get_serializer(tiendas[tid]).data
+                data['distancia'] = round(dist, 1)
+                results.append(data)
+                if len(results) == k:
+                    break
+        return Response(results)
+
+    @action(detail=True, methods=['get'])
+    def full(self, request, pk=None):
+        """
+        Todo lo que muestra la página de una cafetería en una sola llamada y con número fijo de consultas
+        (cafetería + facultad + calificaciones, menús, reseñas): cafetería con 'facultad',
+        'menus' agrupados por categoría, 'reviews' (las N más recientes, con nombre de usuario)
+        y 'reviews_next': la página siguiente en /api/Resenas/?id_tiendita= (null si no hay más).
+        GET /api/Tienditas/5/full/?reviews=20
+        """
+        menus = Menus.objects.order_by(F('categoria').asc(nulls_last=True), 'nombre', 'pk')
+        queryset = self.get_queryset().select_related('id_facultad').prefetch_related(
+            Prefetch('menus_set', queryset=menus, to_attr='menu_items')
+        )
+        tienda = get_object_or_404(queryset, pk=pk)
+        self.check_object_permissions(request, tienda)
+
+        # Primera página del mismo cursor que /api/Resenas/, para que "ver más" continúe sin huecos
+        paginator = ResenasCursorPagination()
+        paginator.page_size = FULL_RECENT_REVIEWS
+        paginator.page_size_query_param = 'reviews'
+        paginator.max_page_size = FULL_MAX_REVIEWS
+        reviews = paginator.paginate_queryset(
+            Resenas.objects.filter(id_tiendita=tienda).select_related('id_usuario'), request
+        )
+        paginator.base_url = request.build_absolute_uri(f"{reverse('resenas-list')}?id_tiendita={tienda.pk}")
+
+        data = TienditaDetalleSerializer(tienda, context=self.get_serializer_context()).data
+        data['reviews'] = ResenaSerializer(reviews, many=True).data
+        data['reviews_next'] = paginator.get_next_link()
+        return Response(data)
 
 
 class MenusViewSet(viewsets.ModelViewSet):
@@ -147,6 +330,8 @@ class FacultadesViewSet(viewsets.ModelViewSet):
     """CRUD de Facultades"""
     queryset = Facultades.objects.all()
     serializer_class = FacultadesSerializer
+    # Catálogo fijo y pequeño: se devuelve completo
+    pagination_class = None
 
 
 class UsuariosViewSet(viewsets.ModelViewSet):
@@ -162,8 +347,9 @@ class ResenaViewSet(viewsets.ModelViewSet):
     Se ha deshabilitado la seguridad estricta para permitir el flujo sin tokens complejos.
     El Frontend DEBE enviar 'id_usuario'.
     """
-    queryset = Resenas.objects.all()
+    queryset = Resenas.objects.select_related('id_usuario')
     serializer_class = ResenaSerializer
+    pagination_class = ResenasCursorPagination
 
     # 1. Esto evita que Django intente leer el Token y falle
     authentication_classes = []
@@ -173,7 +359,7 @@ class ResenaViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['id_tiendita']
     ordering_fields = ['fecha_registro', 'calificacion']
-    ordering = ['-fecha_registro']
+    ordering = ['-fecha_registro', '-pk']
 
     def perform_create(self, serializer):
         # Guardamos directamente usando el id_usuario que viene del frontend
@@ -195,43 +381,233 @@ class MenusPorTiendita(generics.ListAPIView):
 # CHATBOT RAG (Mantenido intacto)
 # ========================================
 
-# Importar el motor RAG
+# Ruta del motor RAG
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../../llm_rag'))
 
-try:
-    from rag_engine_hpc import BuhoRAG
-    RAG_AVAILABLE = True
-except ImportError as e:
-    logger.warning(f"⚠️ RAG no disponible: {e}")
-    RAG_AVAILABLE = False
-    BuhoRAG = None
+# Cliente ligero (solo biblioteca estándar)
+from rag_client import RAGClient, RAGBusyError, RAGServerError
+
+# BUHO_RAG_SERVER=unix:/ruta.sock o http://127.0.0.1:8765 -> todos los workers usan el servidor
+# de inferencia (rag_server.py). Sin la variable, el motor corre dentro del proceso (desarrollo).
+RAG_SERVER = os.getenv('BUHO_RAG_SERVER')
+
+# El motor (torch, transformers, faiss...) NO se importa aquí: cuesta segundos y cientos de MB
+# en cada proceso, aunque solo sirva /api/Menus/. Se importa al primer uso del chatbot.
+BuhoRAG = None
+RAG_AVAILABLE = bool(RAG_SERVER) or importlib.util.find_spec('rag_engine_hpc') is not None
 
-# Instancia global del RAG (Singleton)
+
+def load_rag_engine_class():
+    """Importa rag_engine_hpc la primera vez que se necesita."""
+    global BuhoRAG, RAG_AVAILABLE
+
+    if BuhoRAG is None:
+        try:
+            from rag_engine_hpc import BuhoRAG as engine_class
+        except ImportError as e:
+            logger.warning(f"⚠️ RAG no disponible: {e}")
+            RAG_AVAILABLE = False
+            raise RuntimeError("RAG engine no está disponible") from e
+        BuhoRAG = engine_class
+    return BuhoRAG
+
+# Instancia global del RAG (Singleton). Solo se publica cuando ya terminó de cargar.
 _rag_instance = None
+# Instancia que se está cargando (para reportar avance y no perder cambios del admin)
+_rag_loading = None
+_rag_lock = threading.Lock()
+_rag_warmup = {'state': 'idle', 'started_at': None, 'seconds': None, 'error': None, 'retry_at': None}
+# Cliente del servidor de inferencia (uno por proceso, con una conexión keep-alive por hilo)
+_rag_client = None
+_rag_client_lock = threading.Lock()
+
+# Segundos que se sugieren al cliente mientras el modelo carga
+RAG_RETRY_AFTER = int(os.getenv('BUHO_RAG_RETRY_AFTER', 15))
+# Segundos sin reintentar la carga después de un warm-up fallido (cada intento carga el modelo completo)
+RAG_WARMUP_BACKOFF = int(os.getenv('BUHO_RAG_WARMUP_BACKOFF', 60))
+
+
+def make_rag_client():
+    """Cliente del servidor de inferencia; timeouts y cola configurables por entorno."""
+    return RAGClient(
+        RAG_SERVER,
+        timeout=float(os.getenv('BUHO_RAG_SERVER_TIMEOUT', 120)),
+        connect_timeout=float(os.getenv('BUHO_RAG_SERVER_CONNECT_TIMEOUT', 2)),
+        max_inflight=int(os.getenv('BUHO_RAG_CLIENT_MAX_INFLIGHT', 16)),
+        queue_timeout=float(os.getenv('BUHO_RAG_CLIENT_QUEUE_TIMEOUT', 5)),
+        changes_timeout=float(os.getenv('BUHO_RAG_CHANGES_TIMEOUT', 2)),
+    )
+
+
+def get_rag_client():
+    """Cliente compartido del proceso: lo usan las consultas y las señales del admin."""
+    global _rag_client
+
+    if _rag_client is None:
+        with _rag_client_lock:
+            if _rag_client is None:
+                _rag_client = make_rag_client()
+    return _rag_client
+
+
+def rag_warmup_backoff():
+    """Segundos que faltan para reintentar la carga tras un fallo (0 si ya se puede)."""
+    if _rag_warmup['state'] != 'error' or _rag_warmup['retry_at'] is None:
+        return 0
+    return max(0, math.ceil(_rag_warmup['retry_at'] - time.time()))
 
 
 def get_rag_instance():
     """
     Obtiene o crea la instancia del RAG (Lazy Loading)
-    Esto evita cargar el modelo hasta que sea necesario
+    Esto evita cargar el modelo hasta que sea necesario.
+    El lock evita que dos peticiones simultáneas carguen el modelo dos veces.
     """
-    global _rag_instance
+    global _rag_instance, _rag_loading
 
     if not RAG_AVAILABLE:
         raise RuntimeError("RAG engine no está disponible")
 
-    if _rag_instance is None:
-        logger.info("🦉 Inicializando RAG por primera vez...")
-        _rag_instance = BuhoRAG()
-        _rag_instance.load_data()
-        _rag_instance.build_index()
-        logger.info("✅ RAG inicializado correctamente")
+    if _rag_instance is not None:
+        return _rag_instance
+
+    if rag_warmup_backoff():
+        raise RuntimeError(f"El RAG falló al cargar: {_rag_warmup['error']}")
+
+    with _rag_lock:
+        if _rag_instance is None:
+            logger.info("🦉 Inicializando RAG por primera vez...")
+            _rag_warmup.update(state='loading', started_at=time.time(), error=None, retry_at=None)
+            start = time.perf_counter()
+            try:
+                if RAG_SERVER:
+                    _rag_loading = get_rag_client()
+                else:
+                    # Se publica antes de leer la base: un cambio guardado durante la carga queda en la
+                    # cola del motor, y uno anterior ya viene en la foto de la base de datos
+                    _rag_loading = load_rag_engine_class()(data_path=settings.RAG_DATA_SNAPSHOT, persist_changes=True)
+                    write_rag_snapshot(settings.RAG_DATA_SNAPSHOT)
+                _rag_loading.warm_up()
+            except Exception as e:
+                _rag_warmup.update(state='error', error=str(e), retry_at=time.time() + RAG_WARMUP_BACKOFF)
+                raise
+            _rag_instance = _rag_loading
+            _rag_warmup.update(state='ready', seconds=round(time.perf_counter() - start, 2))
+            logger.info("✅ RAG inicializado correctamente")
 
     return _rag_instance
 
 
-# Reemplaza SOLO esta función en tu views.py existente
-# (desde la línea 227 aproximadamente, donde empieza @api_view(['POST']))
+def _warm_up_in_background():
+    try:
+        get_rag_instance()
+    except Exception as e:
+        logger.error(f"❌ Falló el warm-up del RAG: {e}", exc_info=True)
+    finally:
+        # La foto de la base de datos abrió una conexión en este hilo
+        connection.close()
+
+
+def start_rag_warmup():
+    """
+    Carga el RAG en un hilo de fondo (idempotente). Lo llama AppConfig.ready()
+    con BUHO_RAG_WARMUP=1, o la primera consulta si no se precargó.
+    """
+    if not RAG_AVAILABLE or _rag_instance is not None or _rag_warmup['state'] == 'loading':
+        return
+    # Tras un fallo se espera RAG_WARMUP_BACKOFF antes de volver a cargar el modelo
+    if rag_warmup_backoff():
+        return
+    with _rag_lock:
+        if _rag_warmup['state'] == 'loading':
+            return
+        # Se marca aquí para que dos peticiones no lancen dos hilos
+        _rag_warmup.update(state='loading', started_at=time.time(), error=None, retry_at=None)
+    threading.Thread(target=_warm_up_in_background, name='buho-rag-warmup', daemon=True).start()
+
+
+def rag_not_ready_response():
+    """503 rápido mientras el modelo carga, en vez de bloquear la petición."""
+    start_rag_warmup()
+    response = Response(
+        {
+            'success': False,
+            'error': 'El Búho se está despertando 🦉 Intenta de nuevo en unos segundos',
+            'state': _rag_warmup['state']
+        },
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+    response['Retry-After'] = str(rag_warmup_backoff() or RAG_RETRY_AFTER)
+    return response
+
+
+def enqueue_rag_change(model, action, record):
+    """
+    Pasa un cambio de Menus/Tienditas/Facultades al RAG vivo (lo llaman las señales).
+    Con BUHO_RAG_SERVER siempre se reenvía: el servidor es compartido y este worker puede
+    no haber atendido ninguna consulta todavía.
+    """
+    rag = get_rag_client() if RAG_SERVER else (_rag_instance or _rag_loading)
+    if rag is None:
+        return
+    try:
+        rag.enqueue_change(model, action, record)
+    except Exception as e:
+        # El registro ya está guardado: un servidor RAG caído o lento no debe tumbar el guardado del admin
+        logger.error(f"❌ No se pudo pasar el cambio de {model} al RAG: {e}")
+
+
+def get_chat_session_id(request):
+    """
+    Identificador de la conversación: el frontend manda 'session_id';
+    si no viene, se usa la IP del cliente para no mezclar usuarios.
+    """
+    session_id = str(request.data.get('session_id') or '').strip()[:64]
+    return session_id or f"ip:{request.META.get('REMOTE_ADDR', 'anon')}"
+
+
+RESET_COMMANDS = ['reset', 'reiniciar', 'borrar historial', 'limpiar']
+
+
+def wants_timings(request):
+    """Instrumentación opt-in: {"timings": true} en el cuerpo o ?timings=1."""
+    value = request.data.get('timings', request.query_params.get('timings'))
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def build_timings(result):
+    """Costo de la consulta: tiempos por etapa (ms), tokens, documentos recuperados, índice y cachés."""
+    return {
+        'stages_ms': result.get('timings', {}),
+        'prompt_tokens': result.get('prompt_tokens', 0),
+        'completion_tokens': result.get('completion_tokens', 0),
+        'retrieved': result.get('retrieved', []),
+        'index_rebuilt': result.get('index_rebuilt', False),
+        'index_updates': result.get('index_updates', 0),
+        'cache': {
+            'answer': result.get('cached', False),
+            'fast_path': result.get('fast_path', False),
+            'prefill_saved_tokens': result.get('prefill_saved_tokens', 0),
+        },
+    }
+
+
+def build_chat_metadata(result, rag, session_id, timings=False):
+    """Bloque 'metadata' común a la respuesta JSON y al evento final del streaming"""
+    metadata = {
+        'budget_detected': result.get('budget_detected'),
+        'location_used': result.get('location_used'),
+        'context_docs': len(result.get('context', [])),
+        # El servidor de inferencia ya la manda en el resultado (evita otra llamada)
+        'conversation_length': result['conversation_length'] if 'conversation_length' in result else rag.conversation_length(session_id),
+        'cached': result.get('cached', False),
+        'prompt_tokens': result.get('prompt_tokens', 0),
+        'prefill_saved_tokens': result.get('prefill_saved_tokens', 0)
+    }
+    if timings:
+        metadata['timings'] = build_timings(result)
+    return metadata
+
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -244,6 +620,7 @@ def chatbot_query(request):
         message = request.data.get('message', '').strip()
         user_lat = request.data.get('lat')
         user_lon = request.data.get('lon')
+        session_id = get_chat_session_id(request)
 
         if not message:
             return Response(
@@ -264,10 +641,13 @@ def chatbot_query(request):
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
 
+        if _rag_instance is None:
+            return rag_not_ready_response()
+
         # Comandos especiales
-        if message.lower() in ['reset', 'reiniciar', 'borrar historial', 'limpiar']:
+        if message.lower() in RESET_COMMANDS:
             rag = get_rag_instance()
-            rag.reset_conversation()
+            rag.reset_conversation(session_id)
             return Response({
                 'success': True,
                 'answer': '🔄 Conversación reiniciada. ¿En qué puedo ayudarte ahora?',
@@ -277,7 +657,8 @@ def chatbot_query(request):
         # Procesar consulta normal
         logger.info(f"💬 Consulta chatbot: {message[:50]}...")
         rag = get_rag_instance()
-        result = rag.query(message, user_lat=user_lat, user_lon=user_lon)
+        result = rag.query(message, user_lat=user_lat, user_lon=user_lon, session_id=session_id)
+        observe_chat_result(result)
 
         # FIX: Verificar que los saltos de línea están presentes
         answer_text = result['answer']
@@ -286,15 +667,30 @@ def chatbot_query(request):
         return Response({
             'success': True,
             'answer': answer_text,
-            'metadata': {
-                'budget_detected': result.get('budget_detected'),
-                'location_used': result.get('location_used'),
-                'context_docs': len(result.get('context', [])),
-                'conversation_length': len(rag.chat_history)
-            }
+            'metadata': build_chat_metadata(result, rag, session_id, timings=wants_timings(request))
         }, status=status.HTTP_200_OK)
 
+    except RAGBusyError as e:
+        CHAT_ERRORS.inc(kind='busy')
+        logger.warning(f"⏳ Servidor RAG ocupado: {e}")
+        response = Response({
+            'success': False,
+            'error': 'El Búho está atendiendo a muchos estudiantes 🦉 Intenta de nuevo en unos segundos'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = str(e.retry_after)
+        return response
+
+    except RAGServerError as e:
+        # Subclase de RuntimeError: va antes para no reportar una caída del servidor como configuración
+        CHAT_ERRORS.inc(kind='server')
+        logger.error(f"❌ Servidor RAG no disponible: {e}")
+        return Response({
+            'success': False,
+            'error': 'El servidor del chatbot no está disponible en este momento 🦉 Intenta de nuevo más tarde'
+        }, status=status.HTTP_502_BAD_GATEWAY)
+
     except RuntimeError as e:
+        CHAT_ERRORS.inc(kind='config')
         logger.error(f"❌ Error de configuración RAG: {e}")
         return Response({
             'success': False,
@@ -302,6 +698,7 @@ def chatbot_query(request):
         }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
     except Exception as e:
+        CHAT_ERRORS.inc(kind='internal')
         logger.error(f"❌ Error inesperado en chatbot: {e}", exc_info=True)
         return Response({
             'success': False,
@@ -309,6 +706,137 @@ def chatbot_query(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def chatbot_stream(request):
+    """
+    Variante en streaming del chatbot (Server-Sent Events).
+    Eventos: 'token' {"text": ...} mientras se genera, y 'done' con
+    {"success", "answer", "metadata"} igual que /api/chatbot/. Si algo falla: 'error'.
+    """
+    message = request.data.get('message', '').strip()
+    user_lat = request.data.get('lat')
+    user_lon = request.data.get('lon')
+    session_id = get_chat_session_id(request)
+    timings = wants_timings(request)
+
+    if not message:
+        return Response(
+            {'success': False, 'error': 'El mensaje no puede estar vacío'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if not RAG_AVAILABLE:
+        return Response(
+            {'success': False, 'error': 'El chatbot no está disponible en este momento'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    if _rag_instance is None:
+        return rag_not_ready_response()
+
+    def events():
+        try:
+            rag = get_rag_instance()
+
+            if message.lower() in RESET_COMMANDS:
+                rag.reset_conversation(session_id)
+                yield _sse('done', {
+                    'success': True,
+                    'answer': '🔄 Conversación reiniciada. ¿En qué puedo ayudarte ahora?',
+                    'metadata': {'command': 'reset'}
+                })
+                return
+
+            logger.info(f"💬 Consulta chatbot (stream): {message[:50]}...")
+            # closing(): si el navegador se desconecta, la generación se corta en vez de seguir en segundo plano
+            with closing(rag.query_stream(message, user_lat=user_lat, user_lon=user_lon, session_id=session_id)) as stream:
+                for event in stream:
+                    if event['type'] == 'token':
+                        yield _sse('token', {'text': event['text']})
+                    else:
+                        observe_chat_result(event)
+                        yield _sse('done', {
+                            'success': True,
+                            'answer': event['answer'],
+                            'metadata': build_chat_metadata(event, rag, session_id, timings=timings)
+                        })
+
+        except Exception as e:
+            CHAT_ERRORS.inc(kind='stream')
+            logger.error(f"❌ Error en chatbot (stream): {e}", exc_info=True)
+            yield _sse('error', {
+                'success': False,
+                'error': 'Ups, algo salió mal. ¿Puedes intentar de nuevo? 🦉'
+            })
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Que nginx no acumule el stream
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def chatbot_stats(request):
+    """
+    Estadísticas del chatbot: micro-batching de generación (p50/p99 y tamaños de batch,
+    para ajustar BUHO_RAG_MAX_BATCH y BUHO_RAG_BATCH_WAIT_MS), tasa de aciertos de la caché
+    y prefill ahorrado por la KV-cache del prompt de sistema.
+    """
+    if _rag_instance is None:
+        return Response({'loaded': False, 'generation': {}, 'answer_cache': {}, 'prefix_cache': {}})
+    # Una sola llamada: con BUHO_RAG_SERVER es un solo GET /stats
+    stats = _rag_instance.stats()
+    return Response({
+        'loaded': True,
+        'generation': stats.get('generation', {}),
+        'answer_cache': stats.get('answer_cache', {}),
+        'prefix_cache': stats.get('prefix_cache', {})
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def chatbot_health(request):
+    """
+    Readiness del chatbot: 200 cuando el RAG está listo, 503 mientras carga o si falló.
+    Incluye estado y duración de carga de cada componente (datos, embeddings, LLM, índice...).
+    """
+    rag = _rag_instance or _rag_loading
+    ready = _rag_instance is not None
+    body = {
+        'ready': ready,
+        'state': _rag_warmup['state'] if RAG_AVAILABLE else 'unavailable',
+        'seconds': _rag_warmup['seconds'],
+        'error': _rag_warmup['error'],
+        'components': rag.components if rag is not None else {}
+    }
+    response = Response(body, status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
+    if not ready:
+        response['Retry-After'] = str(rag_warmup_backoff() or RAG_RETRY_AFTER)
+    return response
+
+
+def chatbot_metrics(request):
+    """
+    Contadores e histogramas del chatbot en formato de texto de Prometheus (ver metrics.py):
+    consultas por ruta, latencia total y por etapa, tokens, reconstrucciones del índice y errores.
+    Requiere "Authorization: Bearer <METRICS_TOKEN>"; sin METRICS_TOKEN configurado responde 404.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404
+    scheme, _, given = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(given.strip().encode(), token.encode()):
+        raise Http404
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # ========================================
 # UTILIDADES
 # ========================================
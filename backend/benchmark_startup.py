@@ -0,0 +1,144 @@
+# backend/benchmark_startup.py
+"""
+Mide cuánto cuesta arrancar un proceso de Django (tiempo de import y memoria residente máxima)
+con y sin el motor del chatbot cargado.
+
+Escenarios (cada uno en un proceso nuevo, se reporta la mediana de --repeat corridas):
+  check          -> python manage.py check
+  check+chatbot  -> igual, pero importando el motor RAG (lo que pasaba antes en cada comando)
+  api            -> worker que solo sirve la API: django.setup + URLconf + GET /api/Facultades/
+  api+chatbot    -> el mismo worker después de importar el motor RAG (primer uso del chatbot)
+
+No carga pesos de modelos: solo mide el costo de importar torch/transformers/faiss.
+
+Uso:
+    python benchmark_startup.py
+    python benchmark_startup.py --repeat 5 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+SCENARIOS = ['check', 'check+chatbot', 'api', 'api+chatbot']
+HEAVY_MODULES = ['torch', 'transformers', 'sentence_transformers', 'faiss', 'numpy']
+
+
+def _child(scenario: str) -> dict:
+    """Se ejecuta dentro del proceso medido."""
+    start = time.perf_counter()
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    from django.conf import settings
+
+    if scenario.startswith('api'):
+        # Base en memoria: el benchmark no depende de tener el .db local
+        settings.DATABASES['default']['NAME'] = ':memory:'
+    django.setup()
+
+    if scenario.startswith('check'):
+        from django.core.management import call_command
+        call_command('check', verbosity=0)
+        if scenario.endswith('+chatbot'):
+            from apps.cafeteria.views import load_rag_engine_class
+            load_rag_engine_class()
+        startup_s = time.perf_counter() - start
+        request_ms = None
+    else:
+        from django.core.handlers.wsgi import WSGIHandler
+        from django.core.management import call_command
+        from django.test import Client
+        from django.urls import get_resolver
+
+        WSGIHandler()
+        get_resolver().url_patterns  # fuerza la carga de config.urls (y de las vistas)
+        if scenario.endswith('+chatbot'):
+            from apps.cafeteria.views import load_rag_engine_class
+            load_rag_engine_class()
+        startup_s = time.perf_counter() - start
+
+        call_command('migrate', verbosity=0)
+        client = Client(HTTP_HOST='localhost')
+        t0 = time.perf_counter()
+        response = client.get('/api/Facultades/')
+        request_ms = (time.perf_counter() - t0) * 1000.0
+        assert response.status_code == 200, response.status_code
+
+    return {
+        'startup_s': startup_s,
+        'request_ms': request_ms,
+        # ru_maxrss está en KB en Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        'heavy_modules': [m for m in HEAVY_MODULES if m in sys.modules],
+    }
+
+
+def _run(scenario: str) -> dict:
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', scenario],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True,
+    )
+    wall_s = time.perf_counter() - start
+    if out.returncode != 0:
+        raise RuntimeError(f"El escenario {scenario} falló:\n{out.stderr}")
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result['wall_s'] = wall_s
+    return result
+
+
+def _median(runs: list, key: str):
+    values = [r[key] for r in runs if r[key] is not None]
+    return round(statistics.median(values), 3) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque y memoria de los procesos de Django")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help="Ruta para guardar los resultados")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.child)))
+        return
+
+    results = []
+    for scenario in [s.strip() for s in args.scenarios.split(',') if s.strip()]:
+        print(f"⏱️ {scenario}...")
+        try:
+            runs = [_run(scenario) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            # Sin torch/faiss instalados los escenarios +chatbot no pueden correr
+            print(f"⚠️ {e}")
+            continue
+        results.append({
+            'scenario': scenario,
+            'wall_s': _median(runs, 'wall_s'),
+            'startup_s': _median(runs, 'startup_s'),
+            'request_ms': _median(runs, 'request_ms'),
+            'peak_rss_mb': _median(runs, 'peak_rss_mb'),
+            'heavy_modules': runs[-1]['heavy_modules'],
+        })
+
+    print(f"\n{'escenario':<15} {'total (s)':>10} {'arranque (s)':>13} {'GET (ms)':>9} {'RSS (MB)':>9}  módulos pesados")
+    for r in results:
+        request_ms = '-' if r['request_ms'] is None else f"{r['request_ms']:.1f}"
+        print(f"{r['scenario']:<15} {r['wall_s']:>10} {r['startup_s']:>13} {request_ms:>9} {r['peak_rss_mb']:>9}  "
+              f"{', '.join(r['heavy_modules']) or '-'}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results}, f, indent=2)
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -61,8 +61,20 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ),
 
+    # Paginación por cursor en todos los listados (ver apps/cafeteria/pagination.py);
+    # el cliente puede pedir ?page_size= hasta API_MAX_PAGE_SIZE
+    'DEFAULT_PAGINATION_CLASS': 'apps.cafeteria.pagination.PrimaryKeyCursorPagination',
+    'PAGE_SIZE': int(os.getenv("API_PAGE_SIZE", 50)),
+
 }
 
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 500))
+
+# Conteo de consultas SQL por petición (apps/cafeteria/middleware.py): headers X-DB-Query-Count,
+# X-DB-Time-Ms y Server-Timing, y warning con las consultas repetidas al pasar el umbral
+QUERY_INSPECTOR_ENABLED = os.getenv("QUERY_INSPECTOR_ENABLED", str(DEBUG)).lower() in ("1", "true", "yes")
+QUERY_COUNT_WARN_THRESHOLD = int(os.getenv("QUERY_COUNT_WARN_THRESHOLD", 20))
+
 SIMPLE_JWT =  {
     
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -73,6 +85,7 @@ SIMPLE_JWT =  {
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  
+    'apps.cafeteria.middleware.QueryCountMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -167,6 +180,17 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Los horarios de las cafeterías (hora_apertura/hora_cierre) están en hora local del campus
+CAMPUS_TIME_ZONE = os.getenv("CAMPUS_TIME_ZONE", "America/Hermosillo")
+
+# Datos con los que arranca el RAG en proceso: se regeneran desde la base de datos en cada carga
+RAG_DATA_SNAPSHOT = os.getenv("BUHO_RAG_DATA_SNAPSHOT", str(BASE_DIR / ".rag_cache" / "rag_data_db.json"))
+
+# Token para leer /metrics/ (métricas del chatbot en formato de texto de Prometheus) con
+# "Authorization: Bearer <token>". Sin token el endpoint no existe (404). No se filtra por IP:
+# detrás de nginx todas las peticiones llegan desde 127.0.0.1
+METRICS_TOKEN = os.getenv("BUHO_METRICS_TOKEN", "")
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
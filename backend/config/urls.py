@@ -22,7 +22,7 @@ from django.views.generic import RedirectView
 from apps.cafeteria.views import TienditasViewSet, MenusViewSet, FacultadesViewSet, UsuariosViewSet, ResenaViewSet
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from apps.cafeteria.views import UserRegisterView
-from apps.cafeteria.views import chatbot_query
+from apps.cafeteria.views import chatbot_query, chatbot_stream, chatbot_stats, chatbot_health, chatbot_metrics
 
 router = routers.DefaultRouter()
 router.register(r'Tienditas', TienditasViewSet)
@@ -36,6 +36,10 @@ urlpatterns = [
     path('admin/', admin.site.urls),  
     path('', RedirectView.as_view(url='/cafeteria/', permanent=False)),
     path('api/chatbot/', chatbot_query, name='chatbot'),
+    path('api/chatbot/stream/', chatbot_stream, name='chatbot_stream'),
+    path('api/chatbot/stats/', chatbot_stats, name='chatbot_stats'),
+    path('api/chatbot/health/', chatbot_health, name='chatbot_health'),
+    path('metrics/', chatbot_metrics, name='metrics'),
     #Endpoins de Autenticacion
     path('api/', include(router.urls)),  
     path('api/login/', login_view, name='login'),
@@ -12,54 +12,13 @@ import sys
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
-from apps.cafeteria.models import Menus, Tienditas, Facultades
+from apps.cafeteria.rag_sync import export_rag_data
 
 def export_data():
     print("🦉 Exportando datos desde SQLite...")
 
-    data = {}
-
-    # Export menus
-    print("📋 Exportando menús...")
-    menus = Menus.objects.all().values(
-        'id_menu', 'nombre', 'descripcion', 'precio',
-        'id_tiendita__id_tiendita', 'categoria'
-    )
-
-    data['menus'] = []
-    for menu in menus:
-        data['menus'].append({
-            'id_menu': menu['id_menu'],
-            'nombre': menu['nombre'],
-            'descripcion': menu.get('descripcion', ''),
-            'precio': str(menu.get('precio', '0.00')),
-            'id_tiendita': menu.get('id_tiendita__id_tiendita'),
-            'categoria': menu.get('categoria', '')
-        })
-
-    # Export tienditas
-    print("🏪 Exportando cafeterías...")
-    tienditas = Tienditas.objects.select_related('id_facultad').all()
-
-    data['tienditas'] = []
-    for t in tienditas:
-        data['tienditas'].append({
-            'id_tiendita': t.id_tiendita,
-            'nombre': t.nombre,
-            'direccion': t.direccion or '',
-            'foro_url': t.foro_url or '',
-            'id_facultad': t.id_facultad.id_facultad if t.id_facultad else None,
-            'facultad_nombre': t.id_facultad.nombre if t.id_facultad else '',
-            'latitud': str(t.latitud) if t.latitud else None,
-            'longitud': str(t.longitud) if t.longitud else None,
-            'hora_apertura': str(t.hora_apertura) if t.hora_apertura else None,
-            'hora_cierre': str(t.hora_cierre) if t.hora_cierre else None
-        })
-
-    # Export facultades
-    print("📚 Exportando facultades...")
-    facultades = Facultades.objects.all().values()
-    data['facultades'] = list(facultades)
+    # Menús, cafeterías y facultades
+    data = export_rag_data()
 
     # Resumen
     print(f"\n📊 Resumen:")
@@ -2,100 +2,12 @@
 """
 Corrige caracteres mal codificados y los convierte a versiones sin acentos
 Convierte: "??????" → letra normal (á → a, é → e, etc.)
+La limpieza vive en apps/cafeteria/rag_sync.py (la comparten las señales del admin).
 """
 
 import json
-import unicodedata
 
-def remove_accents(text):
-    """
-    Convierte caracteres acentuados a su versión sin acento
-    á → a, é → e, í → i, ó → o, ú → u, ñ → n
-    """
-    if not isinstance(text, str):
-        return text
-
-    # Normalizar el texto (descomponer caracteres con acento)
-    nfd = unicodedata.normalize('NFD', text)
-
-    # Filtrar solo los caracteres base (sin marcas diacríticas)
-    without_accents = ''.join(
-        char for char in nfd
-        if unicodedata.category(char) != 'Mn'  # Mn = Marcas no espaciadoras (acentos)
-    )
-
-    return without_accents
-
-
-def fix_broken_encoding(text):
-    """
-    Arregla caracteres mal codificados como "??????"
-    """
-    if not isinstance(text, str):
-        return text
-
-    # Mapeo de caracteres rotos comunes
-    replacements = {
-        # Minúsculas
-        'Ã¡': 'a',  # á
-        'Ã©': 'e',  # é
-        'Ã­': 'i',  # í
-        'Ã³': 'o',  # ó
-        'Ãº': 'u',  # ú
-        'Ã±': 'n',  # ñ
-        'Ã¼': 'u',  # ü
-
-        # Mayúsculas
-        'Ã': 'A',   # Á
-        'Ã': 'E',   # É
-        'Ã': 'I',   # Í
-        'Ã': 'O',   # Ó
-        'Ã': 'U',   # Ú
-        'Ã': 'N',   # Ñ
-
-        # Patrones con signos de interrogación
-        '?????': '',  # Eliminar completamente
-        '??????': '', # Eliminar completamente
-    }
-
-    result = text
-    for wrong, correct in replacements.items():
-        result = result.replace(wrong, correct)
-
-    # Eliminar cualquier carácter de interrogación residual seguido de caracteres especiales
-    result = result.replace('?', '')
-
-    return result
-
-
-def clean_string(text):
-    """
-    Limpia un texto: corrige encoding roto y quita acentos
-    """
-    if not isinstance(text, str):
-        return text
-
-    # Paso 1: Arreglar caracteres rotos
-    text = fix_broken_encoding(text)
-
-    # Paso 2: Quitar acentos de lo que quedó
-    text = remove_accents(text)
-
-    return text
-
-
-def clean_dict(obj):
-    """
-    Limpia recursivamente un diccionario/lista/string
-    """
-    if isinstance(obj, dict):
-        return {k: clean_dict(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [clean_dict(item) for item in obj]
-    elif isinstance(obj, str):
-        return clean_string(obj)
-    else:
-        return obj
+from apps.cafeteria.rag_sync import clean_dict
 
 
 def main():
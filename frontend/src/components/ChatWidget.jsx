@@ -2,6 +2,36 @@ import React, { useState, useRef, useEffect } from "react";
 import { FiMessageSquare, FiX, FiSend, FiLoader } from "react-icons/fi";
 import logo from "../assets/logo.png";
 
+// Un id por pestaña: el backend guarda el historial de cada conversación por separado
+const getSessionId = () => {
+    let id = sessionStorage.getItem("buho_chat_session");
+    if (!id) {
+        id = crypto.randomUUID();
+        sessionStorage.setItem("buho_chat_session", id);
+    }
+    return id;
+};
+
+const formatAnswer = (answer) => {
+    let formattedAnswer = answer;
+
+    // Caso 1: Si JSON escapó los \n como \\n literales (texto)
+    if (formattedAnswer.includes('\\n')) {
+        formattedAnswer = formattedAnswer.replace(/\\n/g, '\n');
+    }
+
+    // Caso 2: Si tiene bullets pero SIN saltos de línea, forzarlos
+    if (formattedAnswer.includes('•') && !formattedAnswer.includes('\n•')) {
+        formattedAnswer = formattedAnswer
+            .split('•')
+            .map((part, i) => i === 0 ? part : '• ' + part.trim())
+            .join('\n')
+            .trim();
+    }
+
+    return formattedAnswer;
+};
+
 const ChatWidget = () => {
     const [isOpen, setIsOpen] = useState(false);
     const [message, setMessage] = useState("");
@@ -58,44 +88,73 @@ const ChatWidget = () => {
             // Obtener ubicación (opcional)
             const location = await getUserLocation();
 
-            // Llamar al backend
-            const response = await fetch("http://127.0.0.1:8000/api/chatbot/", {
+            // Llamar al backend (streaming SSE: los tokens llegan mientras se generan)
+            const response = await fetch("http://127.0.0.1:8000/api/chatbot/stream/", {
                 method: "POST",
                 headers: {
                     "Content-Type": "application/json",
                 },
                 body: JSON.stringify({
                     message: userMessage,
+                    session_id: getSessionId(),
                     lat: location?.lat,
                     lon: location?.lon
                 }),
             });
 
-            const data = await response.json();
+            if (!response.ok || !response.body) {
+                const data = await response.json().catch(() => ({}));
+                throw new Error(data.error || "Error desconocido");
+            }
+
+            // Burbuja del bot que se va llenando
+            let streamedText = "";
+            let started = false;
+            const updateBotMessage = (text) => {
+                setChatHistory((prev) => {
+                    const updated = [...prev];
+                    updated[updated.length - 1] = { type: "bot", text };
+                    return updated;
+                });
+            };
 
-            if (data.success) {
-                let formattedAnswer = data.answer;
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = "";
 
-                // Caso 1: Si JSON escapó los \n como \\n literales (texto)
-                if (formattedAnswer.includes('\\n')) {
-                    formattedAnswer = formattedAnswer.replace(/\\n/g, '\n');
-                }
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
 
-                // Caso 2: Si tiene bullets pero SIN saltos de línea, forzarlos
-                if (formattedAnswer.includes('•') && !formattedAnswer.includes('\n•')) {
-                    formattedAnswer = formattedAnswer
-                        .split('•')
-                        .map((part, i) => i === 0 ? part : '• ' + part.trim())
-                        .join('\n')
-                        .trim();
-                }
+                // Los eventos SSE vienen separados por una línea en blanco
+                const events = buffer.split("\n\n");
+                buffer = events.pop();
 
-                setChatHistory((prev) => [
-                    ...prev,
-                    { type: "bot", text: formattedAnswer }
-                ]);
-            } else {
-                throw new Error(data.error || "Error desconocido");
+                for (const rawEvent of events) {
+                    const eventName = rawEvent.match(/^event: (.*)$/m)?.[1];
+                    const dataLine = rawEvent.match(/^data: (.*)$/m)?.[1];
+                    if (!eventName || !dataLine) continue;
+                    const data = JSON.parse(dataLine);
+
+                    if (eventName === "error") {
+                        throw new Error(data.error || "Error desconocido");
+                    }
+
+                    if (!started) {
+                        started = true;
+                        setIsLoading(false);
+                        setChatHistory((prev) => [...prev, { type: "bot", text: "" }]);
+                    }
+
+                    if (eventName === "token") {
+                        streamedText += data.text;
+                        updateBotMessage(streamedText);
+                    } else if (eventName === "done") {
+                        // La respuesta final ya viene limpia; reemplaza lo acumulado
+                        updateBotMessage(formatAnswer(data.answer));
+                    }
+                }
             }
         } catch (error) {
             console.error("Error:", error);
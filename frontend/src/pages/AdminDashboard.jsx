@@ -4,6 +4,7 @@ import Header from "../components/Header";
 import Footer from "../components/Footer";
 import { FiPlus, FiEdit2, FiTrash2, FiX, FiSave, FiImage, FiList, FiMessageSquare, FiUser } from "react-icons/fi";
 import { FaStar } from "react-icons/fa";
+import { fetchAllPages } from "../utils/pagination";
 
 const AdminDashboard = () => {
   const [cafeterias, setCafeterias] = useState([]);
@@ -88,16 +89,15 @@ const AdminDashboard = () => {
     setEditingMenuItemId(null);
     setNewMenuItem({ nombre: "", precio: "", descripcion: "", categoria: "" });
     
-    // 1. Cargar Menú
-    fetch(`http://127.0.0.1:8000/api/Menus/?id_tiendita=${cafe.id_tiendita}`)
+    // Menú y reseñas en una sola llamada; si hay más reseñas se recorren sus páginas (el admin las modera todas)
+    fetch(`http://127.0.0.1:8000/api/Tienditas/${cafe.id_tiendita}/full/?reviews=50`)
       .then(res => res.json())
-      .then(data => setCafeMenu(data));
-
-    // 2. Cargar Reseñas
-    fetch(`http://127.0.0.1:8000/api/Resenas/?id_tiendita=${cafe.id_tiendita}`)
-      .then(res => res.json())
-      .then(data => setCafeReviews(data))
-      .catch(err => console.error("Error cargando reseñas", err));
+      .then(async data => {
+        setCafeMenu(data.menus.flatMap(grupo => grupo.platillos));
+        const resto = data.reviews_next ? await fetchAllPages(`${data.reviews_next}&page_size=500`) : [];
+        setCafeReviews([...data.reviews, ...resto]);
+      })
+      .catch(err => console.error("Error cargando menú y reseñas", err));
   };
 
   const handleUpdateCafe = async (e) => {
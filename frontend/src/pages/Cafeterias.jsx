@@ -3,14 +3,14 @@ import React, { useEffect, useState } from "react";
 import { useNavigate, Link } from "react-router-dom";
 import Header from "../components/Header";
 import Footer from "../components/Footer";
-import { FiCheckCircle, FiCircle, FiAward, FiMapPin, FiLock } from "react-icons/fi";
+import { FiCheckCircle, FiCircle, FiAward, FiMapPin, FiLock, FiStar } from "react-icons/fi";
 import BuhoChef from "../assets/chef.png"; 
 import BuhoCartel from "../assets/cartel.png";
 import defaultImage from "../assets/logo.png";
 
 const Cafeterias = () => {
   const [cafeterias, setCafeterias] = useState([]);
-  const [visitedIds, setVisitedIds] = useState([]); // IDs de cafeterías con reseña
+  const [visitedIds, setVisitedIds] = useState([]); // IDs de cafeterías con reseña del usuario
   const [loading, setLoading] = useState(true);
   const [isLoggedIn, setIsLoggedIn] = useState(false);
   const [userName, setUserName] = useState("");
@@ -48,26 +48,14 @@ const Cafeterias = () => {
       }
 
       try {
-        // 2. Cargar Cafeterías y TODAS las Reseñas en paralelo
-        const [resCafes, resReviews] = await Promise.all([
-            fetch("http://127.0.0.1:8000/api/Tienditas/"),
-            fetch("http://127.0.0.1:8000/api/Resenas/") 
-        ]);
-
+        // 2. Cafeterías con calificación promedio y 'reviewed' (si este usuario ya dejó reseña),
+        //    calculados por el backend: ya no se descarga la tabla completa de reseñas
+        const resCafes = await fetch(`http://127.0.0.1:8000/api/Tienditas/?reviewed_by=${userId}&ordering=-rating_avg`);
         const cafesData = await resCafes.json();
-        const reviewsData = await resReviews.json();
 
         setCafeterias(cafesData);
+        setVisitedIds(cafesData.filter(c => c.reviewed).map(c => c.id_tiendita));
 
-        // 3. Filtrar reseñas del usuario actual
-        // Buscamos qué cafeterías tienen al menos una reseña de este 'userId'
-        const myReviewedCafeIds = reviewsData
-            .filter(r => r.id_usuario === userId)
-            .map(r => r.id_tiendita);
-        
-        // Eliminamos duplicados (Set) y guardamos
-        setVisitedIds([...new Set(myReviewedCafeIds)]);
-        
         setLoading(false);
 
       } catch (err) {
@@ -226,10 +214,18 @@ const Cafeterias = () => {
                             <h3 className={`font-bold text-sm mb-1 leading-tight ${isVisited ? "text-white" : "text-gray-400 group-hover:text-white"}`}>
                                 {cafe.nombre}
                             </h3>
-                            <div className="flex items-center gap-1 text-xs text-gray-500 mb-2">
+                            <div className="flex items-center gap-1 text-xs text-gray-500 mb-1">
                                 <FiMapPin size={10} />
                                 <span className="truncate max-w-[120px]">{cafe.direccion || "Campus Central"}</span>
                             </div>
+                            <div className="flex items-center gap-1 text-xs text-gray-500 mb-2">
+                                <FiStar size={10} className={cafe.rating_count > 0 ? "text-yellow-500" : ""} />
+                                <span>
+                                    {cafe.rating_count > 0
+                                        ? `${cafe.rating_avg.toFixed(1)} (${cafe.rating_count} ${cafe.rating_count === 1 ? "reseña" : "reseñas"})`
+                                        : "Sin reseñas"}
+                                </span>
+                            </div>
                             
                             {/* Call to Action dinámico */}
                             {isVisited ? (
@@ -6,6 +6,7 @@ import Header from "../components/Header";
 import Footer from "../components/Footer";
 import ChatWidget from "../components/ChatWidget";
 import { FiSearch, FiChevronDown, FiFilter, FiX } from 'react-icons/fi';
+import { fetchAllPages } from "../utils/pagination";
 
 // --- ASSETS ---
 import BuhoChef from "../assets/chef.png";
@@ -57,14 +58,14 @@ const Home = () => {
   useEffect(() => {
     const loadData = async () => {
       try {
-        const [resCafes, resMenus, resFacus] = await Promise.all([
+        // Menús viene paginado por cursor: los filtros por comida/precio necesitan todas las páginas
+        const [resCafes, dataMenus, resFacus] = await Promise.all([
             fetch("http://127.0.0.1:8000/api/Tienditas/"),
-            fetch("http://127.0.0.1:8000/api/Menus/"),
+            fetchAllPages("http://127.0.0.1:8000/api/Menus/?page_size=500"),
             fetch("http://127.0.0.1:8000/api/Facultades/")
         ]);
         
         const dataCafes = await resCafes.json();
-        const dataMenus = await resMenus.json();
         const dataFacus = await resFacus.json();
 
         setCafeterias(dataCafes);
@@ -10,6 +10,7 @@ import defaultImage from "../assets/logo.png";
 import MenuIcon from "../assets/menu.png";
 import BuhoZZZ from "../assets/zzz.png"; 
 import BuhoCartel from "../assets/cartel.png"; 
+import { fetchPage } from "../utils/pagination";
 
 // --- MAPA (Leaflet) ---
 import { MapContainer, TileLayer, Marker, Popup } from 'react-leaflet';
@@ -33,6 +34,8 @@ const PlantillaCafeteria = () => {
   const [info, setInfo] = useState(null); 
   const [menuItems, setMenuItems] = useState([]);
   const [reviews, setReviews] = useState([]);
+  const [reviewsNext, setReviewsNext] = useState(null); // URL de la siguiente página de reseñas
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
 
   // Estados Reseñas
@@ -56,23 +59,23 @@ const PlantillaCafeteria = () => {
       }, 4000);
   };
 
+  // Cafetería, facultad, menú (agrupado por categoría), calificación y reseñas recientes en una sola llamada
+  const fetchFull = async () => {
+    const res = await fetch(`http://127.0.0.1:8000/api/Tienditas/${id}/full/`);
+    if (!res.ok) return null;
+    const data = await res.json();
+    setInfo(data);
+    setMenuItems(data.menus.flatMap(grupo => grupo.platillos));
+    setReviews(data.reviews);
+    setReviewsNext(data.reviews_next); // el resto se pide con "Ver más"
+    return data;
+  };
+
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const resInfo = await fetch(`http://127.0.0.1:8000/api/Tienditas/${id}/`);
-        if (!resInfo.ok) {
-            setInfo(null);
-            setLoading(false);
-            return;
-        }
-        const dataInfo = await resInfo.json();
-        setInfo(dataInfo);
-
-        const resMenu = await fetch(`http://127.0.0.1:8000/api/Menus/?id_tiendita=${id}`);
-        const dataMenu = await resMenu.json();
-        setMenuItems(dataMenu);
-
-        fetchResenas();
+        const data = await fetchFull();
+        if (!data) setInfo(null);
         setLoading(false);
       } catch (error) {
         console.error(error);
@@ -82,11 +85,13 @@ const PlantillaCafeteria = () => {
     fetchData();
   }, [id]);
 
-  const fetchResenas = () => {
-    fetch(`http://127.0.0.1:8000/api/Resenas/?id_tiendita=${id}`)
-      .then(res => res.json())
-      .then(data => setReviews(data))
-      .catch(err => console.error(err));
+  const fetchMoreResenas = () => {
+    if (!reviewsNext || loadingMore) return;
+    setLoadingMore(true);
+    fetchPage(reviewsNext)
+      .then(({ results, next }) => { setReviews(prev => [...prev, ...results]); setReviewsNext(next); })
+      .catch(err => console.error(err))
+      .finally(() => setLoadingMore(false));
   };
 
   const handleSubmitResena = async (e) => {
@@ -130,7 +135,8 @@ const PlantillaCafeteria = () => {
         showNotification("¡Reseña publicada con éxito!", "success");
         setRating(0);
         setComentario("");
-        fetchResenas();
+        // Reseñas y promedio (rating_avg / rating_count) vuelven calculados del backend
+        fetchFull().catch(err => console.error(err));
       } else {
         if (res.status === 401) {
             localStorage.clear(); 
@@ -254,8 +260,8 @@ const PlantillaCafeteria = () => {
                 </div>
                 <div className="bg-yellow-500 text-[#141b2d] px-4 py-2 rounded-xl font-bold flex items-center gap-2 shadow-lg">
                     <FaStar /> 
-                    <span>{reviews.length > 0 ? (reviews.reduce((a,b) => a + b.calificacion, 0) / reviews.length).toFixed(1) : "N/A"}</span>
-                    <span className="text-xs font-normal opacity-80">({reviews.length} ops)</span>
+                    <span>{info.rating_count > 0 ? info.rating_avg.toFixed(1) : "N/A"}</span>
+                    <span className="text-xs font-normal opacity-80">({info.rating_count || 0} ops)</span>
                 </div>
              </div>
         </div>
@@ -328,6 +334,11 @@ const PlantillaCafeteria = () => {
                                 </div>
                             ))
                         )}
+                        {reviewsNext && (
+                            <button onClick={fetchMoreResenas} disabled={loadingMore} className="w-full py-2 text-xs font-bold uppercase tracking-wider text-yellow-500 border border-yellow-500/30 rounded-lg hover:bg-yellow-500/10 disabled:opacity-50 transition-colors">
+                                {loadingMore ? "Cargando..." : "Ver más opiniones"}
+                            </button>
+                        )}
                     </div>
                 </div>
             </div>
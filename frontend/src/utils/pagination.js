@@ -0,0 +1,24 @@
+// Listados paginados por cursor del backend: { next, previous, results }.
+// `next` es la URL de la página siguiente (null en la última).
+
+// Recorre todas las páginas y devuelve los elementos juntos.
+// Si el endpoint no está paginado (devuelve un arreglo), lo regresa tal cual.
+export const fetchAllPages = async (url) => {
+  const items = [];
+  let next = url;
+  while (next) {
+    const res = await fetch(next);
+    const data = await res.json();
+    if (Array.isArray(data)) return data;
+    items.push(...data.results);
+    next = data.next;
+  }
+  return items;
+};
+
+// Una sola página: { results, next } para "cargar más" / scroll infinito.
+export const fetchPage = async (url) => {
+  const res = await fetch(url);
+  const data = await res.json();
+  return Array.isArray(data) ? { results: data, next: null } : { results: data.results, next: data.next };
+};
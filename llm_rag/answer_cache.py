@@ -0,0 +1,100 @@
+"""
+🦉 El Búho Tragón - Caché semántica de respuestas
+Reutiliza la respuesta de una pregunta casi idéntica (similitud coseno sobre el embedding
+de la pregunta) dentro del mismo alcance: versión de datos, zona del campus y presupuesto.
+Solo para preguntas sin historial: el motor no consulta ni llena la caché a mitad de una conversación.
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Caché LRU + TTL de respuestas indexada por embedding.
+
+    threshold: similitud coseno mínima para considerar dos preguntas equivalentes.
+    max_entries: tamaño máximo (se desaloja la entrada usada hace más tiempo).
+    ttl_seconds: vida máxima de una respuesta en caché.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 2000, ttl_seconds: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        # entry_id -> (scope, vector normalizado, valor, creado)
+        self._entries = OrderedDict()
+        self._by_scope = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype='float32').reshape(-1)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _drop(self, entry_id: int):
+        scope = self._entries.pop(entry_id)[0]
+        ids = self._by_scope.get(scope)
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_scope[scope]
+
+    def _expire(self, now: float):
+        # Orden LRU, no de creación: se revisan todas, pero el caché es pequeño
+        expired = [eid for eid, entry in self._entries.items() if now - entry[3] > self.ttl_seconds]
+        for eid in expired:
+            self._drop(eid)
+
+    def lookup(self, scope: Hashable, vector) -> Optional[Any]:
+        """Devuelve el valor guardado más parecido si supera el umbral; si no, None."""
+        v = self._normalize(vector)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            ids = list(self._by_scope.get(scope, ()))
+            if ids:
+                sims = np.stack([self._entries[eid][1] for eid in ids]) @ v
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    entry_id = ids[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return self._entries[entry_id][2]
+            self.misses += 1
+            return None
+
+    def store(self, scope: Hashable, vector, value: Any):
+        v = self._normalize(vector)
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (scope, v, value, time.monotonic())
+            self._by_scope.setdefault(scope, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_scope.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            }
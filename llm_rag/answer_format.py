@@ -0,0 +1,142 @@
+"""
+🦉 El Búho Tragón - Limpieza de respuestas del LLM
+Quita tags del modelo y markdown, y fuerza el formato de bullets (•) que espera el ChatWidget.
+Incluye una versión incremental para respuestas en streaming.
+"""
+
+import re
+from typing import Tuple
+
+
+# Tags del modelo que se borran donde aparezcan
+MODEL_TAGS = ["<|im_end|>", "<|im_start|>", "assistant", "user", "system"]
+# Palabra seguida de un espacio (ya terminó de llegar)
+NEXT_WORD_RE = re.compile(r'\S*(?=\s)')
+
+
+def _clean_segment(text: str) -> str:
+    """
+    Pasos de clean_answer sin los strip. Cada patrón solo mira unos cuantos caracteres
+    alrededor, así que IncrementalCleaner puede aplicarlo por tramos.
+    """
+    # Limpieza de tags del modelo
+    for tag in MODEL_TAGS:
+        text = text.replace(tag, "")
+
+    # 1. Eliminar asteriscos de negritas (Markdown)
+    text = text.replace("**", "").replace("__", "")
+
+    # 2. Forzar salto de línea antes de cualquier Bullet (•)
+    # Si encuentra un bullet precedido de espacio, lo cambia por \n•
+    text = text.replace(" •", "\n•")
+    text = text.replace("• ", "\n• ") # Por si el LLM pone el bullet pegado
+
+    # 3. Forzar salto de línea antes de guiones usados como lista
+    # (Solo si hay espacio antes y después, para no romper palabras compuestas)
+    text = re.sub(r'(\s)-\s', r'\n- ', text)
+
+    # 4. Arreglar el inicio de la lista (después de los dos puntos)
+    # Convierte "están en: •" en "están en:\n•"
+    text = text.replace(": •", ":\n•").replace(": -", ":\n-")
+
+    # 5. Eliminar saltos de línea dobles o triples que hayan quedado
+    text = re.sub(r'\n\s*\n', '\n', text)
+
+    return re.sub(r'Respuesta:?\s*', '', text, flags=re.IGNORECASE)
+
+
+def clean_answer(answer: str) -> str:
+    """Limpieza de formato definitiva sobre el texto generado."""
+    return _clean_segment(answer.strip()).strip()
+
+
+class IncrementalCleaner:
+    """
+    Aplica clean_answer mientras llegan tokens sin re-limpiar todo el texto en cada token.
+    El texto crudo se congela por tramos: un corte justo después de un espacio y antes de una
+    palabra completa que no forma un tag no lo cruza ningún patrón de _clean_segment, así que
+    limpiar cada tramo por separado da lo mismo que limpiar todo junto. En cada token solo se
+    limpia la cola sin congelar. Se retienen los últimos HOLDBACK caracteres porque un patrón
+    (" •", "**", "assistant"...) puede quedar partido entre dos tokens. Si la limpieza reescribe
+    algo ya emitido, deja de emitir y la respuesta final (finish) trae el texto completo correcto.
+    """
+
+    HOLDBACK = 16
+
+    def __init__(self):
+        self.raw = ""
+        self.emitted = ""
+        self._settled = ""   # limpieza de raw[:self._cut], ya no cambia
+        self._cut = 0
+        self._scanned = 0    # hasta dónde ya se buscaron cortes
+        self._diverged = False
+
+    def _is_safe_cut(self, pos: int) -> bool:
+        raw = self.raw
+        if not (raw[pos - 1].isspace() and raw[pos].isalnum()):
+            return False
+        # La palabra que sigue ya está completa y no es un tag ni arma uno ("ass<|im_end|>istant")
+        word = NEXT_WORD_RE.match(raw, pos)
+        return (word is not None and '<' not in word.group()
+                and not any(word.group().startswith(tag) for tag in MODEL_TAGS))
+
+    def _clean_tail(self, end: int) -> str:
+        text = self.raw[self._cut:end]
+        return _clean_segment(text.lstrip() if not self._cut else text)
+
+    def _settle(self):
+        """Congela el tramo hasta el último corte seguro que ya tiene HOLDBACK caracteres detrás."""
+        limit = len(self.raw) - self.HOLDBACK
+        start = max(self._cut + 1, self._scanned)
+        self._scanned = max(self._scanned, limit)
+        pos = next((p for p in range(limit, start - 1, -1) if self._is_safe_cut(p)), None)
+        if pos is None:
+            return
+
+        before = len(self._settled)
+        self._settled += self._clean_tail(pos)
+        self._cut = pos
+        if self._settled[:1].isspace():
+            # El strip final de clean_answer
+            self._settled = self._settled.lstrip()
+            before = 0
+        # Lo ya emitido de ese tramo salió de la cola: debe coincidir con lo congelado
+        overlap = self.emitted[before:len(self._settled)]
+        if self._settled[before:before + len(overlap)] != overlap:
+            self._diverged = True
+
+    def feed(self, piece: str) -> str:
+        """Agrega un fragmento generado y devuelve el texto limpio nuevo que ya es seguro mostrar."""
+        self.raw += piece
+        self._settle()
+        if self._diverged:
+            return ""
+
+        settled, tail = self._settled, self._clean_tail(len(self.raw))
+        if not settled:
+            tail = tail.lstrip()
+        visible = len(settled) + len(tail.rstrip()) if tail.strip() else len(settled.rstrip())
+        end = visible - self.HOLDBACK
+        done = len(self.emitted)
+        if end <= done:
+            return ""
+
+        if done > len(settled):
+            # Lo emitido más allá de lo congelado tiene que seguir igual en la cola
+            if not tail.startswith(self.emitted[len(settled):]):
+                self._diverged = True
+                return ""
+            delta = tail[done - len(settled):end - len(settled)]
+        else:
+            delta = settled[done:end] + tail[:max(0, end - len(settled))]
+        self.emitted += delta
+        return delta
+
+    def finish(self) -> Tuple[str, str]:
+        """Devuelve (respuesta limpia completa, último fragmento pendiente)."""
+        answer = clean_answer(self.raw)
+        if self._diverged or not answer.startswith(self.emitted):
+            return answer, ""
+        delta = answer[len(self.emitted):]
+        self.emitted = answer
+        return answer, delta
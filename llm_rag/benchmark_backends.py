@@ -0,0 +1,115 @@
+"""
+🦉 El Búho Tragón - Comparación de backends de inferencia
+Corre el mismo set fijo de preguntas con cada backend (fp32, int8, int4...) y reporta:
+tiempo de carga, memoria residente máxima, tokens/seg y coincidencia de respuestas contra fp32.
+
+Cada backend corre en su propio proceso para que la memoria medida sea solo la suya.
+
+Uso:
+    python benchmark_backends.py                          # rag_engine.py, fp32 vs int8
+    python benchmark_backends.py --backends fp32,int8,int4 --engine hpc --json resultados.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from difflib import SequenceMatcher
+from typing import Dict, List
+
+# Preguntas que no resuelve la ruta rápida: todas pasan por el LLM
+QUESTIONS = [
+    "¿Dónde venden pizzas?",
+    "¿Qué desayunos hay en la cafetería de Derecho?",
+    "Recomiéndame algo vegetariano",
+    "¿Qué bebidas frías venden cerca de Artes?",
+    "¿Dónde puedo comer tacos?",
+    "¿Qué hay de comer en Ingeniería?",
+]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _run_backend(engine: str, backend: str, max_new_tokens: int, questions: List[str]) -> Dict:
+    """Se ejecuta en un proceso nuevo: carga el motor con el backend y responde todas las preguntas."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if engine == 'hpc':
+        from rag_engine_hpc import BuhoRAG
+        rag = BuhoRAG(backend=backend, decoding='greedy', answer_cache=False, prefix_cache=False)
+        rag.generation_kwargs = dict(rag.generation_kwargs, max_new_tokens=max_new_tokens)
+    else:
+        from rag_engine import BuhoRAG
+        rag = BuhoRAG(backend=backend, prefix_cache=False)
+        rag.GENERATION_KWARGS = {'max_new_tokens': max_new_tokens, 'do_sample': False}
+
+    start = time.perf_counter()
+    rag._load_models()
+    load_s = time.perf_counter() - start
+    rag.build_index()
+
+    answers, new_tokens, gen_s = [], 0, 0.0
+    for question in questions:
+        start = time.perf_counter()
+        answer = rag.query(question)['answer']
+        gen_s += time.perf_counter() - start
+        new_tokens += len(rag.tokenizer.encode(answer, add_special_tokens=False))
+        answers.append(answer)
+
+    return {
+        'backend': rag.backend,
+        'load_s': round(load_s, 2),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'tokens_per_s': round(new_tokens / gen_s, 2) if gen_s else 0.0,
+        'answers': answers,
+    }
+
+
+def _agreement(answers: List[str], baseline: List[str]) -> Dict:
+    exact = sum(a.strip() == b.strip() for a, b in zip(answers, baseline))
+    similarity = [SequenceMatcher(None, a, b).ratio() for a, b in zip(answers, baseline)]
+    return {
+        'exact_match': round(exact / len(baseline), 3),
+        'similarity': round(sum(similarity) / len(similarity), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara backends de inferencia del LLM")
+    parser.add_argument('--engine', choices=['cpu', 'hpc'], default='cpu',
+                        help="cpu = rag_engine.py (Qwen 1.5B), hpc = rag_engine_hpc.py (Qwen 14B)")
+    parser.add_argument('--backends', default='fp32,int8',
+                        help="Lista separada por comas; el primero es la línea base")
+    parser.add_argument('--max-new-tokens', type=int, default=120)
+    parser.add_argument('--json', help="Ruta para guardar los resultados completos")
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    ctx = multiprocessing.get_context('spawn')
+
+    results = []
+    for backend in backends:
+        print(f"⚙️ Backend {backend}...")
+        with ctx.Pool(1) as pool:
+            results.append(pool.apply(_run_backend, (args.engine, backend, args.max_new_tokens, QUESTIONS)))
+
+    baseline = results[0]['answers']
+    print(f"\n{'backend':<8} {'carga (s)':>10} {'RSS (MB)':>10} {'tok/s':>8} {'exactas':>8} {'similitud':>10}")
+    for r in results:
+        r.update(_agreement(r['answers'], baseline))
+        print(f"{r['backend']:<8} {r['load_s']:>10} {r['peak_rss_mb']:>10} {r['tokens_per_s']:>8} "
+              f"{r['exact_match']:>8} {r['similarity']:>10}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'engine': args.engine, 'questions': QUESTIONS, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+🦉 El Búho Tragón - Benchmark del motor geográfico
+Compara, sobre N ubicaciones sintéticas alrededor del campus:
+  escalar     -> haversine en Python puro, una cafetería a la vez (como el calculate_distance original)
+  vectorizado -> GeoIndex.distances (una sola llamada NumPy)
+  matriz      -> GeoIndex.distance_matrix para varios puntos de referencia a la vez
+  k vecinos   -> GeoIndex.nearest contra ordenar todas las distancias
+  radio       -> GeoIndex.within contra filtrar todas las distancias
+
+Uso:
+    python benchmark_geo.py
+    python benchmark_geo.py --points 50000 --queries 500
+"""
+
+import argparse
+import time
+from math import atan2, cos, radians, sin, sqrt
+
+import numpy as np
+
+from geo import GeoIndex
+
+# Centro de la Unidad Regional Centro (Hermosillo)
+CAMPUS_LAT, CAMPUS_LON = 29.0829, -110.9603
+
+
+def scalar_distance(lat1, lon1, lat2, lon2):
+    R = 6371000
+    lat1, lon1, lat2, lon2 = map(radians, [float(lat1), float(lon1), float(lat2), float(lon2)])
+    a = sin((lat2-lat1)/2)**2 + cos(lat1) * cos(lat2) * sin((lon2-lon1)/2)**2
+    return R * (2 * atan2(sqrt(a), sqrt(1-a)))
+
+
+def _timed(fn, repeat: int) -> float:
+    """Milisegundos promedio por llamada."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000.0 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de distancias y consultas de cercanía")
+    parser.add_argument('--points', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--radius', type=float, default=300.0, help="Radio en metros")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    # ~1.5 km de dispersión; las coordenadas llegan como texto, igual que en rag_data.json
+    lats = CAMPUS_LAT + rng.normal(0, 0.015, args.points)
+    lons = CAMPUS_LON + rng.normal(0, 0.015, args.points)
+    records = [{'id_tiendita': i, 'latitud': f"{la:.15f}", 'longitud': f"{lo:.15f}"}
+               for i, (la, lo) in enumerate(zip(lats, lons))]
+    refs = np.column_stack([CAMPUS_LAT + rng.normal(0, 0.01, args.queries),
+                            CAMPUS_LON + rng.normal(0, 0.01, args.queries)])
+
+    start = time.perf_counter()
+    geo = GeoIndex.from_records(records)
+    build_ms = (time.perf_counter() - start) * 1000.0
+
+    def scalar_all(lat, lon):
+        return [scalar_distance(lat, lon, r['latitud'], r['longitud']) for r in records]
+
+    # Cada medición toma su propio punto de referencia
+    q = iter(refs)
+    scalar_ms = _timed(lambda: scalar_all(*next(q)), min(args.queries, 20))
+    q = iter(refs)
+    vector_ms = _timed(lambda: geo.distances(*next(q)), args.queries)
+    matrix_ms = _timed(lambda: geo.distance_matrix(refs[:, 0], refs[:, 1]), 5) / args.queries
+
+    q = iter(refs)
+    knn_ms = _timed(lambda: geo.nearest(*next(q), k=args.k), args.queries)
+    q = iter(refs)
+    knn_full_ms = _timed(lambda: np.argsort(geo.distances(*next(q)))[:args.k], args.queries)
+    q = iter(refs)
+    radius_ms = _timed(lambda: geo.within(*next(q), args.radius), args.queries)
+    q = iter(refs)
+    radius_full_ms = _timed(lambda: np.flatnonzero(geo.distances(*next(q)) <= args.radius), args.queries)
+
+    # Verificación: el índice da exactamente lo mismo que la búsqueda exhaustiva
+    for lat, lon in refs[:20]:
+        dist = geo.distances(lat, lon)
+        assert [pid for pid, _ in geo.nearest(lat, lon, k=args.k)] == [geo.ids[i] for i in np.argsort(dist, kind='stable')[:args.k]]
+        assert {pid for pid, _ in geo.within(lat, lon, args.radius)} == {geo.ids[i] for i in np.flatnonzero(dist <= args.radius)}
+
+    print(f"📍 {args.points} ubicaciones, {args.queries} puntos de referencia (índice construido en {build_ms:.1f} ms)\n")
+    print(f"{'operación':<34} {'ms/consulta':>12} {'vs escalar':>11}")
+    rows = [
+        ("distancias: escalar (Python)", scalar_ms),
+        ("distancias: vectorizado", vector_ms),
+        ("distancias: matriz (por punto)", matrix_ms),
+        (f"k={args.k} vecinos: ordenar todo", knn_full_ms),
+        (f"k={args.k} vecinos: GeoIndex.nearest", knn_ms),
+        (f"radio {args.radius:.0f} m: filtrar todo", radius_full_ms),
+        (f"radio {args.radius:.0f} m: GeoIndex.within", radius_ms),
+    ]
+    for name, ms in rows:
+        print(f"{name:<34} {ms:>12.3f} {scalar_ms / ms:>10.0f}x")
+
+
+if __name__ == "__main__":
+    main()
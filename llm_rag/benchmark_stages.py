@@ -0,0 +1,280 @@
+"""
+🦉 El Búho Tragón - Latencia por etapa del motor RAG (rag_engine_hpc.py)
+Corre el set versionado de benchmark_questions.json por BuhoRAG.query y reporta p50/p95/p99 de:
+  data_load    -> load_data() (una vez por corrida)
+  index_build  -> build_index() en frío, con caché en disco vacía (una vez por corrida)
+  parse        -> presupuesto + alias de ubicación
+  index        -> cambios pendientes del índice durante la consulta
+  fast_path    -> ruta rápida (precios, horarios, lo más barato)
+  embed        -> embedding de la pregunta
+  search       -> búsqueda FAISS, re-rank por distancia y armado de documentos
+  prompt       -> historial + empaquetado por tokens + plantilla
+  generate     -> LLM
+  cleanup      -> clean_answer
+  total        -> consulta completa
+
+Por defecto no descarga nada: embeddings por hashing de n-gramas y un LLM stub determinista que
+arma la respuesta con las cafeterías del prompt. Con --embedder y --llm real se miden los modelos
+de verdad. Con el stub las respuestas son reproducibles: su hash queda en el JSON para detectar
+cambios de comportamiento además de cambios de latencia.
+
+Uso:
+    python benchmark_stages.py                                  # offline, 5 corridas
+    python benchmark_stages.py --runs 20 --json etapas.json
+    python benchmark_stages.py --stub-ms-per-token 15           # simula la decodificación
+    python benchmark_stages.py --embedder paraphrase-multilingual-MiniLM-L12-v2 --llm real
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+from stage_timer import QUERY_STAGES
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_questions.json")
+
+# Etapas de arranque (una muestra por corrida) seguidas de las de cada consulta
+STAGES = ('data_load', 'index_build') + QUERY_STAGES + ('total',)
+
+TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+
+
+class HashingEmbedder:
+    """
+    Embeddings locales sin modelo: palabras y trigramas de caracteres hasheados en `dim` dimensiones,
+    normalizados. Misma interfaz encode() que SentenceTransformer; deterministas entre procesos.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = TOKEN_RE.findall(text.lower())
+        grams = [w[i:i + 3] for w in words for i in range(max(1, len(w) - 2))]
+        return words + grams
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+                out[row, h % self.dim] += 1.0 if (h >> 63) else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+class StubTokenizer:
+    """Cuenta palabras y signos como tokens: suficiente para el presupuesto de ContextPacker."""
+
+    eos_token_id = 0
+    pad_token_id = 0
+
+    def encode(self, text: str, add_special_tokens: bool = False) -> List[str]:
+        return TOKEN_RE.findall(text)
+
+
+class StubPipeline:
+    """
+    LLM determinista con la interfaz del pipeline de text-generation: responde con las primeras
+    cafeterías del bloque de datos y sus primeros platillos, en el formato (con markdown) que luego
+    limpia clean_answer. ms_per_token simula la decodificación sobre los tokens generados.
+    """
+
+    CAFETERIA_RE = re.compile(r'^CAFETERÍA: (.+)$', re.MULTILINE)
+    DISH_RE = re.compile(r'^- (.+?) \(\$([\d.]+)', re.MULTILINE)
+
+    def __init__(self, tokenizer: StubTokenizer, ms_per_token: float = 0.0, max_new_tokens: int = 300):
+        self.tokenizer = tokenizer
+        self.ms_per_token = ms_per_token
+        self.max_new_tokens = max_new_tokens
+
+    def _answer(self, prompt: str) -> str:
+        blocks = self.CAFETERIA_RE.split(prompt)[1:]
+        if not blocks:
+            return "No encontré esa información en el menú."
+        lines = ["Te recomiendo:"]
+        for name, body in zip(blocks[0::2][:3], blocks[1::2][:3]):
+            dishes = ", ".join(f"{d} (${p})" for d, p in self.DISH_RE.findall(body)[:2])
+            lines.append(f" • **{name.strip()}**: {dishes or 'ver menú'}")
+        return " ".join(lines) + "<|im_end|>"
+
+    def __call__(self, prompt: str, max_new_tokens: int = None, **kwargs) -> List[Dict]:
+        text = self._answer(prompt)
+        tokens = self.tokenizer.encode(text)
+        limit = max_new_tokens or self.max_new_tokens
+        if len(tokens) > limit:
+            # Los tokens del stub son palabras y signos: el recorte se vuelve a unir con espacios
+            tokens = tokens[:limit]
+            text = " ".join(tokens)
+        if self.ms_per_token:
+            time.sleep(len(tokens) * self.ms_per_token / 1000)
+        return [{'generated_text': text}]
+
+
+def load_questions(path: str) -> Dict:
+    with open(path, 'rb') as f:
+        raw = f.read()
+    data = json.loads(raw.decode('utf-8'))
+    data['sha256'] = hashlib.sha256(raw).hexdigest()
+    return data
+
+
+def _percentiles(samples: List[float]) -> Dict:
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        'n': len(samples),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'mean_ms': round(float(np.mean(samples)), 3),
+    }
+
+
+def _shared_models(args) -> Dict:
+    """Modelos que se cargan una vez y se reutilizan en cada corrida (atributos de BuhoRAG)."""
+    models = {}
+    if args.embedder == 'hashing':
+        models['embedding_model'] = HashingEmbedder(args.hashing_dim)
+    else:
+        from sentence_transformers import SentenceTransformer
+        models['embedding_model'] = SentenceTransformer(args.embedder, device='cpu')
+    if args.llm == 'stub':
+        tokenizer = StubTokenizer()
+        models.update(tokenizer=tokenizer, device='cpu', dtype=None,
+                      llm_pipeline=StubPipeline(tokenizer, args.stub_ms_per_token))
+    return models
+
+
+def run(args, questions: List[Dict]) -> Dict:
+    from rag_engine_hpc import BuhoRAG
+
+    start = time.perf_counter()
+    models = _shared_models(args)
+    samples = {stage: [] for stage in STAGES}
+    per_question = {q['id']: {'totals': [], 'answers': set(), 'fast_path': False} for q in questions}
+
+    for n in range(args.runs):
+        # Caché de índice vacía en cada corrida: index_build siempre mide la construcción en frío
+        with tempfile.TemporaryDirectory() as cache_dir:
+            rag = BuhoRAG(data_path=args.data, cache_dir=cache_dir, batching=False, decoding='greedy',
+                          answer_cache=False, prefix_cache=False, retrieval=args.retrieval, open_filter='off')
+            for name, value in models.items():
+                setattr(rag, name, value)
+            if 'llm_pipeline' not in models:
+                # LLM real: se carga fuera de las etapas medidas y se comparte con las corridas siguientes
+                rag._load_models()
+                models.update({name: getattr(rag, name)
+                               for name in ('llm_model', 'llm_pipeline', 'tokenizer', 'device', 'dtype')})
+
+            t = time.perf_counter()
+            rag.load_data()
+            samples['data_load'].append((time.perf_counter() - t) * 1000)
+            t = time.perf_counter()
+            rag.build_index()
+            samples['index_build'].append((time.perf_counter() - t) * 1000)
+
+
+            for q in questions:
+                result = rag.query(q['text'], q.get('lat'), q.get('lon'), session_id=f"bench-{q['id']}")
+                for stage, ms in result['timings'].items():
+                    samples[stage].append(ms)
+                stats = per_question[q['id']]
+                stats['totals'].append(result['timings']['total'])
+                stats['answers'].add(hashlib.sha1(result['answer'].encode('utf-8')).hexdigest()[:12])
+                stats['fast_path'] = result['fast_path']
+        print(f"⏱️ Corrida {n + 1}/{args.runs} lista")
+
+    return {
+        'setup_s': round(time.perf_counter() - start, 2),
+        'stages': {stage: _percentiles(s) for stage, s in samples.items() if s},
+        'questions': [
+            {
+                'id': qid,
+                'path': 'fast_path' if stats['fast_path'] else 'llm',
+                'total_p50_ms': round(float(np.median(stats['totals'])), 3),
+                'answer_sha1': sorted(stats['answers']),
+            }
+            for qid, stats in per_question.items()
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia por etapa de BuhoRAG.query (p50/p95/p99)")
+    parser.add_argument('--questions', default=QUESTIONS_PATH, help="Set de preguntas versionado (JSON)")
+    parser.add_argument('--data', default=None, help="rag_data JSON (default: rag_data_fixed.json)")
+    parser.add_argument('--runs', type=int, default=5, help="Corridas completas del set, cada una con motor nuevo")
+    parser.add_argument('--retrieval', choices=['grouped', 'dish'], default='grouped')
+    parser.add_argument('--embedder', default='hashing',
+                        help="'hashing' (local, sin descargas) o ruta/id de un modelo de sentence-transformers")
+    parser.add_argument('--hashing-dim', type=int, default=384)
+    parser.add_argument('--llm', choices=['stub', 'real'], default='stub')
+    parser.add_argument('--stub-ms-per-token', type=float, default=0.0,
+                        help="Latencia simulada por token generado del LLM stub")
+    parser.add_argument('--json', help="Ruta para guardar los resultados")
+    parser.add_argument('--verbose', action='store_true', help="Mostrar el log del motor")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import rag_engine_hpc  # noqa: F401  (configura el logging del motor)
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    question_set = load_questions(args.questions)
+    questions = question_set['questions']
+    print(f"🧪 Set v{question_set['version']}: {len(questions)} preguntas x {args.runs} corridas "
+          f"(embedder={args.embedder}, llm={args.llm})")
+
+    report = run(args, questions)
+
+    print(f"\n{'etapa':<12} {'n':>5} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10} {'media (ms)':>11}")
+    for stage in STAGES:
+        s = report['stages'].get(stage)
+        if s:
+            print(f"{stage:<12} {s['n']:>5} {s['p50_ms']:>10} {s['p95_ms']:>10} {s['p99_ms']:>10} {s['mean_ms']:>11}")
+
+    unstable = [q['id'] for q in report['questions'] if len(q['answer_sha1']) > 1]
+    if unstable:
+        print(f"\n⚠️ Respuestas distintas entre corridas: {', '.join(unstable)}")
+
+    if args.json:
+        output = {
+            'benchmark': 'stages',
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'question_set': {
+                'path': os.path.basename(args.questions),
+                'version': question_set['version'],
+                'sha256': question_set['sha256'],
+                'size': len(questions),
+            },
+            'config': {
+                'engine': 'hpc',
+                'runs': args.runs,
+                'retrieval': args.retrieval,
+                'embedder': f"hashing-{args.hashing_dim}" if args.embedder == 'hashing' else args.embedder,
+                'llm': args.llm,
+                'stub_ms_per_token': args.stub_ms_per_token if args.llm == 'stub' else None,
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'cpus': os.cpu_count(),
+            },
+            **report,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+🦉 El Búho Tragón - Empaquetado de contexto por presupuesto de tokens
+Mide con el tokenizer del modelo el prompt fijo, el historial y los documentos recuperados,
+y llena un presupuesto de tokens en orden de relevancia. Los documentos que no caben completos
+se recortan por líneas (nunca a media línea) en vez de descartarse.
+"""
+
+from typing import List, Tuple
+
+
+class ContextPacker:
+    """
+    tokenizer: tokenizer de Hugging Face del LLM (se usa encode sin tokens especiales).
+    budget: tokens máximos del prompt completo (plantilla + historial + datos).
+    history_share: fracción máxima del presupuesto que puede ocupar el historial.
+    """
+
+    # Líneas cuyo conteo se recuerda (los documentos se repiten mucho entre consultas)
+    LINE_CACHE_SIZE = 50000
+
+    def __init__(self, tokenizer, budget: int = 2048, history_share: float = 0.25):
+        self.tokenizer = tokenizer
+        self.budget = budget
+        self.history_share = history_share
+        self._line_tokens = {}
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def _count_line(self, line: str) -> int:
+        n = self._line_tokens.get(line)
+        if n is None:
+            if len(self._line_tokens) >= self.LINE_CACHE_SIZE:
+                self._line_tokens.clear()
+            # +1 por el salto de línea que las une
+            n = self.count(line) + 1
+            self._line_tokens[line] = n
+        return n
+
+    def _fit_lines(self, text: str, available: int) -> Tuple[str, int]:
+        """Prefijo del texto (por líneas completas) que cabe en `available` tokens."""
+        kept, used = [], 0
+        for line in text.split("\n"):
+            n = self._count_line(line)
+            if used + n > available:
+                break
+            kept.append(line)
+            used += n
+        return "\n".join(kept), used
+
+    def pack(self, base_tokens: int, history: List[str], docs: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        base_tokens: tokens de la plantilla sin historial ni datos (sistema, pregunta, etc.).
+        history: turnos del más viejo al más reciente; se conservan los más recientes que quepan.
+        docs: documentos en orden de relevancia.
+        Devuelve (turnos de historial, documentos) que caben en el presupuesto.
+        """
+        available = max(0, self.budget - base_tokens)
+
+        kept_history = []
+        history_budget = int(available * self.history_share)
+        for turn in reversed(history):
+            n = sum(self._count_line(line) for line in turn.split("\n"))
+            if n > history_budget:
+                break
+            kept_history.insert(0, turn)
+            history_budget -= n
+            available -= n
+
+        packed = []
+        for doc in docs:
+            text, used = self._fit_lines(doc, available)
+            # Un documento reducido a su primera línea (el nombre) no le sirve al modelo
+            if text.count("\n") < 1:
+                break
+            packed.append(text)
+            available -= used
+            if text != doc:
+                break
+        return kept_history, packed
@@ -0,0 +1,105 @@
+"""
+🦉 El Búho Tragón - Memoria conversacional por sesión
+Cada usuario tiene su propio historial acotado; las sesiones inactivas expiran
+y la memoria total del proceso tiene un techo (se desalojan las menos recientes).
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationStore:
+    """
+    Historial de conversación indexado por session_id.
+
+    - max_turns: turnos guardados por sesión
+    - ttl_seconds: una sesión sin actividad por más de este tiempo se descarta
+    - max_sessions / max_total_chars: techo global; al excederlo se desaloja la sesión LRU
+    """
+
+    def __init__(self, max_turns: int = 10, ttl_seconds: float = 1800,
+                 max_sessions: int = 1000, max_total_chars: int = 2_000_000):
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_total_chars = max_total_chars
+
+        # session_id -> [deque de (pregunta, respuesta), último acceso, caracteres]
+        self._sessions = OrderedDict()
+        self._total_chars = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, session_id: str):
+        entry = self._sessions.pop(session_id, None)
+        if entry:
+            self._total_chars -= entry[2]
+
+    def _evict_expired(self, now: float):
+        # OrderedDict en orden LRU: las expiradas están al principio
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry[1] <= self.ttl_seconds:
+                break
+            self._drop(session_id)
+
+    def _evict_over_limit(self):
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._total_chars > self.max_total_chars):
+            session_id = next(iter(self._sessions))
+            logger.info(f"🧹 Sesión desalojada por límite de memoria: {session_id[:8]}")
+            self._drop(session_id)
+
+    def get_history(self, session_id: str, last_n: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Últimos turnos de la sesión (lista vacía si no existe o expiró)."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            entry[1] = now
+            self._sessions.move_to_end(session_id)
+            turns = list(entry[0])
+        return turns[-last_n:] if last_n else turns
+
+    def append(self, session_id: str, question: str, answer: str):
+        now = time.monotonic()
+        size = len(question) + len(answer)
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = [deque(maxlen=self.max_turns), now, 0]
+                self._sessions[session_id] = entry
+
+            turns = entry[0]
+            if len(turns) == turns.maxlen:
+                old_q, old_a = turns[0]
+                entry[2] -= len(old_q) + len(old_a)
+                self._total_chars -= len(old_q) + len(old_a)
+            turns.append((question, answer))
+            entry[1] = now
+            entry[2] += size
+            self._total_chars += size
+            self._sessions.move_to_end(session_id)
+            self._evict_over_limit()
+
+    def turn_count(self, session_id: str) -> int:
+        """Turnos guardados (0 si no existe o expiró); solo consulta, no renueva la sesión."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._sessions.get(session_id)
+            return len(entry[0]) if entry else 0
+
+    def reset(self, session_id: str):
+        with self._lock:
+            self._drop(session_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'sessions': len(self._sessions), 'total_chars': self._total_chars}
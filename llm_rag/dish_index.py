@@ -0,0 +1,211 @@
+"""
+🦉 El Búho Tragón - Índice por platillo con búsqueda híbrida
+Cada fila de Menus es un documento (con cafetería, categoría y precio como metadata).
+La búsqueda fusiona puntajes léxicos BM25 con puntajes vectoriales de FAISS.
+"""
+
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from fast_path import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class BM25Index:
+    """BM25 clásico sobre listas invertidas de NumPy."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = 0
+        self.postings = {}
+        self.idf = {}
+        self.doc_len = np.zeros(0, dtype='float32')
+
+    def build(self, texts: List[str]):
+        tokenized = [tokenize(t) for t in texts]
+        self.n_docs = len(tokenized)
+        self.doc_len = np.array([len(toks) for toks in tokenized], dtype='float32')
+        avg_len = float(self.doc_len.mean()) if self.n_docs else 1.0
+
+        term_freqs = {}
+        for doc, toks in enumerate(tokenized):
+            counts = {}
+            for tok in toks:
+                counts[tok] = counts.get(tok, 0) + 1
+            for tok, tf in counts.items():
+                term_freqs.setdefault(tok, []).append((doc, tf))
+
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / (avg_len or 1.0))
+        self.postings, self.idf = {}, {}
+        for tok, entries in term_freqs.items():
+            docs = np.array([d for d, _ in entries], dtype='int64')
+            tfs = np.array([tf for _, tf in entries], dtype='float32')
+            # Se guarda ya el factor de saturación de tf de cada documento
+            self.postings[tok] = (docs, tfs * (self.k1 + 1) / (tfs + norm[docs]))
+            df = len(entries)
+            self.idf[tok] = float(np.log(1 + (self.n_docs - df + 0.5) / (df + 0.5)))
+
+    def scores(self, query: str) -> np.ndarray:
+        out = np.zeros(self.n_docs, dtype='float32')
+        for tok in set(tokenize(query)):
+            if tok in self.postings:
+                docs, weights = self.postings[tok]
+                out[docs] += self.idf[tok] * weights
+        return out
+
+
+class DishIndex:
+    """
+    Índice vectorial (IDMap2 con id = id_menu) + BM25 sobre platillos individuales.
+    search() devuelve (id_menu, puntaje fusionado) de mayor a menor.
+    """
+
+    def __init__(self, encoder, alpha: float = 0.5, pool: int = 50):
+        self.encoder = encoder
+        self.alpha = alpha
+        self.pool = pool
+
+        self.meta = {}
+        self.texts = {}
+        self.faiss_index = None
+        self._mmapped = False
+        self.bm25 = BM25Index()
+        self._bm25_ids = np.zeros(0, dtype='int64')
+
+    @staticmethod
+    def render(menu: Dict, tienda: Dict) -> str:
+        nombre_tienda = re.sub(r'([a-z])([A-Z])', r'\1 \2', tienda.get('nombre', 'Desconocida'))
+        precio = float(menu['precio'])
+        parts = [menu['nombre'].strip().replace("\n", " ")]
+        if menu.get('categoria'):
+            parts.append(menu['categoria'])
+        parts.append(nombre_tienda)
+        parts.append(f"${precio:.0f} MXN")
+        text = " | ".join(parts)
+        if menu.get('descripcion'):
+            text += f". {menu['descripcion']}"
+        return text
+
+    def _rows(self, data: Dict, menu_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, str, Dict]]:
+        tiendas = {t.get('id_tiendita'): t for t in data.get('tienditas', [])}
+        wanted = set(menu_ids) if menu_ids is not None else None
+        rows = []
+        for m in data.get('menus', []):
+            if wanted is not None and m.get('id_menu') not in wanted:
+                continue
+            tienda = tiendas.get(m.get('id_tiendita'))
+            if tienda is None:
+                continue
+            try:
+                text = self.render(m, tienda)
+                precio = float(m['precio'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            rows.append((m['id_menu'], text, {
+                'id_menu': m['id_menu'],
+                'id_tiendita': m.get('id_tiendita'),
+                'nombre': m['nombre'].strip().replace("\n", " "),
+                'categoria': m.get('categoria') or '',
+                'precio': precio,
+            }))
+        return rows
+
+    def _rebuild_lexical(self):
+        self._bm25_ids = np.array(list(self.texts.keys()), dtype='int64')
+        self.bm25.build([self.texts[i] for i in self._bm25_ids])
+
+    def build(self, data: Dict) -> np.ndarray:
+        """Codifica todos los platillos y devuelve la matriz de embeddings (para la caché en disco)."""
+        rows = self._rows(data)
+        self.texts = {mid: text for mid, text, _ in rows}
+        self.meta = {mid: meta for mid, _, meta in rows}
+
+        embeddings = np.array(self.encoder.encode([text for _, text, _ in rows], show_progress_bar=False)).astype('float32')
+        self.faiss_index = faiss.IndexIDMap2(faiss.IndexFlatL2(embeddings.shape[1]))
+        self.faiss_index.add_with_ids(embeddings, np.array([mid for mid, _, _ in rows], dtype='int64'))
+        self._mmapped = False
+        self._rebuild_lexical()
+        logger.info(f"🍽️ Índice por platillo construido ({len(rows)} platillos)")
+        return embeddings
+
+    def load(self, texts: List[str], meta: List[Dict], index):
+        """Restaura el índice desde la caché en disco."""
+        self.meta = {m['id_menu']: m for m in meta}
+        self.texts = {m['id_menu']: text for m, text in zip(meta, texts)}
+        self.faiss_index = index
+        self._mmapped = True
+        self._rebuild_lexical()
+
+    def export(self) -> Tuple[List[str], List[Dict]]:
+        ids = list(self.meta.keys())
+        return [self.texts[i] for i in ids], [self.meta[i] for i in ids]
+
+    def update(self, data: Dict, menu_ids: Iterable[int]) -> int:
+        """Re-embebe los platillos indicados (o los quita si ya no existen). Devuelve cuántos se codificaron."""
+        menu_ids = set(menu_ids)
+        if not menu_ids:
+            return 0
+        if self._mmapped:
+            self.faiss_index = faiss.clone_index(self.faiss_index)
+            self._mmapped = False
+
+        self.faiss_index.remove_ids(np.array(sorted(menu_ids), dtype='int64'))
+        for mid in menu_ids:
+            self.meta.pop(mid, None)
+            self.texts.pop(mid, None)
+
+        rows = self._rows(data, menu_ids)
+        if rows:
+            vectors = np.array(self.encoder.encode([text for _, text, _ in rows], show_progress_bar=False)).astype('float32')
+            self.faiss_index.add_with_ids(vectors, np.array([mid for mid, _, _ in rows], dtype='int64'))
+            for mid, text, meta in rows:
+                self.texts[mid] = text
+                self.meta[mid] = meta
+
+        self._rebuild_lexical()
+        return len(rows)
+
+    @staticmethod
+    def _minmax(values: np.ndarray) -> np.ndarray:
+        span = values.max() - values.min()
+        return (values - values.min()) / span if span > 0 else np.ones_like(values)
+
+    def search(self, query: str, q_emb: np.ndarray, k: int = 30,
+               allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Fusión lineal de puntajes: alpha * vectorial + (1 - alpha) * BM25, ambos normalizados a [0, 1].
+        allowed: id_menu permitidos (p. ej. los que caben en el presupuesto); se filtra antes de rankear.
+        """
+        if self.faiss_index is None or self.faiss_index.ntotal == 0:
+            return []
+        if allowed is not None and len(allowed) == 0:
+            return []
+
+        pool = min(self.pool, self.faiss_index.ntotal)
+        params = None
+        if allowed is not None:
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(np.asarray(allowed, dtype='int64')))
+        D, I = self.faiss_index.search(np.array(q_emb).astype('float32'), pool, params=params)
+        vec_ids = I[0][I[0] >= 0]
+        vec_scores = dict(zip(vec_ids.tolist(), self._minmax(-D[0][:len(vec_ids)]).tolist())) if len(vec_ids) else {}
+
+        lexical = self.bm25.scores(query)
+        if allowed is not None:
+            lexical = np.where(np.isin(self._bm25_ids, allowed), lexical, 0.0)
+        lex_scores = {}
+        if lexical.any():
+            top = np.argsort(-lexical)[:pool]
+            top = top[lexical[top] > 0]
+            lex_scores = dict(zip(self._bm25_ids[top].tolist(), self._minmax(lexical[top]).tolist()))
+
+        fused = {
+            mid: self.alpha * vec_scores.get(mid, 0.0) + (1 - self.alpha) * lex_scores.get(mid, 0.0)
+            for mid in set(vec_scores) | set(lex_scores)
+        }
+        return sorted(fused.items(), key=lambda x: -x[1])[:k]
@@ -0,0 +1,246 @@
+"""
+🦉 El Búho Tragón - Ruta rápida sin LLM
+Responde directamente desde los datos las preguntas de forma fija:
+precio de un platillo, horario de una cafetería y lo más barato (con o sin presupuesto).
+Solo si la intención y sus entidades (cafetería, platillo, presupuesto, lugar) cubren toda la
+pregunta y no hay historial; todo lo demás regresa None y sigue por FAISS + LLM.
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Optional, Set
+
+from geo import GeoIndex
+from menu_index import MenuPriceIndex
+
+# Palabras que no dicen nada del platillo ni de la cafetería
+STOPWORDS = {
+    'el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas', 'de', 'del', 'en', 'y', 'o', 'a', 'al',
+    'que', 'cual', 'cuales', 'es', 'son', 'hay', 'me', 'mi', 'con', 'por', 'para', 'lo', 'se',
+    'donde', 'venden', 'tienen', 'cafeteria', 'cafe', 'cerca', 'pesos', 'mxn', 'tengo', 'puedo',
+    'comer', 'comprar', 'pedir', 'alcanza', 'mas', 'barato', 'barata', 'baratos', 'baratas',
+    'economico', 'economica', 'economicos', 'economicas', 'cosa', 'algo', 'quiero',
+}
+GENERIC_STORE_WORDS = {'cafeteria', 'de', 'la', 'el', 'los', 'las', 'y'}
+
+# Palabras que no cambian lo que se pregunta: lo que quede fuera de esto, de la intención y de sus
+# entidades es contenido que la ruta rápida no entendió ("saludable", "que venden pizza")
+FILLER_WORDS = {
+    'el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas', 'de', 'del', 'en', 'y', 'o', 'a', 'al',
+    'que', 'cual', 'cuales', 'es', 'son', 'hay', 'me', 'mi', 'te', 'lo', 'se', 'con', 'por', 'para',
+    'cafeteria', 'cafe', 'dime', 'oye', 'hola', 'porfa', 'favor', 'quisiera', 'saber', 'sabes',
+    'puedes', 'podrias', 'decir', 'recomiendas', 'recomiendame', 'hoy', 'ahora', 'ya',
+}
+BUDGET_WORDS = {'peso', 'pesos', 'mxn', '$', 'tengo', 'traigo', 'con', 'solo', 'nomas'}
+NEARBY_WORDS = {'cerca', 'aqui', 'aca', 'cercana', 'cercanas', 'cercano', 'cercanos'}
+
+PRICE_RE = re.compile(r'\b(?:cuanto (?:cuesta|cuestan|vale|valen|sale|salen)\b|precio (?:de |del )?|a como (?:esta|estan|sale|salen)\b)\s*(.*)')
+HOURS_RE = re.compile(r'\b(?:a que hora (?:abre|abren|cierra|cierran)|hasta que hora|horario|horarios)\b')
+CHEAPEST_RE = re.compile(r'\b(?:mas barat[oa]s?|mas economic[oa]s?)\b')
+BUDGET_QUESTION_RE = re.compile(r'\b(?:que (?:puedo )?(?:comer|comprar|pedir)|me alcanza|alcanza)\b')
+LEADING_ARTICLE_RE = re.compile(r'^(?:el|la|los|las|un|una|unos|unas)\s+')
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin acentos y sin signos: 'Cuánto cuesta?' -> 'cuanto cuesta'"""
+    text = unicodedata.normalize('NFD', text.lower())
+    text = ''.join(c for c in text if unicodedata.category(c) != 'Mn')
+    return re.sub(r'[^a-z0-9$]+', ' ', text).strip()
+
+
+def _stem(word: str) -> str:
+    """Singular ingenuo para comparar 'tortas' con 'torta'."""
+    if len(word) > 4 and word.endswith('es'):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens normalizados y en singular (los comparten la ruta rápida y BM25)."""
+    return [_stem(w) for w in normalize(text).split()]
+
+
+def _stems(words) -> Set[str]:
+    return set(words) | {_stem(w) for w in words}
+
+
+FILLER_STEMS = _stems(FILLER_WORDS)
+BUDGET_STEMS = _stems(BUDGET_WORDS)
+NEARBY_STEMS = _stems(NEARBY_WORDS)
+
+
+class FastPathRouter:
+    """
+    Índices en memoria sobre menus y tienditas para contestar sin generar.
+    geo (GeoIndex de las mismas cafeterías) resuelve las más cercanas.
+    """
+
+    MAX_ITEMS = 8
+    NEAREST_STORES = 3
+
+    def __init__(self, data: Dict, geo: GeoIndex):
+        self.geo = geo
+        self.stores = {}
+        self.items = []
+        self.dish_index = {}
+
+        for t in data.get('tienditas', []):
+            nombre = re.sub(r'([a-z])([A-Z])', r'\1 \2', t.get('nombre') or 'Desconocida')
+            self.stores[t.get('id_tiendita')] = {**t, 'nombre_limpio': nombre}
+
+        for m in data.get('menus', []):
+            if m.get('id_tiendita') not in self.stores:
+                continue
+            try:
+                precio = float(m['precio'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            pos = len(self.items)
+            self.items.append({
+                'nombre': (m.get('nombre') or '').strip().replace("\n", " "),
+                'precio': precio,
+                'id_tiendita': m.get('id_tiendita'),
+                'tokens': set(tokenize(m.get('nombre') or '')),
+            })
+            for tok in self.items[pos]['tokens']:
+                self.dish_index.setdefault(tok, set()).add(pos)
+
+        # Precios ordenados (global y por cafetería) para "lo más barato" y "qué me alcanza"
+        self.prices = MenuPriceIndex([i['precio'] for i in self.items], [i['id_tiendita'] for i in self.items])
+
+        # Palabras distintivas de cada cafetería; las que también son platillos ('tortas') no bastan solas
+        self.store_tokens = {}
+        for tid, t in self.stores.items():
+            words = {_stem(w) for w in normalize(t['nombre_limpio']).split()
+                     if w not in GENERIC_STORE_WORDS and not w.isdigit()}
+            distinctive = {w for w in words if w not in self.dish_index}
+            self.store_tokens[tid] = distinctive or words
+
+    # ----------------------------------------
+    # Helpers
+    # ----------------------------------------
+
+    def _match_stores(self, tokens: Set[str]) -> List[int]:
+        return [tid for tid, words in self.store_tokens.items() if words and words & tokens]
+
+    def _nearest_stores(self, lat: float, lon: float) -> List[int]:
+        return [tid for tid, _ in self.geo.nearest(lat, lon, k=self.NEAREST_STORES)]
+
+    def _find_dishes(self, words: List[str]) -> List[int]:
+        """Platillos cuyo nombre contiene todas las palabras (los de nombre exacto primero)."""
+        words = [w for w in words if w not in STOPWORDS]
+        if not words or any(w not in self.dish_index for w in words):
+            return []
+        matches = set.intersection(*(self.dish_index[w] for w in words))
+        wanted = set(words)
+        return sorted(matches, key=lambda i: (self.items[i]['tokens'] != wanted, len(self.items[i]['tokens']), self.items[i]['precio']))
+
+    def _store_words(self, store_ids: List[int]) -> Set[str]:
+        return {w for tid in store_ids for w in tokenize(self.stores[tid]['nombre_limpio'])}
+
+    @staticmethod
+    def _covers(text: str, covered: Set[str]) -> bool:
+        """True si cada palabra de `text` es relleno o una entidad ya reconocida."""
+        return all(w in FILLER_STEMS or w in covered for w in tokenize(text))
+
+    def _bullet(self, pos: int) -> str:
+        item = self.items[pos]
+        store = self.stores[item['id_tiendita']]['nombre_limpio']
+        return f"• {store}: {item['nombre']} (${item['precio']:.0f})"
+
+    # ----------------------------------------
+    # Intenciones
+    # ----------------------------------------
+
+    def _answer_price(self, phrase: str, store_ids: List[int]) -> Optional[str]:
+        # "la torta cubana en derecho?" -> "torta cubana"
+        phrase = LEADING_ARTICLE_RE.sub('', phrase.split(' en ')[0]).strip()
+        matches = self._find_dishes([_stem(w) for w in phrase.split()])
+        if store_ids:
+            matches = [i for i in matches if self.items[i]['id_tiendita'] in store_ids]
+        if not matches:
+            return None
+
+        names = {self.items[i]['nombre'].lower() for i in matches}
+        header = f"{self.items[matches[0]]['nombre']} está en:" if len(names) == 1 else "Encontré estos precios:"
+        return "\n".join([header] + [self._bullet(i) for i in matches[:self.MAX_ITEMS]])
+
+    def _answer_hours(self, store_ids: List[int]) -> Optional[str]:
+        lines = []
+        for tid in store_ids:
+            t = self.stores[tid]
+            if t.get('hora_apertura') and t.get('hora_cierre'):
+                lines.append(f"• {t['nombre_limpio']}: {str(t['hora_apertura'])[:5].rstrip(':')} - {str(t['hora_cierre'])[:5].rstrip(':')}")
+        if not lines:
+            return None
+        return "\n".join(["Horario:"] + lines)
+
+    def _answer_cheapest(self, tokens: List[str], store_ids: List[int], budget: Optional[float]) -> Optional[str]:
+        # Corte por presupuesto sobre los precios ordenados: ya salen de la más barata a la más cara
+        candidates = self.prices.under(budget, store_ids or None).tolist()
+
+        # Palabras que sí son platillos ("la pizza más barata") filtran; las demás se ignoran
+        dish_words = {w for w in tokens if w in self.dish_index and w not in STOPWORDS}
+        if dish_words:
+            candidates = [i for i in candidates if dish_words <= self.items[i]['tokens']]
+        if not candidates:
+            return None
+
+        header = f"Lo más barato con ${budget:.0f}:" if budget is not None else "Lo más barato:"
+        return "\n".join([header] + [self._bullet(i) for i in candidates[:self.MAX_ITEMS]])
+
+    def answer(self, question: str, budget: Optional[float] = None,
+               lat: Optional[float] = None, lon: Optional[float] = None,
+               location: Optional[str] = None, has_history: bool = False) -> Optional[str]:
+        """
+        Respuesta directa si la pregunta tiene una forma conocida; None para el LLM.
+        location: alias de lugar detectado en el texto ("mates"); has_history: la sesión ya tiene
+        turnos, así que la pregunta puede depender de ellos ("¿y en Derecho?") y va al LLM.
+        """
+        if has_history:
+            return None
+
+        text = normalize(question)
+        tokens = [_stem(w) for w in text.split()]
+        store_ids = self._match_stores(set(tokens))
+
+        # Entidades que no son de la intención: cafeterías nombradas, presupuesto y lugar
+        covered = self._store_words(store_ids)
+        if budget is not None:
+            covered |= BUDGET_STEMS | {w for w in tokens if w.isdigit()}
+        if location:
+            covered |= set(tokenize(location))
+        if lat is not None and lon is not None:
+            covered |= NEARBY_STEMS
+        # Se limita a las cafeterías más cercanas solo si la pregunta lo pide ("cerca de mí", "en mates"):
+        # "¿qué es lo más barato?" es una pregunta de todo el campus aunque el cliente mande su ubicación
+        nearby = lat is not None and lon is not None and (location or any(w in NEARBY_STEMS for w in tokens))
+
+        if HOURS_RE.search(text):
+            if not self._covers(HOURS_RE.sub(' ', text), covered):
+                return None
+            if not store_ids and nearby:
+                store_ids = self._nearest_stores(lat, lon)
+            return self._answer_hours(store_ids) if store_ids else None
+
+        if CHEAPEST_RE.search(text) or (budget is not None and BUDGET_QUESTION_RE.search(text)):
+            # Los platillos nombrados ("la pizza más barata") filtran la lista
+            dish_words = {w for w in tokens if w in self.dish_index and w not in STOPWORDS}
+            rest = BUDGET_QUESTION_RE.sub(' ', CHEAPEST_RE.sub(' ', text))
+            if not self._covers(rest, covered | dish_words):
+                return None
+            if not store_ids and nearby:
+                store_ids = self._nearest_stores(lat, lon)
+            return self._answer_cheapest(tokens, store_ids, budget)
+
+        price = PRICE_RE.search(text)
+        if price:
+            # El platillo es lo que sigue a "cuánto cuesta" hasta " en "; lo demás debe ser cafetería o relleno
+            dish, _, where = price.group(1).partition(' en ')
+            if not self._covers(f"{text[:price.start()]} {where}", covered):
+                return None
+            return self._answer_price(price.group(1), store_ids)
+
+        return None
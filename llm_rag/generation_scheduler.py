@@ -0,0 +1,130 @@
+"""
+🦉 El Búho Tragón - Micro-batching de generación
+Junta las peticiones que llegan dentro de una ventana corta y las genera en una sola
+llamada batched a `generate`, en lugar de atender a un usuario a la vez.
+Las consultas en streaming entran al mismo batch: cada una trae su streamer y su evento de corte,
+así el modelo nunca corre dos generate() a la vez.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationScheduler:
+    """
+    Scheduler de micro-batches delante del LLM.
+
+    generate_batch: función que recibe una lista de prompts y devuelve una lista de respuestas.
+        Si alguna petición del batch es de streaming se llama con streams=[(streamer, stop) o None
+        por prompt]: los tokens de cada fila van a su streamer y una fila se corta con su evento.
+    max_batch_size: máximo de prompts por llamada.
+    max_wait_ms: cuánto espera el primer prompt de un batch a que lleguen más.
+    """
+
+    def __init__(self, generate_batch: Callable[[List[str]], List[str]],
+                 max_batch_size: int = 8, max_wait_ms: float = 20, stats_window: int = 1000):
+        self.generate_batch = generate_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+
+        # Estadísticas para ajustar la ventana
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=stats_window)
+        self._batch_sizes = Counter()
+        self._requests = 0
+
+        self._worker = threading.Thread(target=self._run, name="buho-generation", daemon=True)
+        self._worker.start()
+        logger.info(f"🧮 Micro-batching activo (batch máx {max_batch_size}, espera {max_wait_ms} ms)")
+
+    def submit(self, prompt: str, streamer=None, stop: Optional[threading.Event] = None) -> Future:
+        """
+        Encola un prompt; el Future se resuelve con el texto generado.
+        Con streamer, los tokens se le van entregando mientras se genera el batch.
+        """
+        future = Future()
+        stream = (streamer, stop) if streamer is not None else None
+        self._queue.put((prompt, future, time.monotonic(), stream))
+        return future
+
+    def _collect_batch(self) -> List:
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            prompts = [prompt for prompt, _, _, _ in batch]
+            streams = [stream for _, _, _, stream in batch]
+            try:
+                if any(streams):
+                    answers = list(self.generate_batch(prompts, streams=streams))
+                else:
+                    answers = list(self.generate_batch(prompts))
+                # Una respuesta por prompt: si faltan, ningún future puede quedar sin resolver
+                if len(answers) != len(batch):
+                    raise RuntimeError(f"generate_batch devolvió {len(answers)} respuestas para {len(batch)} prompts")
+            except Exception as e:
+                logger.error(f"❌ Error en batch de generación: {e}", exc_info=True)
+                for _, future, _, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            # Estadísticas antes de resolver: quien recibe su respuesta ya la ve contada
+            done = time.monotonic()
+            with self._stats_lock:
+                self._requests += len(batch)
+                self._batch_sizes[len(batch)] += 1
+                self._latencies.extend(done - enqueued for _, _, enqueued, _ in batch)
+
+            for (_, future, _, _), answer in zip(batch, answers):
+                future.set_result(answer)
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            latencies = np.array(self._latencies) * 1000.0
+            batches = sum(self._batch_sizes.values())
+            return {
+                'requests': self._requests,
+                'batches': batches,
+                'avg_batch_size': round(self._requests / batches, 2) if batches else 0.0,
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+                'latency_p50_ms': round(float(np.percentile(latencies, 50)), 1) if len(latencies) else None,
+                'latency_p99_ms': round(float(np.percentile(latencies, 99)), 1) if len(latencies) else None,
+                'queue_depth': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+            }
+
+    def shutdown(self):
+        self._stopped.set()
+        self._worker.join(timeout=2)
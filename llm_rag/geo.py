@@ -0,0 +1,138 @@
+"""
+🦉 El Búho Tragón - Motor geográfico vectorizado
+Las coordenadas de las cafeterías viven en arreglos NumPy contiguos (ordenados por latitud):
+las distancias a uno o varios puntos de referencia se calculan en una sola llamada, y las
+consultas de k vecinos y de radio solo revisan la franja de latitud que puede contener resultados.
+"""
+
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+# Metros por grado de latitud (constante en la esfera)
+METERS_PER_DEGREE = np.pi * EARTH_RADIUS_M / 180.0
+
+
+def haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Distancia en metros; acepta escalares o arreglos (con broadcasting de NumPy)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def to_coord(value) -> Optional[float]:
+    """Convierte latitud/longitud (Decimal, str, float) a float; None si falta o no es válida."""
+    try:
+        coord = float(value)
+    except (TypeError, ValueError):
+        return None
+    # 0 significa "sin capturar" en los datos de las cafeterías
+    return coord if np.isfinite(coord) and coord != 0.0 else None
+
+
+class GeoIndex:
+    """
+    Índice espacial de puntos (id, lat, lon).
+
+    distances(lat, lon)            -> distancia a todos los puntos, alineada con self.ids
+    distance_matrix(lats, lons)    -> matriz (referencias x puntos) en una sola llamada
+    distances_to(lat, lon, ids)    -> distancias a ids concretos (NaN si el id no tiene coordenadas)
+    nearest(lat, lon, k)           -> [(id, metros)] los k más cercanos
+    within(lat, lon, radius_m)     -> [(id, metros)] dentro del radio, del más cercano al más lejano
+    """
+
+    def __init__(self, points: Iterable[Tuple[Hashable, float, float]]):
+        points = sorted(points, key=lambda p: p[1])
+        self.ids = [p[0] for p in points]
+        self.lat = np.ascontiguousarray([p[1] for p in points], dtype=np.float64)
+        self.lon = np.ascontiguousarray([p[2] for p in points], dtype=np.float64)
+        self._lat_rad = np.radians(self.lat)
+        self._lon_rad = np.radians(self.lon)
+        self._cos_lat = np.cos(self._lat_rad)
+        self._pos = {pid: i for i, pid in enumerate(self.ids)}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict], id_key: str = 'id_tiendita',
+                     lat_key: str = 'latitud', lon_key: str = 'longitud') -> 'GeoIndex':
+        """Construye el índice desde dicts (rag_data.json, .values() de Django); omite registros sin coordenadas."""
+        points = []
+        for r in records:
+            lat, lon = to_coord(r.get(lat_key)), to_coord(r.get(lon_key))
+            if lat is not None and lon is not None:
+                points.append((r.get(id_key), lat, lon))
+        return cls(points)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, pid) -> bool:
+        return pid in self._pos
+
+    def _haversine_slice(self, lat: float, lon: float, sl=slice(None)) -> np.ndarray:
+        # Igual que haversine() pero con radianes y cosenos de los puntos ya precalculados
+        ref_lat, ref_lon = np.radians(lat), np.radians(lon)
+        a = (np.sin((self._lat_rad[sl] - ref_lat) / 2) ** 2
+             + np.cos(ref_lat) * self._cos_lat[sl] * np.sin((self._lon_rad[sl] - ref_lon) / 2) ** 2)
+        return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    def distances(self, lat: float, lon: float) -> np.ndarray:
+        return self._haversine_slice(lat, lon)
+
+    def distance_matrix(self, lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+        lats = np.radians(np.asarray(lats, dtype=np.float64))[:, None]
+        lons = np.radians(np.asarray(lons, dtype=np.float64))[:, None]
+        a = (np.sin((self._lat_rad[None, :] - lats) / 2) ** 2
+             + np.cos(lats) * self._cos_lat[None, :] * np.sin((self._lon_rad[None, :] - lons) / 2) ** 2)
+        return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    def distances_to(self, lat: float, lon: float, ids: Sequence[Hashable]) -> np.ndarray:
+        pos = np.array([self._pos.get(pid, -1) for pid in ids], dtype=np.int64)
+        out = np.full(len(pos), np.nan)
+        known = pos >= 0
+        if known.any():
+            out[known] = self._haversine_slice(lat, lon, pos[known])
+        return out
+
+    def _band(self, lat: float, radius_m: float) -> slice:
+        """Franja de latitud [lat - r, lat + r]: fuera de ella ningún punto puede estar a menos de r."""
+        delta = radius_m / METERS_PER_DEGREE
+        lo = np.searchsorted(self.lat, lat - delta, side='left')
+        hi = np.searchsorted(self.lat, lat + delta, side='right')
+        return slice(int(lo), int(hi))
+
+    def within(self, lat: float, lon: float, radius_m: float, limit: Optional[int] = None) -> List[Tuple[Hashable, float]]:
+        band = self._band(lat, radius_m)
+        dist = self._haversine_slice(lat, lon, band)
+        hits = np.flatnonzero(dist <= radius_m)
+        order = hits[np.argsort(dist[hits], kind='stable')]
+        if limit is not None:
+            order = order[:limit]
+        return [(self.ids[band.start + i], float(dist[i])) for i in order]
+
+    def nearest(self, lat: float, lon: float, k: int = 1, max_distance: Optional[float] = None) -> List[Tuple[Hashable, float]]:
+        n = len(self.ids)
+        if n == 0 or k <= 0:
+            return []
+        k = min(k, n)
+
+        # Radio inicial: el que contendría k puntos si estuvieran repartidos uniformemente en la franja total
+        radius = max((self.lat[-1] - self.lat[0]) * METERS_PER_DEGREE, 1.0) * k / n
+        while True:
+            if max_distance is not None:
+                radius = min(radius, max_distance)
+            band = self._band(lat, radius)
+            dist = self._haversine_slice(lat, lon, band)
+            # Todo punto a <= radius está en la franja: si hay k adentro, son los k más cercanos
+            inside = np.flatnonzero(dist <= radius)
+            if len(inside) >= k or (max_distance is not None and radius >= max_distance):
+                break
+            if band.stop - band.start == n:
+                inside = np.arange(n)
+                break
+            radius *= 2
+
+        if len(inside) > k:
+            inside = inside[np.argpartition(dist[inside], k - 1)[:k]]
+        order = inside[np.argsort(dist[inside], kind='stable')]
+        return [(self.ids[band.start + i], float(dist[i])) for i in order]
@@ -0,0 +1,91 @@
+"""
+🦉 El Búho Tragón - Almacén de artefactos del índice RAG
+Guarda en disco los documentos renderizados, la matriz de embeddings y el índice FAISS,
+identificados por un hash del archivo de datos, el modelo de embeddings y la versión de renderizado.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional, Union
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class IndexStore:
+    """
+    Caché persistente y direccionada por contenido para el índice RAG.
+    Cada llave vive en su propio directorio; los vectores se abren con memory mapping,
+    así que varios procesos comparten una sola copia de solo lectura.
+    """
+
+    DOCUMENTS_FILE = "documents.json"
+    EMBEDDINGS_FILE = "embeddings.npy"
+    INDEX_FILE = "index.faiss"
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def make_key(data_path: str, model_id: str, render_version: Union[int, str]) -> str:
+        digest = hashlib.sha256()
+        with open(data_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        digest.update(f"|{model_id}|v{render_version}".encode('utf-8'))
+        return digest.hexdigest()[:32]
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key: str) -> Optional[Dict]:
+        """Devuelve los artefactos de la llave o None si no existen (o están incompletos)."""
+        entry = self._entry_dir(key)
+        paths = [os.path.join(entry, name) for name in (self.DOCUMENTS_FILE, self.EMBEDDINGS_FILE, self.INDEX_FILE)]
+        if not all(os.path.exists(p) for p in paths):
+            return None
+
+        try:
+            with open(paths[0], 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            embeddings = np.load(paths[1], mmap_mode='r')
+            index = faiss.read_index(paths[2], faiss.IO_FLAG_MMAP)
+        except Exception as e:
+            logger.warning(f"⚠️ Caché de índice corrupta ({key}): {e}")
+            return None
+
+        logger.info(f"💾 Índice cargado desde caché ({key})")
+        return {
+            'documents': payload['documents'],
+            'doc_meta': payload['doc_meta'],
+            'embeddings': embeddings,
+            'index': index,
+        }
+
+    def save(self, key: str, documents: List[str], doc_meta: List[Dict], embeddings: np.ndarray, index) -> None:
+        """Escribe los artefactos en un directorio temporal y lo publica con un rename atómico."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = self._entry_dir(key)
+        if os.path.exists(entry):
+            return
+
+        tmp_dir = tempfile.mkdtemp(prefix=f".{key}-", dir=self.cache_dir)
+        try:
+            with open(os.path.join(tmp_dir, self.DOCUMENTS_FILE), 'w', encoding='utf-8') as f:
+                json.dump({'documents': documents, 'doc_meta': doc_meta}, f, ensure_ascii=False)
+            np.save(os.path.join(tmp_dir, self.EMBEDDINGS_FILE), np.ascontiguousarray(embeddings, dtype='float32'))
+            faiss.write_index(index, os.path.join(tmp_dir, self.INDEX_FILE))
+            os.replace(tmp_dir, entry)
+            logger.info(f"💾 Índice guardado en caché ({key})")
+        except OSError as e:
+            # Otro worker pudo publicar la misma llave primero; su copia es equivalente
+            logger.warning(f"⚠️ No se guardó la caché de índice: {e}")
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
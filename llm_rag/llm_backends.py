@@ -0,0 +1,77 @@
+"""
+🦉 El Búho Tragón - Backends de inferencia del LLM
+Carga el modelo causal con el backend elegido:
+  fp32  -> pesos float32 (CPU, línea base)
+  fp16  -> pesos float16 (GPU)
+  int8  -> cuantización dinámica int8 de las capas Linear (CPU, solo PyTorch)
+  int4  -> pesos int4 con optimum-quanto (CPU, dependencia opcional)
+  auto  -> fp16 con GPU, int8 sin GPU
+"""
+
+import logging
+import time
+import warnings
+from typing import Tuple
+
+import torch
+from transformers import AutoModelForCausalLM
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_BACKENDS = ('auto', 'fp32', 'fp16', 'int8', 'int4')
+QUANTIZED_BACKENDS = ('int8', 'int4')
+
+
+def resolve_backend(backend: str, device: str) -> str:
+    """Convierte 'auto' en un backend concreto y valida el nombre."""
+    backend = (backend or 'auto').lower()
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Backend de inferencia desconocido: {backend} (opciones: {', '.join(INFERENCE_BACKENDS)})")
+    if backend == 'auto':
+        return 'fp16' if device.startswith('cuda') else 'int8'
+    return backend
+
+
+def _quantize_int8(model):
+    # La API eager de torch.ao está marcada como obsoleta, pero sigue siendo la única sin dependencias extra
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        from torch.ao.quantization import quantize_dynamic
+        # inplace=True: sin él quantize_dynamic hace deepcopy del modelo y el pico es ~2x fp32.
+        # Aun así el pico de carga es el tamaño fp32 (los pesos se leen en float32 y luego se cuantizan)
+        return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def _quantize_int4(model):
+    try:
+        from optimum.quanto import freeze, qint4, quantize
+    except ImportError as e:
+        raise ImportError("El backend int4 requiere optimum-quanto: pip install optimum-quanto") from e
+    quantize(model, weights=qint4)
+    freeze(model)
+    return model
+
+
+def load_causal_lm(model_id: str, backend: str, device: str, **kwargs) -> Tuple[object, str]:
+    """
+    Carga el LLM con el backend indicado y devuelve (modelo, backend resuelto).
+    kwargs extra se pasan a from_pretrained (trust_remote_code, attn_implementation...).
+    """
+    backend = resolve_backend(backend, device)
+    if backend in QUANTIZED_BACKENDS and device != 'cpu':
+        logger.warning(f"⚠️ El backend {backend} solo corre en CPU; se ignora {device}")
+        device = 'cpu'
+
+    dtype = torch.float16 if backend == 'fp16' else torch.float32
+    start = time.perf_counter()
+    model = AutoModelForCausalLM.from_pretrained(
+        model_id, torch_dtype=dtype, device_map=device, low_cpu_mem_usage=True, **kwargs
+    )
+    if backend == 'int8':
+        model = _quantize_int8(model)
+    elif backend == 'int4':
+        model = _quantize_int4(model)
+    model.eval()
+
+    logger.info(f"⚙️ LLM cargado con backend {backend} en {device} ({time.perf_counter() - start:.1f} s)")
+    return model, backend
@@ -0,0 +1,92 @@
+"""
+🦉 El Búho Tragón - Detección de ubicaciones del campus en la pregunta
+Los alias ('mates', 'servicio social', 'diseño'...) se cargan de campus_locations.json y se compilan
+en un trie de palabras normalizadas (sin acentos ni signos). Cada consulta recorre la pregunta una
+vez: el costo depende del largo de la pregunta, no de cuántos alias haya.
+
+Semántica: palabras completas ('arte' no coincide dentro de 'artes') y la coincidencia más larga
+en cada posición ('bellas artes' gana a 'artes'); si hay varias ubicaciones, gana la primera.
+"""
+
+import json
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fast_path import normalize
+
+logger = logging.getLogger(__name__)
+
+# Llave del nodo del trie que marca el final de un alias (ninguna palabra normalizada es vacía)
+_END = ''
+# Valor de los términos de otros campus: si aparecen, no se usa ninguna coordenada
+_EXCLUDED = object()
+
+
+class LocationMatcher:
+    """
+    places: [{'name', 'lat', 'lon', 'aliases': [...]}]
+    exclude: términos que anulan la detección (p. ej. otros campus sin coordenadas cargadas).
+    """
+
+    def __init__(self, places: List[Dict], exclude: Iterable[str] = ()):
+        self._root = {}
+        self.max_words = 0
+        self.size = 0
+        for place in places:
+            for alias in place.get('aliases', []):
+                self._add(alias, {'alias': alias, 'place': place['name'],
+                                  'lat': float(place['lat']), 'lon': float(place['lon'])})
+        for term in exclude:
+            self._add(term, _EXCLUDED)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'LocationMatcher':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        matcher = cls(data.get('places', []), data.get('exclude', []))
+        logger.info(f"📍 {matcher.size} alias de ubicación cargados de {path}")
+        return matcher
+
+    def _add(self, alias: str, value):
+        words = normalize(alias).split()
+        if not words:
+            return
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, {})
+        if _END in node:
+            logger.warning(f"⚠️ Alias duplicado '{alias}': se usa la última definición")
+        elif value is not _EXCLUDED:
+            self.size += 1
+        node[_END] = value
+        self.max_words = max(self.max_words, len(words))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def find_all(self, text: str) -> List[Tuple[int, int, object]]:
+        """(palabra inicial, palabra final, valor) de cada coincidencia, de izquierda a derecha y sin traslapes."""
+        words = normalize(text).split()
+        found = []
+        i = 0
+        while i < len(words):
+            node, best = self._root, None
+            for j in range(i, min(len(words), i + self.max_words)):
+                node = node.get(words[j])
+                if node is None:
+                    break
+                if _END in node:
+                    best = (j + 1, node[_END])
+            if best is None:
+                i += 1
+                continue
+            found.append((i, best[0], best[1]))
+            i = best[0]
+        return found
+
+    def match(self, text: str) -> Optional[Dict]:
+        """Primera ubicación mencionada ({'alias', 'place', 'lat', 'lon'}), o None."""
+        found = self.find_all(text)
+        if any(value is _EXCLUDED for _, _, value in found):
+            return None
+        return found[0][2] if found else None
@@ -0,0 +1,65 @@
+"""
+🦉 El Búho Tragón - Índice de menús ordenado por precio
+Precios en arreglos NumPy ordenados (uno global y uno por cafetería): "lo que cabe en $X" es un
+searchsorted + un corte del arreglo, y "lo más barato" son los primeros elementos.
+Devuelve posiciones de las filas originales, así cada módulo conserva sus propios registros.
+"""
+
+from typing import Dict, Hashable, Iterable, Optional, Sequence
+
+import numpy as np
+
+
+class MenuPriceIndex:
+    """
+    prices[i] y store_ids[i] describen la fila i del llamador.
+
+    under(budget, stores)   -> filas con precio <= budget (todas si budget es None), de la más barata a la más cara
+    min_price(store)        -> precio más bajo de una cafetería (inf si no tiene menú)
+    stores_under(budget)    -> cafeterías con al menos un platillo <= budget
+    """
+
+    def __init__(self, prices: Sequence[float], store_ids: Sequence[Hashable]):
+        self.prices = prices = np.asarray(prices, dtype=np.float64)
+        self.order = np.argsort(prices, kind='stable')
+        self.sorted_prices = prices[self.order]
+
+        self._store_rows = {}
+        self._store_prices = {}
+        for row in self.order.tolist():
+            self._store_rows.setdefault(store_ids[row], []).append(row)
+        for tid, rows in self._store_rows.items():
+            rows = np.array(rows, dtype=np.int64)
+            self._store_rows[tid] = rows
+            self._store_prices[tid] = prices[rows]
+
+    @classmethod
+    def from_menus(cls, menus: Iterable[Dict]) -> 'MenuPriceIndex':
+        """Índice sobre filas de rag_data['menus'] que ya tienen precio numérico."""
+        menus = list(menus)
+        return cls([float(m['precio']) for m in menus], [m.get('id_tiendita') for m in menus])
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _cut(self, prices: np.ndarray, budget: Optional[float]) -> int:
+        return len(prices) if budget is None else int(np.searchsorted(prices, budget, side='right'))
+
+    def under(self, budget: Optional[float] = None, stores: Optional[Iterable[Hashable]] = None) -> np.ndarray:
+        if stores is None:
+            return self.order[:self._cut(self.sorted_prices, budget)]
+
+        parts = [self._store_rows[tid][:self._cut(self._store_prices[tid], budget)]
+                 for tid in stores if tid in self._store_rows]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        # Mezcla estable: a igual precio quedan en el orden en que se pidieron las cafeterías
+        rows = np.concatenate(parts)
+        return rows[np.argsort(self.prices[rows], kind='stable')]
+
+    def min_price(self, store: Hashable) -> float:
+        prices = self._store_prices.get(store)
+        return float(prices[0]) if prices is not None and len(prices) else float('inf')
+
+    def stores_under(self, budget: float) -> set:
+        return {tid for tid, prices in self._store_prices.items() if prices[0] <= budget}
@@ -0,0 +1,110 @@
+"""
+🦉 El Búho Tragón - Índice de horarios ("¿qué está abierto ahora?")
+Convierte hora_apertura/hora_cierre de cada cafetería en intervalos del día (en minutos) y
+precalcula qué cafeterías están abiertas en cada tramo entre dos horas frontera. Consultar un
+momento es una búsqueda binaria sobre las fronteras: O(log n).
+
+Horarios que pasan la medianoche (20:00 - 02:00) se parten en dos intervalos.
+Apertura igual a cierre se toma como abierto todo el día.
+"""
+
+import bisect
+import os
+import re
+from datetime import datetime, time as dt_time
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple, Union
+from zoneinfo import ZoneInfo
+
+from fast_path import normalize
+
+MINUTES_PER_DAY = 24 * 60
+
+# Los horarios de las cafeterías están en hora local del campus
+CAMPUS_TIME_ZONE = os.getenv("CAMPUS_TIME_ZONE", "America/Hermosillo")
+
+When = Union[datetime, dt_time, int]
+
+# Preguntas sobre lo que está abierto en este momento (texto ya normalizado)
+OPEN_NOW_RE = re.compile(r'\b(?:abiert[oa]s?|ahorita|ahora|en este momento|todavia|aun|a esta hora)\b')
+
+
+def campus_now() -> datetime:
+    return datetime.now(ZoneInfo(CAMPUS_TIME_ZONE))
+
+
+def asks_open_now(question: str) -> bool:
+    return bool(OPEN_NOW_RE.search(normalize(question)))
+
+
+def parse_time(value) -> Optional[int]:
+    """'7:00:00', '07:30', time(7, 30) -> minutos desde la medianoche; None si falta o no es válida."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (datetime, dt_time)):
+        return value.hour * 60 + value.minute
+    try:
+        parts = [int(p) for p in str(value).strip().split(':')[:2]]
+    except ValueError:
+        return None
+    if len(parts) < 2 or not (0 <= parts[0] <= 24 and 0 <= parts[1] < 60):
+        return None
+    return (parts[0] * 60 + parts[1]) % MINUTES_PER_DAY
+
+
+def to_minute(when: When) -> int:
+    if isinstance(when, int):
+        return when % MINUTES_PER_DAY
+    return when.hour * 60 + when.minute
+
+
+def intervals(opening: int, closing: int) -> List[Tuple[int, int]]:
+    """Intervalos [inicio, fin) dentro del día para un horario apertura-cierre."""
+    if opening == closing:
+        return [(0, MINUTES_PER_DAY)]
+    if opening < closing:
+        return [(opening, closing)]
+    # Cierra después de medianoche
+    return [(opening, MINUTES_PER_DAY)] + ([(0, closing)] if closing else [])
+
+
+class OpeningHoursIndex:
+    """
+    open_at(when)    -> frozenset de ids abiertos en ese momento
+    closed_at(when)  -> ids con horario conocido que están cerrados (los que se pueden descartar)
+    segment(when)    -> número de tramo: dos momentos con el mismo tramo tienen el mismo conjunto
+    Las cafeterías sin horario quedan en self.unknown: nunca se consideran abiertas ni cerradas.
+    """
+
+    def __init__(self, records: Iterable[Dict], id_key: str = 'id_tiendita',
+                 opening_key: str = 'hora_apertura', closing_key: str = 'hora_cierre'):
+        self.hours = {}
+        self.unknown = set()
+        for r in records:
+            opening, closing = parse_time(r.get(opening_key)), parse_time(r.get(closing_key))
+            if opening is None or closing is None:
+                self.unknown.add(r.get(id_key))
+            else:
+                self.hours[r.get(id_key)] = (opening, closing)
+        self.known = frozenset(self.hours)
+
+        # Fronteras de todos los intervalos; entre dos fronteras consecutivas el conjunto no cambia
+        spans = [(start, end, tid) for tid, (o, c) in self.hours.items() for start, end in intervals(o, c)]
+        self.boundaries = sorted({0} | {s for s, _, _ in spans} | {e for _, e, _ in spans if e < MINUTES_PER_DAY})
+        self._open = []
+        for start in self.boundaries:
+            self._open.append(frozenset(tid for s, e, tid in spans if s <= start < e))
+
+    def segment(self, when: When) -> int:
+        return bisect.bisect_right(self.boundaries, to_minute(when)) - 1
+
+    def open_at(self, when: When) -> FrozenSet[Hashable]:
+        return self._open[self.segment(when)]
+
+    def closed_at(self, when: When) -> FrozenSet[Hashable]:
+        return self.known - self.open_at(when)
+
+    def is_open(self, tid: Hashable, when: When) -> Optional[bool]:
+        """True/False, o None si la cafetería no tiene horario."""
+        if tid not in self.hours:
+            return None
+        return tid in self.open_at(when)
@@ -0,0 +1,102 @@
+"""
+🦉 El Búho Tragón - KV-cache del prefijo fijo del prompt
+El bloque de sistema (persona, reglas de formato, ejemplos) es igual en todas las consultas.
+Se hace el prefill una sola vez por carga del modelo y cada generación arranca de una copia
+de esa caché: solo se procesa la parte dinámica del prompt.
+"""
+
+import copy
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixKVCache:
+    """
+    Caché de atención (past_key_values) del prefijo estático.
+
+    ensure(prefix) la reconstruye si el texto del prefijo cambió (nueva plantilla).
+    inputs_for(prompt) devuelve los kwargs de generate() que reutilizan la caché, o None si el
+    prompt no empieza con el prefijo (en ese caso se genera como siempre).
+    """
+
+    def __init__(self, model, tokenizer):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefix = None
+        self.prefix_hash = None
+        self.prefix_ids = None
+        self.past_key_values = None
+        self.prefill_ms = 0.0
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def ensure(self, prefix: str):
+        """Hace el prefill del prefijo si todavía no existe o si la plantilla cambió."""
+        prefix_hash = self._hash(prefix)
+        if prefix_hash == self.prefix_hash:
+            return
+
+        with self._lock:
+            if prefix_hash == self.prefix_hash:
+                return
+            ids = self.tokenizer(prefix, return_tensors="pt").input_ids.to(self.model.device)
+            start = time.perf_counter()
+            with torch.no_grad():
+                out = self.model(input_ids=ids, use_cache=True)
+            self.prefill_ms = (time.perf_counter() - start) * 1000.0
+            self.prefix, self.prefix_hash = prefix, prefix_hash
+            self.prefix_ids = ids
+            self.past_key_values = out.past_key_values
+            logger.info(f"🧠 KV-cache del prefijo lista ({ids.shape[1]} tokens, {self.prefill_ms:.0f} ms de prefill)")
+
+    def inputs_for(self, prompt: str) -> Optional[Dict]:
+        # Copia consistente de la caché (ensure puede reemplazarla) y contadores bajo el mismo lock
+        with self._lock:
+            prefix, prefix_ids, past_key_values = self.prefix, self.prefix_ids, self.past_key_values
+            if past_key_values is None or not prompt.startswith(prefix):
+                self.misses += 1
+                return None
+
+        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
+        n = prefix_ids.shape[1]
+        # La caché solo sirve si el prompt tokeniza igual que el prefijo en la frontera
+        hit = inputs.input_ids.shape[1] > n and torch.equal(inputs.input_ids[:, :n], prefix_ids)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not hit:
+            return None
+
+        # generate() extiende la caché en su lugar: cada petición usa su propia copia
+        return {**inputs, 'past_key_values': copy.deepcopy(past_key_values)}
+
+    @property
+    def prefix_tokens(self) -> int:
+        return self.prefix_ids.shape[1] if self.prefix_ids is not None else 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits, misses, prefix_tokens, prefill_ms = self.hits, self.misses, self.prefix_tokens, self.prefill_ms
+        return {
+            'prefix_tokens': prefix_tokens,
+            'prefix_prefill_ms': round(prefill_ms, 1),
+            'hits': hits,
+            'misses': misses,
+            'saved_prefill_tokens': hits * prefix_tokens,
+            'saved_prefill_ms': round(hits * prefill_ms, 1),
+        }
@@ -0,0 +1,234 @@
+"""
+🦉 El Búho Tragón - Cliente del servidor de inferencia (rag_server.py)
+Solo usa la biblioteca estándar: importarlo no carga torch ni los modelos.
+Expone la misma interfaz que usa Django de BuhoRAG (query, query_stream, reset_conversation,
+enqueue_change, warm_up, estadísticas), así que las vistas no distinguen un modo del otro.
+"""
+
+import http.client
+import json
+import select
+import socket
+import threading
+import time
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+
+class RAGServerError(RuntimeError):
+    """El servidor no respondió o respondió con error."""
+
+
+class RAGBusyError(RAGServerError):
+    """Cola llena (en el cliente o en el servidor) o modelo aún cargando."""
+
+    def __init__(self, message: str, retry_after: int = 5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _TCPConnection(http.client.HTTPConnection):
+    def __init__(self, host, port, connect_timeout, timeout):
+        super().__init__(host, port, timeout=timeout)
+        self.connect_timeout = connect_timeout
+
+    def connect(self):
+        self.sock = socket.create_connection((self.host, self.port), self.connect_timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(self.timeout)
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, connect_timeout, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+        self.connect_timeout = connect_timeout
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.connect_timeout)
+        sock.connect(self.path)
+        sock.settimeout(self.timeout)
+        self.sock = sock
+
+
+class RAGClient:
+    """
+    Cliente delgado con una conexión keep-alive por hilo.
+
+    address: 'unix:/ruta/al.sock' o 'http://127.0.0.1:8765'.
+    timeout: segundos máximos esperando respuesta (la generación puede tardar).
+    connect_timeout: segundos para abrir la conexión.
+    max_inflight: consultas simultáneas de este proceso; las demás esperan hasta queue_timeout.
+    changes_timeout: segundos máximos para POST /changes (corre dentro del guardado del admin).
+    """
+
+    # Errores de una conexión keep-alive que el servidor ya cerró. Solo se reintenta (una vez) si la
+    # petición no llegó a enviarse o es un GET: un POST /query o /changes ya enviado podría repetirse
+    _RETRYABLE = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, http.client.CannotSendRequest)
+
+    def __init__(self, address: str, timeout: float = 120, connect_timeout: float = 2,
+                 max_inflight: int = 16, queue_timeout: float = 5, changes_timeout: float = 2):
+        self.address = address
+        self.timeout = timeout
+        self.changes_timeout = changes_timeout
+        self.connect_timeout = connect_timeout
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_inflight)
+        self._local = threading.local()
+        self.components = {}
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self.address.startswith('unix:'):
+            return _UnixConnection(self.address[len('unix:'):], self.connect_timeout, self.timeout)
+        parsed = urlparse(self.address if '://' in self.address else f"http://{self.address}")
+        return _TCPConnection(parsed.hostname, parsed.port or 8765, self.connect_timeout, self.timeout)
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._new_connection()
+        return conn
+
+    @staticmethod
+    def _is_stale(conn: http.client.HTTPConnection) -> bool:
+        """Una conexión inactiva con datos por leer es un cierre (EOF) del servidor."""
+        if conn.sock is None:
+            return False
+        try:
+            readable, _, _ = select.select([conn.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def _request(self, method: str, path: str, payload: Optional[Dict] = None,
+                 timeout: Optional[float] = None) -> http.client.HTTPResponse:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        for attempt in range(2):
+            conn = self._connection()
+            if self._is_stale(conn):
+                self._drop_connection()
+                conn = self._connection()
+            sent = False
+            try:
+                if conn.sock is None:
+                    conn.connect()
+                # Cada petición fija su timeout: la conexión keep-alive se comparte entre llamadas
+                conn.sock.settimeout(timeout or self.timeout)
+                conn.request(method, path, body=body, headers=headers)
+                sent = True
+                return conn.getresponse()
+            except self._RETRYABLE as e:
+                self._drop_connection()
+                if attempt or (sent and method != 'GET'):
+                    raise RAGServerError(f"Conexión cerrada por el servidor RAG ({self.address})") from e
+            except (OSError, http.client.HTTPException) as e:
+                self._drop_connection()
+                raise RAGServerError(f"Servidor RAG no disponible ({self.address}): {e}") from e
+
+    def _json(self, method: str, path: str, payload: Optional[Dict] = None, allow: tuple = (200,),
+              timeout: Optional[float] = None) -> Dict:
+        response = self._request(method, path, payload, timeout=timeout)
+        try:
+            data = json.loads(response.read() or b'{}')
+        except (OSError, http.client.HTTPException) as e:
+            self._drop_connection()
+            raise RAGServerError(f"Servidor RAG no disponible ({self.address}): {e}") from e
+        except ValueError as e:
+            self._drop_connection()
+            raise RAGServerError("Respuesta inválida del servidor RAG") from e
+        if response.status == 503 and 503 not in allow:
+            raise RAGBusyError(data.get('error', 'Servidor RAG ocupado'), int(response.getheader('Retry-After') or 5))
+        if response.status not in allow:
+            raise RAGServerError(data.get('error', f"HTTP {response.status}"))
+        return data
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise RAGBusyError("Demasiadas consultas en espera", retry_after=2)
+
+    # ----------------------------------------
+    # Interfaz equivalente a BuhoRAG
+    # ----------------------------------------
+
+    def health(self) -> Dict:
+        data = self._json('GET', '/health', allow=(200, 503))
+        self.components = data.get('components', {})
+        return data
+
+    def warm_up(self, wait_seconds: float = 600, poll_seconds: float = 2):
+        """Espera a que el servidor termine de cargar (no carga nada en este proceso)."""
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            try:
+                health = self.health()
+            except RAGServerError:
+                # El servidor puede no haber abierto el socket todavía
+                if time.monotonic() >= deadline:
+                    raise
+                health = {}
+            if health.get('ready'):
+                return
+            if health.get('error'):
+                raise RAGServerError(f"El servidor RAG falló al cargar: {health['error']}")
+            if time.monotonic() >= deadline:
+                raise RAGServerError(f"El servidor RAG no estuvo listo en {wait_seconds:.0f} s")
+            time.sleep(poll_seconds)
+
+    def query(self, question: str, user_lat=None, user_lon=None, session_id: str = "default") -> Dict:
+        self._acquire()
+        try:
+            return self._json('POST', '/query', {'question': question, 'lat': user_lat, 'lon': user_lon, 'session_id': session_id})
+        finally:
+            self._slots.release()
+
+    def query_stream(self, question: str, user_lat=None, user_lon=None, session_id: str = "default") -> Iterator[Dict]:
+        self._acquire()
+        complete = False
+        try:
+            response = self._request('POST', '/stream', {'question': question, 'lat': user_lat, 'lon': user_lon, 'session_id': session_id})
+            if response.status != 200:
+                data = json.loads(response.read() or b'{}')
+                if response.status == 503:
+                    raise RAGBusyError(data.get('error', 'Servidor RAG ocupado'), int(response.getheader('Retry-After') or 5))
+                raise RAGServerError(data.get('error', f"HTTP {response.status}"))
+            for line in response:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if event.get('type') == 'error':
+                    raise RAGServerError(event.get('error', 'Error en el servidor RAG'))
+                yield event
+            complete = True
+        except (OSError, http.client.HTTPException) as e:
+            raise RAGServerError(f"Se cortó el streaming del servidor RAG: {e}") from e
+        finally:
+            # Un stream a medias deja la conexión en un estado que no se puede reutilizar
+            if not complete:
+                self._drop_connection()
+            self._slots.release()
+
+    def reset_conversation(self, session_id: str = "default"):
+        self._json('POST', '/reset', {'session_id': session_id})
+
+    def enqueue_change(self, model: str, action: str, record: Dict):
+        self._json('POST', '/changes', {'model': model, 'action': action, 'record': record}, timeout=self.changes_timeout)
+
+    def stats(self) -> Dict:
+        return self._json('GET', '/stats')
+
+    def generation_stats(self) -> Dict:
+        return self.stats().get('generation', {})
+
+    def answer_cache_stats(self) -> Dict:
+        return self.stats().get('answer_cache', {})
+
+    def prefix_cache_stats(self) -> Dict:
+        return self.stats().get('prefix_cache', {})
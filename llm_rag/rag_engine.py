@@ -8,20 +8,47 @@ import json
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
-from math import radians, sin, cos, sqrt, atan2
-from typing import List, Dict, Optional
+from transformers import AutoTokenizer, pipeline
+from typing import List, Dict, Optional, Tuple
 import torch
 import os
 import re
 
+from context_packer import ContextPacker
+from geo import GeoIndex, haversine
+from llm_backends import load_causal_lm
+from prefix_cache import PrefixKVCache
+
 class BuhoRAG:
     """
     Production RAG system for El Búho Tragón.
     Grouping Strategy: One document per Cafeteria containing its full menu.
     """
 
-    def __init__(self, data_path: str = "rag_data_fixed.json"):
+    # Static system block; its KV-cache is computed once per model load
+    SYSTEM_PROMPT = """<|im_start|>system
+Eres El Buhito, asistente de cafeterías de la UNISON.
+
+REGLAS OBLIGATORIAS:
+1. Usa SOLO la información de abajo.
+2. Si das un precio, TIENES QUE DECIR EL NOMBRE DE LA CAFETERÍA.
+   - MAL: "Cuesta $50 en todas".
+   - BIEN: "Cuesta $50 en Cafetería Artes y Cafetería Derecho".
+3. Si la lista es larga, usa viñetas.
+4. Si no sabes la respuesta, di "No tengo información sobre ese producto".<|im_end|>
+"""
+
+    LLM_MODEL_ID = "Qwen/Qwen2.5-1.5B-Instruct"
+
+    GENERATION_KWARGS = {
+        'max_new_tokens': 200,
+        'temperature': 0.1,
+        'top_p': 0.8,
+        'do_sample': True,
+    }
+
+    def __init__(self, data_path: str = "rag_data_fixed.json", prompt_budget: Optional[int] = None,
+                 prefix_cache: Optional[bool] = None, backend: Optional[str] = None):
         print("🦉 Initializing El Búho Tragón RAG System...")
 
         self.data_path = data_path
@@ -29,12 +56,26 @@ class BuhoRAG:
         self.documents = []
         self.metadata = []
         self.faiss_index = None
+        self.geo = None  # GeoIndex over the cafeterias' coordinates
 
         # Models
         self.embedding_model = None
         self.llm_pipeline = None
         self.tokenizer = None
 
+        # LLM backend: fp32 (baseline) | int8 | int4, see llm_backends.py
+        self.backend = backend or os.getenv("BUHO_RAG_BACKEND", "fp32")
+
+        # Prompt token budget (prefill dominates latency on CPU)
+        self.prompt_budget = prompt_budget or int(os.getenv("BUHO_RAG_PROMPT_TOKENS", 1024))
+        self.context_packer = None
+
+        # Reuse the system prompt prefill across requests (BUHO_RAG_PREFIX_CACHE=0 to disable)
+        if prefix_cache is None:
+            prefix_cache = os.getenv("BUHO_RAG_PREFIX_CACHE", "1") == "1"
+        self.use_prefix_cache = prefix_cache
+        self.prefix_cache = None
+
         # Location cache
         self.current_user_lat = None
         self.current_user_lon = None
@@ -50,16 +91,9 @@ class BuhoRAG:
             )
 
         if self.llm_pipeline is None:
-            print("📥 Loading LLM (Qwen2.5)...")
-            model_id = "Qwen/Qwen2.5-1.5B-Instruct"
-
-            self.tokenizer = AutoTokenizer.from_pretrained(model_id)
-            model = AutoModelForCausalLM.from_pretrained(
-                model_id,
-                torch_dtype=torch.float32,
-                device_map="cpu",
-                low_cpu_mem_usage=True
-            )
+            print(f"📥 Loading LLM (Qwen2.5, {self.backend})...")
+            self.tokenizer = AutoTokenizer.from_pretrained(self.LLM_MODEL_ID)
+            model, self.backend = load_causal_lm(self.LLM_MODEL_ID, self.backend, "cpu")
 
             self.llm_pipeline = pipeline(
                 "text-generation",
@@ -68,6 +102,12 @@ class BuhoRAG:
             )
             print("✅ Models loaded successfully")
 
+        if self.context_packer is None:
+            self.context_packer = ContextPacker(self.tokenizer, budget=self.prompt_budget)
+
+        if self.use_prefix_cache and self.prefix_cache is None:
+            self.prefix_cache = PrefixKVCache(self.llm_pipeline.model, self.tokenizer)
+
     def load_data(self):
         """Load data from JSON file"""
         if not os.path.exists(self.data_path):
@@ -77,16 +117,11 @@ class BuhoRAG:
         print(f"📊 Loading data from {self.data_path}...")
         with open(self.data_path, 'r', encoding='utf-8') as f:
             self.data = json.load(f)
+        self.geo = GeoIndex.from_records(self.data.get('tienditas', []))
 
     @staticmethod
     def calculate_distance(lat1, lon1, lat2, lon2):
-        R = 6371000
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1-a))
-        return R * c
+        return float(haversine(lat1, lon1, lat2, lon2))
 
     def build_index(self, user_lat: Optional[float] = None, user_lon: Optional[float] = None):
         """
@@ -112,14 +147,14 @@ class BuhoRAG:
         # 2. Process Tienditas (Main Documents)
         tienditas = self.data.get('tienditas', [])
 
-        # Calculate distances if user location provided
+        # Calculate distances if user location provided (one vectorized call for all stores)
         if user_lat and user_lon:
-            for t in tienditas:
-                if t.get('latitud') and t.get('longitud'):
-                    t['distancia'] = self.calculate_distance(
-                        user_lat, user_lon,
-                        float(t['latitud']), float(t['longitud'])
-                    )
+            if self.geo is None:
+                self.geo = GeoIndex.from_records(tienditas)
+            dists = self.geo.distances_to(user_lat, user_lon, [t.get('id_tiendita') for t in tienditas])
+            for t, dist in zip(tienditas, dists):
+                if dist == dist:  # NaN = no coordinates
+                    t['distancia'] = float(dist)
             # Sort by distance
             tienditas.sort(key=lambda x: x.get('distancia', 9999999))
 
@@ -185,6 +220,42 @@ class BuhoRAG:
         )
         return [self.documents[i] for i in indices[0]]
 
+    @classmethod
+    def _build_prompt(cls, question: str, context_str: str) -> str:
+        """Strict prompt: answer only from the retrieved information."""
+        return cls.SYSTEM_PROMPT + f"""<|im_start|>user
+INFORMACIÓN DISPONIBLE:
+{context_str}
+
+Pregunta: {question}<|im_end|>
+<|im_start|>assistant
+"""
+
+    def _generate(self, prompt: str) -> Tuple[str, int]:
+        """Generate an answer; returns (text, prefill tokens saved by the prefix cache)."""
+        if self.prefix_cache is not None:
+            self.prefix_cache.ensure(self.SYSTEM_PROMPT)
+            inputs = self.prefix_cache.inputs_for(prompt)
+            if inputs is not None:
+                with torch.no_grad():
+                    output_ids = self.llm_pipeline.model.generate(
+                        **inputs,
+                        **self.GENERATION_KWARGS,
+                        pad_token_id=self.tokenizer.eos_token_id,
+                        eos_token_id=self.tokenizer.eos_token_id,
+                    )
+                text = self.tokenizer.decode(output_ids[0, inputs['input_ids'].shape[1]:], skip_special_tokens=True)
+                return text, self.prefix_cache.prefix_tokens
+
+        outputs = self.llm_pipeline(
+            prompt,
+            return_full_text=False,
+            pad_token_id=self.tokenizer.eos_token_id,
+            eos_token_id=self.tokenizer.eos_token_id,
+            **self.GENERATION_KWARGS
+        )
+        return outputs[0]['generated_text'], 0
+
     def query(self, question: str, user_lat=None, user_lon=None):
         # 1. Lógica de Ubicación
         location_keywords = ['cercana', 'cerca', 'cerca de', 'más cerca', 'closest', 'nearest']
@@ -209,44 +280,17 @@ class BuhoRAG:
         # 2. Retrieve Extended Context (k=7)
         context_docs = self._retrieve_context(question, k=7)
 
-        clean_context = []
-        for doc in context_docs:
-            clean_context.append(doc)
-
-        context_str = "\n\n".join(clean_context)
-
-        # 3. Prompt Estricto
-        prompt = f"""<|im_start|>system
-Eres El Buhito, asistente de cafeterías de la UNISON.
-
-REGLAS OBLIGATORIAS:
-1. Usa SOLO la información de abajo.
-2. Si das un precio, TIENES QUE DECIR EL NOMBRE DE LA CAFETERÍA.
-   - MAL: "Cuesta $50 en todas".
-   - BIEN: "Cuesta $50 en Cafetería Artes y Cafetería Derecho".
-3. Si la lista es larga, usa viñetas.
-4. Si no sabes la respuesta, di "No tengo información sobre ese producto".<|im_end|>
-<|im_start|>user
-INFORMACIÓN DISPONIBLE:
-{context_str}
-
-Pregunta: {question}<|im_end|>
-<|im_start|>assistant
-"""
+        # 3. Fit the documents into the token budget, in relevance order
+        base_tokens = self.context_packer.count(self._build_prompt(question, ""))
+        _, context_docs = self.context_packer.pack(base_tokens, [], context_docs)
+        prompt = self._build_prompt(question, "\n\n".join(context_docs))
+        prompt_tokens = self.context_packer.count(prompt)
+        print(f"🧾 Prompt: {prompt_tokens} tokens ({len(context_docs)} documents)")
 
-        outputs = self.llm_pipeline(
-            prompt,
-            max_new_tokens=200,
-            return_full_text=False,
-            temperature=0.1,
-            top_p=0.8,
-            do_sample=True,
-            pad_token_id=self.tokenizer.eos_token_id,
-            eos_token_id=self.tokenizer.eos_token_id,
-        )
+        raw_answer, prefill_saved_tokens = self._generate(prompt)
 
         # 4. Limpieza Estricta
-        answer = outputs[0]['generated_text'].strip()
+        answer = raw_answer.strip()
 
         answer = answer.replace("<|im_end|>", "")
         answer = answer.replace("<|im_start|>", "")
@@ -262,7 +306,9 @@ Pregunta: {question}<|im_end|>
 
         return {
             'answer': answer,
-            'context': context_docs
+            'context': context_docs,
+            'prompt_tokens': prompt_tokens,
+            'prefill_saved_tokens': prefill_saved_tokens
         }
 
 
@@ -7,15 +7,36 @@ Optimizado para: AMD GPU (ROCm)
 import json
 import logging
 import os
+import queue
 import re
-from math import radians, sin, cos, sqrt, atan2
-from typing import List, Dict, Optional, Tuple
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Iterator, List, Dict, Optional, Tuple
 
 import faiss
 import numpy as np
 import torch
 from sentence_transformers import SentenceTransformer
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+from transformers import AutoTokenizer, StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer, pipeline
+from transformers.generation.streamers import BaseStreamer
+
+from answer_cache import SemanticAnswerCache
+from answer_format import IncrementalCleaner, clean_answer
+from context_packer import ContextPacker
+from conversation_store import ConversationStore
+from dish_index import DishIndex
+from fast_path import FastPathRouter
+from geo import GeoIndex, haversine
+from generation_scheduler import GenerationScheduler
+from index_store import IndexStore
+from llm_backends import load_causal_lm
+from location_matcher import LocationMatcher
+from menu_index import MenuPriceIndex
+from opening_hours import OpeningHoursIndex, asks_open_now, campus_now
+from prefix_cache import PrefixKVCache
+from stage_timer import StageTimer
 
 # Configurar logging
 logging.basicConfig(
@@ -24,6 +45,41 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# "tengo 50 pesos", "con 40 mxn"
+BUDGET_RE = re.compile(r'(\d+)\s*(pesos|mxn|\$)')
+
+
+class StopOnEvent(StoppingCriteria):
+    """
+    Corta en generate() las filas cuyo evento se activó (el cliente del streaming se fue).
+    events: un evento por fila del batch (None = la fila no se corta).
+    """
+
+    def __init__(self, events: List[Optional[threading.Event]]):
+        self.events = events
+
+    def __call__(self, input_ids, scores, **kwargs):
+        stopped = [event is not None and event.is_set() for event in self.events]
+        return torch.tensor(stopped, dtype=torch.bool, device=input_ids.device)
+
+
+class BatchStreamer(BaseStreamer):
+    """Reparte los tokens de un generate() batched entre los streamers de cada fila (None = sin streaming)."""
+
+    def __init__(self, streamers: List):
+        self.streamers = streamers
+
+    def put(self, value):
+        # La primera llamada trae el prompt (batch, seq); las siguientes, un token por fila (batch,)
+        for row, streamer in enumerate(self.streamers):
+            if streamer is not None:
+                streamer.put(value[row:row + 1])
+
+    def end(self):
+        for streamer in self.streamers:
+            if streamer is not None:
+                streamer.end()
+
 
 class BuhoRAG:
     """
@@ -31,87 +87,164 @@ class BuhoRAG:
     Incluye: Búsqueda semántica, Geoposicionamiento, Alias de lugares y Memoria.
     """
 
-    def __init__(self, data_path: str = None):
+    EMBEDDING_MODEL_ID = 'sentence-transformers/all-MiniLM-L6-v2'
+    LLM_MODEL_ID = "Qwen/Qwen2.5-14B-Instruct"
+    # Subir cuando cambie _render_tienda_doc para invalidar la caché en disco
+    DOC_RENDER_VERSION = 2
+
+    # Sesión usada cuando el llamador no distingue usuarios (CLI, pruebas)
+    DEFAULT_SESSION = "default"
+    # Turnos de historial que se inyectan en el prompt
+    HISTORY_TURNS = 6
+
+    # Parámetros de generación (compartidos por la ruta directa y la batched)
+    GENERATION_KWARGS = {
+        'max_new_tokens': 250,
+        'temperature': 0.1,
+        'top_p': 0.9,
+        'do_sample': True,
+        'repetition_penalty': 1.05,
+    }
+
+    # Peso de la cercanía frente a la similitud semántica al re-ordenar resultados
+    GEO_RERANK_WEIGHT = 0.5
+
+    # Bloque de sistema fijo: su KV-cache se calcula una vez por carga del modelo (PrefixKVCache).
+    # Todo lo que cambia por consulta (ubicación, presupuesto, historial, datos) va después.
+    SYSTEM_PROMPT = """<|im_start|>system
+Eres "El Búho Tragón", asistente experto de UNISON.
+"Servicio Social" = "Trabajo Social".
+
+FORMATO OBLIGATORIO:
+- NO uses asteriscos ** ni negritas
+- Cuando listes cafeterías o platillos, SIEMPRE formato así:
+
+Ejemplo correcto:
+"Los molletes están en:
+
+• Cafeteria Artes: Mollete ($30)
+• Cafeteria Derecho: Mollete ($30)
+• Cafeteria Historia: Mollete ($50)"
+
+NUNCA escribas: "- Cafeteria X: ... - Cafeteria Y: ..."
+SIEMPRE usa salto de línea + bullet (•) antes de cada opción.
+
+REGLAS:
+1. Respuestas cortas y directas
+2. Si preguntan "más barato", busca precios menores
+3. Si hay PRESUPUESTO, solo sugiere platillos que quepan en él
+<|im_end|>
+"""
+
+    # Modo 'dish': platillos candidatos que se agrupan por cafetería antes de armar el contexto
+    DISH_CANDIDATES = 30
+
+    def __init__(self, data_path: str = None, cache_dir: str = None, batching: bool = None,
+                 decoding: str = None, answer_cache: bool = None, retrieval: str = None,
+                 prompt_budget: int = None, prefix_cache: bool = None, backend: str = None,
+                 open_filter: str = None, persist_changes: bool = None):
         logger.info("🦉 Inicializando El Búho Tragón RAG System v3.0...")
 
         if data_path is None:
             script_dir = os.path.dirname(os.path.abspath(__file__))
             data_path = os.path.join(script_dir, "rag_data_fixed.json")
 
+        if cache_dir is None:
+            cache_dir = os.getenv("BUHO_RAG_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".rag_cache")
+
         self.data_path = data_path
+        self.index_store = IndexStore(cache_dir)
         self.data = None
         self.documents = []
+        self.doc_meta = []
+        self.embeddings = None
         self.faiss_index = None
-        self.chat_history = []
+        self.fast_path = None
+        self.geo = None
+        self.hours = None
+        self.menu_prices = None
+        self._priced_menus = []
+        self._index_mmapped = False
+        self._tienda_pos = {}
+
+        # Recuperación: 'grouped' (un documento por cafetería) o 'dish' (platillos + BM25, agrupados después)
+        self.retrieval_mode = retrieval or os.getenv("BUHO_RAG_RETRIEVAL", "grouped")
+        self.dish_index = None
+
+        # Cafeterías cerradas fuera del contexto: 'auto' (solo si preguntan por lo abierto ahora),
+        # 'always' o 'off'
+        self.open_filter = open_filter or os.getenv("BUHO_RAG_OPEN_FILTER", "auto")
+
+        self.conversations = ConversationStore(
+            max_turns=10,
+            ttl_seconds=float(os.getenv("BUHO_RAG_SESSION_TTL", 1800)),
+            max_sessions=int(os.getenv("BUHO_RAG_MAX_SESSIONS", 1000)),
+        )
+
+        # Cola de cambios del modelo de datos (post_save / post_delete de Django)
+        self._pending_changes = deque()
+        self._index_lock = threading.RLock()
+        # Escribir los cambios aplicados de vuelta en data_path para que sobrevivan a un reinicio.
+        # Apagado por default: rag_data_fixed.json está versionado. Django lo enciende para su foto
+        # de la base de datos (RAG_DATA_SNAPSHOT); BUHO_RAG_PERSIST_CHANGES=1 para otro archivo propio
+        if persist_changes is None:
+            persist_changes = os.getenv("BUHO_RAG_PERSIST_CHANGES", "0") == "1"
+        self.persist_changes = persist_changes
+
+        # Micro-batching de generación (BUHO_RAG_BATCHING=1 para activarlo)
+        if batching is None:
+            batching = os.getenv("BUHO_RAG_BATCHING", "0") == "1"
+        self.batching = batching
+        self.scheduler = None
+
+        # Decodificación: 'sample' (default) o 'greedy' (determinista, respuestas reproducibles)
+        self.decoding = decoding or os.getenv("BUHO_RAG_DECODING", "sample")
+        self.generation_kwargs = dict(self.GENERATION_KWARGS)
+        if self.decoding == "greedy":
+            self.generation_kwargs.update(do_sample=False)
+            self.generation_kwargs.pop('temperature', None)
+            self.generation_kwargs.pop('top_p', None)
+        # Segundos máximos esperando el siguiente fragmento del streaming (el primero incluye el prefill)
+        self.stream_timeout = float(os.getenv("BUHO_RAG_STREAM_TIMEOUT", 120))
+
+        # Caché semántica de respuestas (BUHO_RAG_ANSWER_CACHE=0 para desactivarla)
+        if answer_cache is None:
+            answer_cache = os.getenv("BUHO_RAG_ANSWER_CACHE", "1") == "1"
+        self.answer_cache = SemanticAnswerCache(
+            threshold=float(os.getenv("BUHO_RAG_CACHE_THRESHOLD", 0.95)),
+            max_entries=int(os.getenv("BUHO_RAG_CACHE_SIZE", 2000)),
+            ttl_seconds=float(os.getenv("BUHO_RAG_CACHE_TTL", 3600)),
+        ) if answer_cache else None
+        # Cambia con cada reconstrucción o actualización del índice; invalida la caché de respuestas
+        self.data_version = 0
+
+        # Presupuesto de tokens del prompt (plantilla + historial + datos)
+        self.prompt_budget = prompt_budget or int(os.getenv("BUHO_RAG_PROMPT_TOKENS", 3072))
+        self.context_packer = None
+
+        # KV-cache del SYSTEM_PROMPT (BUHO_RAG_PREFIX_CACHE=0 para desactivarla)
+        if prefix_cache is None:
+            prefix_cache = os.getenv("BUHO_RAG_PREFIX_CACHE", "1") == "1"
+        self.use_prefix_cache = prefix_cache
+        self.prefix_cache = None
+
+        # Estado de cada componente durante warm_up() (lo reporta el endpoint de salud)
+        self.components = {name: {'state': 'pending', 'seconds': None}
+                           for name in ('data', 'embeddings', 'llm', 'index', 'prefix_cache')}
+
+        # Backend del LLM: auto | fp32 | fp16 | int8 | int4 (ver llm_backends.py)
+        self.backend = backend or os.getenv("BUHO_RAG_BACKEND", "auto")
 
         # Modelos
         self.embedding_model = None
+        self.llm_model = None
         self.llm_pipeline = None
         self.tokenizer = None
         self.device = None
 
-        # Cache de ubicación
-        self.current_user_lat = None
-        self.current_user_lon = None
-
-        # 📍 MAPA MENTAL DEL CAMPUS (Con Alias Estudiantiles)
-        self.known_locations = {
-            # Ciencias Exactas
-            "exactas": (29.081527, -110.960999),
-            "matematicas": (29.081527, -110.960999),
-            "mates": (29.081527, -110.960999),  # ALIAS
-            "fisica": (29.081527, -110.960999),
-            "geologia": (29.081527, -110.960999),
-            "quimico": (29.081527, -110.960999),
-            "biologicas": (29.081355, -110.968206),
-
-            # Humanidades y Artes
-            "artes": (29.081607, -110.958986),
-            "bellas artes": (29.081607, -110.958986),
-            "musica": (29.081607, -110.958986),
-            "teatro": (29.081607, -110.958986),
-            "arquitectura": (29.081607, -110.958986),
-            "diseño": (29.081607, -110.958986),
-
-            # Letras
-            "letras": (29.082632, -110.960454),
-            "letritas": (29.082632, -110.960454), # ALIAS
-            "linguistica": (29.082632, -110.960454),
-            "idiomas": (29.082632, -110.960454),
-            "lenguas": (29.082632, -110.960454),
-
-            # Ingeniería
-            "ingenieria": (29.081694, -110.962732),
-            "civil": (29.081694, -110.962732),
-            "minas": (29.081694, -110.962732),
-            "industrial": (29.081694, -110.962732),
-            "quimica": (29.081694, -110.962732),
-
-            # Ciencias Sociales
-            "derecho": (29.084896, -110.963255),
-            "economia": (29.084896, -110.963255),
-            "enfermeria": (29.084896, -110.963255),
-            "administrativas": (29.084896, -110.963255),
-            "sociales": (29.085566, -110.965056),
-            "sociologia": (29.085566, -110.965056),
-            "trabajo social": (29.085566, -110.965056),
-            "servicio social": (29.085566, -110.965056), # ✅ ALIAS CRÍTICO
-            "psicologia": (29.085566, -110.965056),
-            "comunicacion": (29.085566, -110.965056),
-            "historia": (29.085566, -110.965056),
-            "educacion": (29.085566, -110.965056),
-
-            # Otros
-            "contabilidad": (29.084019, -110.964915),
-            "conta": (29.084019, -110.964915),
-            "gimnasio": (29.082979, -110.964557),
-            "deporte": (29.082979, -110.964557),
-            "medicina": (29.081355, -110.968206),
-            "salud": (29.081355, -110.968206),
-            "vicerrectoria": (29.0822, -110.9615),
-            "rectoria": (29.0822, -110.9615),
-            "biblioteca": (29.0833, -110.9630),
-        }
+        # 📍 MAPA MENTAL DEL CAMPUS (alias estudiantiles en campus_locations.json)
+        locations_path = os.getenv("BUHO_RAG_LOCATIONS") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "campus_locations.json")
+        self.locations = LocationMatcher.from_file(locations_path)
 
         logger.info("✅ RAG System inicializado correctamente")
 
@@ -132,48 +265,153 @@ class BuhoRAG:
             self.data = json.load(f)
         logger.info(f"📂 Datos cargados: {len(self.data.get('tienditas', []))} cafeterías")
 
+    def save_data(self):
+        """Escribe self.data en data_path (reemplazo atómico: un lector nunca ve el archivo a medias)."""
+        tmp_path = f"{self.data_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.data_path)
+        except OSError as e:
+            # El índice en memoria ya tiene el cambio: solo se pierde al reiniciar
+            logger.warning(f"⚠️ No se pudieron guardar los cambios en {self.data_path}: {e}")
+
+    def _load_embedding_model(self):
+        if self.embedding_model is None:
+            logger.info("📥 Cargando embeddings...")
+            self.embedding_model = SentenceTransformer(self.EMBEDDING_MODEL_ID, device='cpu')
+
     def _load_models(self):
         if self.device is None:
             self.device, self.dtype = self._detect_device()
 
-        if self.embedding_model is None:
-            logger.info("📥 Cargando embeddings...")
-            self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2', device='cpu')
+        self._load_embedding_model()
 
         if self.llm_pipeline is None:
             logger.info("📥 Cargando LLM Qwen 14B...")
-            model_id = "Qwen/Qwen2.5-14B-Instruct"
-            self.tokenizer = AutoTokenizer.from_pretrained(model_id, trust_remote_code=True)
-            model = AutoModelForCausalLM.from_pretrained(
-                model_id, torch_dtype=self.dtype, device_map=self.device, trust_remote_code=True,
-                low_cpu_mem_usage=True, attn_implementation="eager"
+            self.tokenizer = AutoTokenizer.from_pretrained(self.LLM_MODEL_ID, trust_remote_code=True)
+            # Sin GPU, 'auto' usa int8: el 14B en float32 no cabe ni responde a tiempo en CPU
+            model, self.backend = load_causal_lm(
+                self.LLM_MODEL_ID, self.backend, self.device, trust_remote_code=True, attn_implementation="eager"
             )
+            self.dtype = torch.float16 if self.backend == 'fp16' else torch.float32
+            self.llm_model = model
             self.llm_pipeline = pipeline("text-generation", model=model, tokenizer=self.tokenizer, torch_dtype=self.dtype)
             logger.info("✅ LLM cargado")
 
+        if self.context_packer is None:
+            self.context_packer = ContextPacker(self.tokenizer, budget=self.prompt_budget)
+
+        # Con micro-batching el relleno a la izquierda desplaza el prefijo: no se puede compartir la caché
+        if self.use_prefix_cache and not self.batching and self.prefix_cache is None:
+            self.prefix_cache = PrefixKVCache(self.llm_model, self.tokenizer)
+
+        if self.batching and self.scheduler is None:
+            # Los batches se rellenan a la izquierda para que todos generen desde la misma posición
+            self.tokenizer.padding_side = 'left'
+            if self.tokenizer.pad_token_id is None:
+                self.tokenizer.pad_token = self.tokenizer.eos_token
+            self.scheduler = GenerationScheduler(
+                self.generate_batch,
+                max_batch_size=int(os.getenv("BUHO_RAG_MAX_BATCH", 8)),
+                max_wait_ms=float(os.getenv("BUHO_RAG_BATCH_WAIT_MS", 20)),
+            )
+
+    def _warm_prefix_cache(self):
+        if self.prefix_cache is not None:
+            self.prefix_cache.ensure(self.SYSTEM_PROMPT)
+
+    def warm_up(self):
+        """
+        Carga todo lo que la primera consulta cargaría de forma perezosa, registrando
+        estado y duración de cada componente en self.components. Si un paso falla,
+        queda en 'error' y la excepción se propaga.
+        """
+        steps = [
+            ('data', self.load_data),
+            ('embeddings', self._load_embedding_model),
+            ('llm', self._load_models),
+            ('index', self.build_index),
+            ('prefix_cache', self._warm_prefix_cache),
+        ]
+        for name, step in steps:
+            self.components[name] = {'state': 'loading', 'seconds': None}
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                self.components[name] = {'state': 'error', 'seconds': round(time.perf_counter() - start, 2), 'error': str(e)}
+                raise
+            self.components[name] = {'state': 'ready', 'seconds': round(time.perf_counter() - start, 2)}
+        logger.info(f"🔥 Warm-up completo: { {n: c['seconds'] for n, c in self.components.items()} }")
+
     @staticmethod
     def calculate_distance(lat1, lon1, lat2, lon2):
         if not all([lat1, lon1, lat2, lon2]): return 99999
-        R = 6371000
-        lat1, lon1, lat2, lon2 = map(radians, [float(lat1), float(lon1), float(lat2), float(lon2)])
-        a = sin((lat2-lat1)/2)**2 + cos(lat1) * cos(lat2) * sin((lon2-lon1)/2)**2
-        return R * (2 * atan2(sqrt(a), sqrt(1-a)))
+        return float(haversine(float(lat1), float(lon1), float(lat2), float(lon2)))
 
     def get_coords_from_query(self, query: str) -> Tuple[Optional[float], Optional[float], Optional[str]]:
-        query_lower = query.lower()
-        if any(x in query_lower for x in ['caborca', 'navojoa', 'nogales', 'cajeme', 'santa ana']):
+        found = self.locations.match(query)
+        if found is None:
             return None, None, None
+        logger.info(f"📍 Ubicación detectada: '{found['alias']}' ({found['place']})")
+        return found['lat'], found['lon'], found['alias']
+
+    def _render_tienda_doc(self, tienda: Dict, menus: List[Dict]) -> str:
+        """Documento de una cafetería. No incluye distancia: el índice es independiente de la ubicación."""
+        # Limpiar nombre (CamelCase -> Espacios)
+        nombre_limpio = re.sub(r'([a-z])([A-Z])', r'\1 \2', tienda.get('nombre', 'Desconocida'))
+
+        lines = [f"CAFETERÍA: {nombre_limpio}"]
+        lines.append(f"UBICACIÓN: {tienda.get('direccion', '')}, {tienda.get('facultad_nombre', '')}")
+
+        if tienda.get('hora_apertura'):
+            lines.append(f"HORARIO: {str(tienda['hora_apertura'])[:5]} - {str(tienda['hora_cierre'])[:5]}")
+
+        lines.append("\nMENÚ:")
+        if menus:
+            for m in menus[:50]:
+                try:
+                    precio = float(m['precio'])
+                    nombre_platillo = m['nombre'].strip().replace("\n", " ")
+                    lines.append(f"- {nombre_platillo} (${precio:.0f} MXN)")
+                except: pass
+        else:
+            lines.append("(Sin menú disponible)")
 
-        for place, coords in self.known_locations.items():
-            if place in query_lower:
-                logger.info(f"📍 Ubicación detectada: '{place}'")
-                return coords[0], coords[1], place
-        return None, None, None
+        return "\n".join(lines)
 
-    def build_index(self, ref_lat: Optional[float] = None, ref_lon: Optional[float] = None):
+    @staticmethod
+    def _to_float(value) -> Optional[float]:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    def build_index(self):
+        """
+        Construye embeddings e índice FAISS una sola vez, sin depender de la ubicación del usuario.
+        Si la caché en disco tiene la misma llave (datos + modelo + versión de renderizado), no se codifica nada.
+        """
         if not self.data: self.load_data()
         self._load_models()
+
+        cache_key = IndexStore.make_key(self.data_path, self.EMBEDDING_MODEL_ID, self.DOC_RENDER_VERSION)
+        cached = self.index_store.load(cache_key)
+        if cached:
+            self.documents = cached['documents']
+            self.doc_meta = cached['doc_meta']
+            self.embeddings = cached['embeddings']
+            self.faiss_index = cached['index']
+            self._build_lookups()
+            self.data_version += 1
+            self._index_mmapped = True
+            self._tienda_pos = {m['id_tiendita']: pos for pos, m in enumerate(self.doc_meta)}
+            self._build_dish_index()
+            return
+
         self.documents = []
+        self.doc_meta = []
 
         menus_by_store = {}
         for menu in self.data.get('menus', []):
@@ -181,127 +419,438 @@ class BuhoRAG:
             if tid not in menus_by_store: menus_by_store[tid] = []
             menus_by_store[tid].append(menu)
 
-        tienditas = self.data.get('tienditas', [])
-
-        if ref_lat and ref_lon:
-            for t in tienditas:
-                t['distancia_temp'] = self.calculate_distance(ref_lat, ref_lon, t.get('latitud'), t.get('longitud'))
-            tienditas.sort(key=lambda x: x.get('distancia_temp', 9999999))
-            logger.info("📍 Cafeterías reordenadas por distancia")
-
-        for tienda in tienditas:
+        for tienda in self.data.get('tienditas', []):
             tid = tienda.get('id_tiendita')
-            # Limpiar nombre (CamelCase -> Espacios)
-            nombre_limpio = re.sub(r'([a-z])([A-Z])', r'\1 \2', tienda.get('nombre', 'Desconocida'))
-
-            lines = [f"CAFETERÍA: {nombre_limpio}"]
-            lines.append(f"UBICACIÓN: {tienda.get('direccion', '')}, {tienda.get('facultad_nombre', '')}")
-
-            if 'distancia_temp' in tienda:
-                dist = tienda['distancia_temp']
-                lines.append(f"DISTANCIA: {dist:.0f} metros") # Formato simple para el LLM
-
-            if tienda.get('hora_apertura'):
-                lines.append(f"HORARIO: {str(tienda['hora_apertura'])[:5]} - {str(tienda['hora_cierre'])[:5]}")
-
-            lines.append("\nMENÚ:")
-            if menus_by_store.get(tid):
-                for m in menus_by_store[tid][:50]:
-                    try:
-                        precio = float(m['precio'])
-                        nombre_platillo = m['nombre'].strip().replace("\n", " ")
-                        lines.append(f"- {nombre_platillo} (${precio:.0f} MXN)")
-                    except: pass
-            else:
-                lines.append("(Sin menú disponible)")
-
-            self.documents.append("\n".join(lines))
+            self.documents.append(self._render_tienda_doc(tienda, menus_by_store.get(tid, [])))
+            self.doc_meta.append({
+                'id_tiendita': tid,
+                'latitud': self._to_float(tienda.get('latitud')),
+                'longitud': self._to_float(tienda.get('longitud')),
+            })
 
         embeddings = self.embedding_model.encode(self.documents, show_progress_bar=False)
-        self.faiss_index = faiss.IndexFlatL2(embeddings.shape[1])
-        self.faiss_index.add(np.array(embeddings).astype('float32'))
-        logger.info("✅ Índice FAISS actualizado")
+        self.embeddings = np.array(embeddings).astype('float32')
+        # IDMap2 con id = posición del documento, para reemplazar vectores sin reconstruir
+        self.faiss_index = faiss.IndexIDMap2(faiss.IndexFlatL2(self.embeddings.shape[1]))
+        self.faiss_index.add_with_ids(self.embeddings, np.arange(len(self.documents), dtype='int64'))
+        self._index_mmapped = False
+        self._tienda_pos = {m['id_tiendita']: pos for pos, m in enumerate(self.doc_meta)}
+        self._build_lookups()
+        self.data_version += 1
+        logger.info(f"✅ Índice FAISS construido ({len(self.documents)} documentos)")
+
+        self.index_store.save(cache_key, self.documents, self.doc_meta, self.embeddings, self.faiss_index)
+        self._build_dish_index()
+
+    def _build_lookups(self):
+        """Índices en memoria derivados de self.data: coordenadas, horarios, precios y ruta rápida."""
+        self.geo = GeoIndex.from_records(self.data.get('tienditas', []))
+        self.hours = OpeningHoursIndex(self.data.get('tienditas', []))
+        self._tiendas = {t.get('id_tiendita'): t for t in self.data.get('tienditas', [])}
+        self._priced_menus = [m for m in self.data.get('menus', [])
+                              if m.get('id_tiendita') in self._tiendas and self._to_float(m.get('precio')) is not None]
+        self._priced_ids = np.array([m.get('id_menu', -1) for m in self._priced_menus], dtype='int64')
+        self.menu_prices = MenuPriceIndex.from_menus(self._priced_menus)
+        self.fast_path = FastPathRouter(self.data, self.geo)
+
+    def _build_dish_index(self):
+        """Índice por platillo (solo en modo 'dish'), con su propia entrada en la caché en disco."""
+        if self.retrieval_mode != 'dish':
+            return
+
+        self.dish_index = DishIndex(self.embedding_model)
+        cache_key = IndexStore.make_key(self.data_path, self.EMBEDDING_MODEL_ID, f"dish{self.DOC_RENDER_VERSION}")
+        cached = self.index_store.load(cache_key)
+        if cached:
+            self.dish_index.load(cached['documents'], cached['doc_meta'], cached['index'])
+            return
+
+        embeddings = self.dish_index.build(self.data)
+        texts, meta = self.dish_index.export()
+        self.index_store.save(cache_key, texts, meta, embeddings, self.dish_index.faiss_index)
+
+    # ----------------------------------------
+    # Mantenimiento incremental del índice
+    # ----------------------------------------
+
+    def enqueue_change(self, model: str, action: str, record: Dict):
+        """
+        Encola un cambio de Menus, Tienditas o Facultades.
+        model: 'menus' | 'tienditas' | 'facultades'; action: 'save' | 'delete';
+        record: el registro con el mismo formato que rag_data_fixed.json.
+        """
+        self._pending_changes.append((model, action, record))
 
-    def _retrieve_context(self, query: str, k: int = 8) -> List[str]:
-        q_emb = self.embedding_model.encode([query])
-        D, I = self.faiss_index.search(np.array(q_emb).astype('float32'), k)
-        return [self.documents[i] for i in I[0]]
+    @staticmethod
+    def _upsert_record(rows: List[Dict], key: str, record: Dict) -> Optional[Dict]:
+        """Reemplaza (o agrega) el registro con la misma llave y devuelve el anterior."""
+        for i, row in enumerate(rows):
+            if row.get(key) == record.get(key):
+                rows[i] = record
+                return row
+        rows.append(record)
+        return None
 
-    def query(self, question: str, user_lat=None, user_lon=None) -> Dict:
-        logger.info(f"💬 Consulta: {question[:50]}...")
+    @staticmethod
+    def _remove_record(rows: List[Dict], key: str, value) -> Optional[Dict]:
+        for i, row in enumerate(rows):
+            if row.get(key) == value:
+                return rows.pop(i)
+        return None
+
+    def _apply_change(self, model: str, action: str, record: Dict) -> Tuple[set, set]:
+        """
+        Aplica un cambio a self.data y devuelve (id_tiendita cuyo documento quedó obsoleto,
+        id_menu cuyo platillo hay que re-embeber en el índice por platillo).
+        """
+        affected = set()
+        dishes = set()
+
+        if model == 'menus':
+            menus = self.data.setdefault('menus', [])
+            if action == 'delete':
+                old = self._remove_record(menus, 'id_menu', record.get('id_menu'))
+            else:
+                old = self._upsert_record(menus, 'id_menu', record)
+                affected.add(record.get('id_tiendita'))
+            if old:
+                affected.add(old.get('id_tiendita'))
+            dishes.add(record.get('id_menu'))
+
+        elif model == 'tienditas':
+            tienditas = self.data.setdefault('tienditas', [])
+            tid = record.get('id_tiendita')
+            if action == 'delete':
+                self._remove_record(tienditas, 'id_tiendita', tid)
+            else:
+                self._upsert_record(tienditas, 'id_tiendita', record)
+            affected.add(tid)
+            # El nombre de la cafetería va en el texto de cada platillo
+            dishes |= {m.get('id_menu') for m in self.data.get('menus', []) if m.get('id_tiendita') == tid}
+
+        elif model == 'facultades':
+            facultades = self.data.setdefault('facultades', [])
+            fid = record.get('id_facultad')
+            if action == 'delete':
+                self._remove_record(facultades, 'id_facultad', fid)
+            else:
+                self._upsert_record(facultades, 'id_facultad', record)
+            nombre = record.get('nombre', '') if action != 'delete' else ''
+            for t in self.data.get('tienditas', []):
+                if t.get('id_facultad') == fid:
+                    t['facultad_nombre'] = nombre
+                    affected.add(t.get('id_tiendita'))
+
+        affected.discard(None)
+        dishes.discard(None)
+        return affected, dishes
+
+    def _ensure_writable_index(self):
+        """El índice cargado con memory mapping es de solo lectura: se copia antes del primer cambio."""
+        if self._index_mmapped:
+            self.faiss_index = faiss.clone_index(self.faiss_index)
+            self.embeddings = np.array(self.embeddings)
+            self._index_mmapped = False
+
+    def apply_pending_changes(self) -> int:
+        """
+        Drena la cola de cambios y re-embebe solo los documentos de las cafeterías afectadas
+        (y, en modo 'dish', solo los platillos afectados).
+        Devuelve el número de documentos re-embebidos.
+        """
+        if not self._pending_changes or self.faiss_index is None:
+            return 0
+
+        with self._index_lock:
+            affected, dishes = set(), set()
+            while self._pending_changes:
+                model, action, record = self._pending_changes.popleft()
+                changed_tiendas, changed_dishes = self._apply_change(model, action, record)
+                affected |= changed_tiendas
+                dishes |= changed_dishes
+            if self.persist_changes:
+                self.save_data()
+            if not affected:
+                return 0
+
+            if self.dish_index is not None:
+                self.dish_index.update(self.data, dishes)
+
+            self.data_version += 1
+            self._build_lookups()
+            self._ensure_writable_index()
+            tiendas = {t.get('id_tiendita'): t for t in self.data.get('tienditas', [])}
+
+            to_embed, positions = [], []
+            for tid in affected:
+                pos = self._tienda_pos.get(tid)
+                if pos is not None:
+                    self.faiss_index.remove_ids(np.array([pos], dtype='int64'))
+
+                tienda = tiendas.get(tid)
+                if tienda is None:
+                    # Cafetería eliminada: su vector ya no está en el índice
+                    if pos is not None:
+                        self.documents[pos] = ""
+                        self.doc_meta[pos] = {'id_tiendita': tid, 'latitud': None, 'longitud': None, 'deleted': True}
+                    continue
+
+                menus = [m for m in self.data.get('menus', []) if m.get('id_tiendita') == tid]
+                doc = self._render_tienda_doc(tienda, menus)
+                meta = {
+                    'id_tiendita': tid,
+                    'latitud': self._to_float(tienda.get('latitud')),
+                    'longitud': self._to_float(tienda.get('longitud')),
+                }
+                if pos is None:
+                    pos = len(self.documents)
+                    self.documents.append(doc)
+                    self.doc_meta.append(meta)
+                    self._tienda_pos[tid] = pos
+                else:
+                    self.documents[pos] = doc
+                    self.doc_meta[pos] = meta
+                to_embed.append(doc)
+                positions.append(pos)
+
+            if to_embed:
+                vectors = np.array(self.embedding_model.encode(to_embed, show_progress_bar=False)).astype('float32')
+                self.faiss_index.add_with_ids(vectors, np.array(positions, dtype='int64'))
+                if len(self.documents) > len(self.embeddings):
+                    grow = len(self.documents) - len(self.embeddings)
+                    self.embeddings = np.vstack([self.embeddings, np.zeros((grow, vectors.shape[1]), dtype='float32')])
+                self.embeddings[positions] = vectors
+
+            logger.info(f"🔁 Índice actualizado incrementalmente ({len(to_embed)} documentos re-embebidos)")
+            return len(to_embed)
 
-        # 1. Detectar Presupuesto
-        budget_match = re.search(r'(\d+)\s*(pesos|mxn|\$)', question.lower())
-        budget_val = float(budget_match.group(1)) if budget_match else None
-
-        # 2. Gestionar Ubicación (GPS vs Texto)
-        target_lat, target_lon = user_lat, user_lon
-        location_name = "Ubicación GPS" if user_lat else None
-
-        if not target_lat:
-            # Buscar en texto con alias
-            found_lat, found_lon, found_name = self.get_coords_from_query(question)
-            if found_lat:
-                target_lat, target_lon = found_lat, found_lon
-                location_name = found_name.upper() # Ej: "SERVICIO SOCIAL"
-
-        # 3. Actualizar Índice si es necesario
-        if not self.faiss_index: self.build_index()
-
-        if target_lat and target_lon:
-            # Reconstruir solo si nos movimos significativamente o es la primera vez con ubicación
-            should_rebuild = False
-            if self.current_user_lat is None: should_rebuild = True
-            elif target_lat != self.current_user_lat or target_lon != self.current_user_lon: should_rebuild = True
-
-            if should_rebuild:
-                logger.info(f"📍 Moviendo referencia a: {location_name}")
-                self.build_index(target_lat, target_lon)
-                self.current_user_lat = target_lat
-                self.current_user_lon = target_lon
-
-        # 4. Generar Respuesta
-        self._load_models()
-        context_docs = self._retrieve_context(question, k=10)
+    @staticmethod
+    def _location_bucket(lat: Optional[float], lon: Optional[float]) -> Optional[Tuple[float, float]]:
+        """Zona de ~100 m (3 decimales) para agrupar preguntas hechas desde el mismo lugar."""
+        if lat is None or lon is None:
+            return None
+        return round(lat, 3), round(lon, 3)
 
-        # Historial de 6 turnos
-        history_str = ""
-        for q, a in self.chat_history[-6:]:
-            history_str += f"Usuario: {q}\nBúho: {a}\n---\n"
+    @staticmethod
+    def _annotate_distance(doc: str, dist: float) -> str:
+        """Inserta la línea DISTANCIA después de UBICACIÓN (solo en el prompt, nunca en el índice)."""
+        lines = doc.split("\n")
+        lines.insert(2, f"DISTANCIA: {dist:.0f} metros") # Formato simple para el LLM
+        return "\n".join(lines)
+
+    def _rerank_by_distance(self, hits: List[Tuple[int, float]], ref_lat: float, ref_lon: float) -> List[Tuple[int, float, Optional[float]]]:
+        """
+        Re-ordena los resultados de FAISS combinando similitud semántica y cercanía.
+        Ambos puntajes se normalizan a [0, 1] dentro de los resultados recuperados.
+        """
+        # Una sola llamada vectorizada para todos los candidatos (NaN = cafetería sin coordenadas)
+        dists = self.geo.distances_to(ref_lat, ref_lon, [self.doc_meta[idx]['id_tiendita'] for idx, _ in hits])
+        known = ~np.isnan(dists)
+
+        sem = np.array([score for _, score in hits], dtype=np.float64)
+        sem_span = (sem.max() - sem.min()) or 1.0
+        geo_max = (dists[known].max() if known.any() else 1.0) or 1.0
+        geo = np.where(known, dists / geo_max, 1.0)
+
+        combined = (sem - sem.min()) / sem_span + self.GEO_RERANK_WEIGHT * geo
+        return [(hits[i][0], hits[i][1], float(dists[i]) if known[i] else None)
+                for i in np.argsort(combined, kind='stable')]
+
+    def _trace_entry(self, pos: int, score: float, dist: Optional[float]) -> Dict:
+        """Documento recuperado para la metadata de la consulta (score: menor es mejor)."""
+        return {
+            'id': self.doc_meta[pos]['id_tiendita'],
+            'score': round(float(score), 4),
+            'distance_m': round(dist) if dist is not None else None,
+        }
+
+    def _closed_stores(self, question: str, now) -> frozenset:
+        """Cafeterías que se descartan del contexto por estar cerradas en este momento."""
+        if self.hours is None or self.open_filter == 'off':
+            return frozenset()
+        if self.open_filter == 'auto' and not asks_open_now(question):
+            return frozenset()
+        return self.hours.closed_at(now)
+
+    def _menus_under(self, tid, budget: float) -> List[Dict]:
+        """Platillos de una cafetería que caben en el presupuesto, del más barato al más caro."""
+        return [self._priced_menus[i] for i in self.menu_prices.under(budget, [tid])]
+
+    def _tienda_doc(self, pos: int, budget: Optional[float]) -> str:
+        """Documento indexado, o uno con solo lo que cabe en el presupuesto (se arma al vuelo)."""
+        if budget is None:
+            return self.documents[pos]
+        tid = self.doc_meta[pos]['id_tiendita']
+        return self._render_tienda_doc(self._tiendas[tid], self._menus_under(tid, budget))
+
+    def _retrieve_context(self, query: str, k: int = 8, ref_lat: Optional[float] = None, ref_lon: Optional[float] = None,
+                          q_emb: Optional[np.ndarray] = None, exclude: frozenset = frozenset(),
+                          budget: Optional[float] = None, trace: Optional[List[Dict]] = None) -> List[str]:
+        """
+        exclude: ids de cafeterías que no deben llegar al prompt (p. ej. cerradas).
+        budget: solo platillos con precio <= budget; las cafeterías sin ninguno quedan fuera.
+        trace: si se pasa una lista, se le agrega {'id', 'score', 'distance_m'} de cada documento devuelto.
+        """
+        if q_emb is None:
+            q_emb = self.embedding_model.encode([query])
+        if self.dish_index is not None:
+            return self._retrieve_dishes(query, q_emb, k, ref_lat, ref_lon, exclude, budget, trace)
+        if budget is not None:
+            exclude = exclude | (frozenset(self._tiendas) - self.menu_prices.stores_under(budget))
+
+        # Con ubicación pedimos más candidatos para que el re-rank por distancia tenga margen;
+        # los excluidos no cuentan, así que se piden de más
+        pool = (k * 2 if ref_lat is not None and ref_lon is not None else k) + len(exclude)
+        with self._index_lock:
+            pool = min(pool, self.faiss_index.ntotal)
+            D, I = self.faiss_index.search(np.array(q_emb).astype('float32'), pool)
+            hits = [(int(i), float(d)) for d, i in zip(D[0], I[0])
+                    if i >= 0 and self.doc_meta[i]['id_tiendita'] not in exclude]
+
+            if ref_lat is None or ref_lon is None:
+                ranked = [(i, score, None) for i, score in hits[:k]]
+            else:
+                ranked = self._rerank_by_distance(hits, ref_lat, ref_lon)[:k]
+            if trace is not None:
+                trace.extend(self._trace_entry(idx, score, dist) for idx, score, dist in ranked)
+
+            docs = []
+            for idx, _, dist in ranked:
+                doc = self._tienda_doc(idx, budget)
+                docs.append(self._annotate_distance(doc, dist) if dist is not None else doc)
+            return docs
+
+    def _retrieve_dishes(self, query: str, q_emb: np.ndarray, k: int, ref_lat: Optional[float], ref_lon: Optional[float],
+                         exclude: frozenset = frozenset(), budget: Optional[float] = None,
+                         trace: Optional[List[Dict]] = None) -> List[str]:
+        """
+        Modo 'dish': búsqueda híbrida sobre platillos y agrupación por cafetería.
+        Cada documento del contexto lleva solo los platillos que coincidieron (y que caben en el presupuesto).
+        """
+        with self._index_lock:
+            # Con presupuesto, la búsqueda solo considera los platillos del corte por precio
+            allowed = self._priced_ids[self.menu_prices.under(budget)] if budget is not None else None
+            hits = self.dish_index.search(query, q_emb, k=self.DISH_CANDIDATES, allowed=allowed)
+            matched = {}
+            best = {}
+            for id_menu, score in hits:
+                meta = self.dish_index.meta[id_menu]
+                tid = meta['id_tiendita']
+                if tid in exclude:
+                    continue
+                matched.setdefault(tid, []).append(meta)
+                best.setdefault(tid, score)
+            tiendas = {t.get('id_tiendita'): t for t in self.data.get('tienditas', [])}
+
+            # Cafeterías ordenadas por su mejor platillo (puntaje negado: menor es mejor, como la distancia L2);
+            # _tienda_pos y doc_meta cambian con apply_pending_changes, así que se leen dentro del lock
+            stores = [(self._tienda_pos[tid], -score) for tid, score in best.items()
+                      if tid in tiendas and tid in self._tienda_pos]
+            if ref_lat is None or ref_lon is None:
+                ranked = [(pos, score, None) for pos, score in stores[:k]]
+            else:
+                ranked = self._rerank_by_distance(stores, ref_lat, ref_lon)[:k] if stores else []
+            if trace is not None:
+                trace.extend(self._trace_entry(pos, score, dist) for pos, score, dist in ranked)
+
+            docs = []
+            for pos, _, dist in ranked:
+                tid = self.doc_meta[pos]['id_tiendita']
+                doc = self._render_tienda_doc(tiendas[tid], matched[tid])
+                docs.append(self._annotate_distance(doc, dist) if dist is not None else doc)
+            return docs
+
+    def generate_batch(self, prompts: List[str], streams: Optional[List] = None) -> List[str]:
+        """
+        Genera varias respuestas en una sola llamada padded a generate().
+        streams: (streamer, evento de corte) o None por prompt, para las consultas en streaming.
+        """
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.llm_model.device)
+        stream_kwargs = {}
+        if streams is not None:
+            stream_kwargs['streamer'] = BatchStreamer([stream[0] if stream else None for stream in streams])
+            stream_kwargs['stopping_criteria'] = StoppingCriteriaList(
+                [StopOnEvent([stream[1] if stream else None for stream in streams])]
+            )
+        with torch.no_grad():
+            output_ids = self.llm_model.generate(
+                **inputs,
+                **self.generation_kwargs,
+                **stream_kwargs,
+                pad_token_id=self.tokenizer.pad_token_id
+            )
+        new_tokens = output_ids[:, inputs['input_ids'].shape[1]:]
+        return self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+
+    def _generation_inputs(self, prepared: Dict) -> Dict:
+        """
+        Entradas de generate() para un prompt; reutilizan la KV-cache del SYSTEM_PROMPT cuando se puede.
+        Anota en `prepared` los tokens (y el tiempo estimado) de prefill que se ahorraron.
+        """
+        prepared['prefill_saved_tokens'], prepared['prefill_saved_ms'] = 0, 0.0
+        if self.prefix_cache is not None:
+            self.prefix_cache.ensure(self.SYSTEM_PROMPT)
+            inputs = self.prefix_cache.inputs_for(prepared['prompt'])
+            if inputs is not None:
+                prepared['prefill_saved_tokens'] = self.prefix_cache.prefix_tokens
+                prepared['prefill_saved_ms'] = round(self.prefix_cache.prefill_ms, 1)
+                return inputs
+        return self.tokenizer(prepared['prompt'], return_tensors="pt").to(self.llm_model.device)
+
+    def _generate(self, prepared: Dict) -> str:
+        if self.scheduler is not None:
+            return self.scheduler.submit(prepared['prompt']).result()
+
+        if self.prefix_cache is not None:
+            inputs = self._generation_inputs(prepared)
+            with torch.no_grad():
+                output_ids = self.llm_model.generate(**inputs, **self.generation_kwargs, pad_token_id=self.tokenizer.eos_token_id)
+            return self.tokenizer.decode(output_ids[0, inputs['input_ids'].shape[1]:], skip_special_tokens=True)
+
+        outputs = self.llm_pipeline(
+            prepared['prompt'],
+            return_full_text=False,
+            pad_token_id=self.tokenizer.eos_token_id,
+            **self.generation_kwargs
+        )
+        return outputs[0]['generated_text']
+
+    def generation_stats(self) -> Dict:
+        """Estadísticas del micro-batching (vacío si está desactivado)."""
+        return self.scheduler.stats() if self.scheduler is not None else {}
+
+    def prefix_cache_stats(self) -> Dict:
+        """Prefill ahorrado por la KV-cache del SYSTEM_PROMPT (vacío si está desactivada)."""
+        return self.prefix_cache.stats() if self.prefix_cache is not None else {}
+
+    def answer_cache_stats(self) -> Dict:
+        """Aciertos/fallos de la caché semántica (vacío si está desactivada)."""
+        return self.answer_cache.stats() if self.answer_cache is not None else {}
+
+    def stats(self) -> Dict:
+        """Las tres estadísticas juntas (lo que devuelve GET /stats del servidor de inferencia)."""
+        return {
+            'generation': self.generation_stats(),
+            'answer_cache': self.answer_cache_stats(),
+            'prefix_cache': self.prefix_cache_stats(),
+        }
 
-        # Inyección de contexto
-        loc_ctx = ""
+    @staticmethod
+    def _build_prompt(question: str, location_name: Optional[str], budget_val: Optional[float],
+                      history_str: str, context_docs: List[str], open_time: Optional[str] = None) -> str:
+        """SYSTEM_PROMPT fijo + turno del usuario con la parte dinámica."""
         if location_name:
             loc_ctx = f"USUARIO ESTÁ EN: {location_name}. Las 'DISTANCIAS' en el menú son metros desde ahí."
+        else:
+            loc_ctx = "Ubicación desconocida."
+        budget_ctx = f"PRESUPUESTO: ${budget_val} pesos\n" if budget_val else ""
+        if open_time:
+            budget_ctx += f"HORA ACTUAL: {open_time} (solo se muestran cafeterías abiertas)\n"
 
-        prompt = f"""<|im_start|>system
-Eres "El Búho Tragón", asistente experto de UNISON.
-
+        return BuhoRAG.SYSTEM_PROMPT + f"""<|im_start|>user
 UBICACIÓN:
-{loc_ctx if location_name else "Ubicación desconocida."}
-"Servicio Social" = "Trabajo Social".
-
-FORMATO OBLIGATORIO:
-- NO uses asteriscos ** ni negritas
-- Cuando listes cafeterías o platillos, SIEMPRE formato así:
-
-Ejemplo correcto:
-"Los molletes están en:
-
-• Cafeteria Artes: Mollete ($30)
-• Cafeteria Derecho: Mollete ($30)
-• Cafeteria Historia: Mollete ($50)"
-
-NUNCA escribas: "- Cafeteria X: ... - Cafeteria Y: ..."
-SIEMPRE usa salto de línea + bullet (•) antes de cada opción.
-
-REGLAS:
-1. Respuestas cortas y directas
-2. Si preguntan "más barato", busca precios menores
-{f"3. PRESUPUESTO: ${budget_val} pesos" if budget_val else ""}
-
-<|im_end|>
-<|im_start|>user
+{loc_ctx}
+{budget_ctx}
 HISTORIAL:
 {history_str}
 
@@ -313,53 +862,236 @@ Pregunta: {question}
 <|im_start|>assistant
 """
 
-        outputs = self.llm_pipeline(
-            prompt,
-            max_new_tokens=250,
-            return_full_text=False,
-            temperature=0.1,
-            top_p=0.9,
-            do_sample=True,
-            repetition_penalty=1.05,
-            pad_token_id=self.tokenizer.eos_token_id
-        )
-
-        answer = outputs[0]['generated_text'].strip()
-
-        # Limpieza de tags del modelo
-        for tag in ["<|im_end|>", "<|im_start|>", "assistant", "user", "system"]:
-            answer = answer.replace(tag, "")
-
-        # --- LIMPIEZA DE FORMATO DEFINITIVA ---
-
-        # 1. Eliminar asteriscos de negritas (Markdown)
-        answer = answer.replace("**", "").replace("__", "")
-
-        # 2. Forzar salto de línea antes de cualquier Bullet (•)
-        # Si encuentra un bullet precedido de espacio, lo cambia por \n•
-        answer = answer.replace(" •", "\n•")
-        answer = answer.replace("• ", "\n• ") # Por si el LLM pone el bullet pegado
-
-        # 3. Forzar salto de línea antes de guiones usados como lista
-        # (Solo si hay espacio antes y después, para no romper palabras compuestas)
-        answer = re.sub(r'(\s)-\s', r'\n- ', answer)
-
-        # 4. Arreglar el inicio de la lista (después de los dos puntos)
-        # Convierte "están en: •" en "están en:\n•"
-        answer = answer.replace(": •", ":\n•").replace(": -", ":\n-")
-
-        # 5. Eliminar saltos de línea dobles o triples que hayan quedado
-        answer = re.sub(r'\n\s*\n', '\n', answer)
-
-        # Limpieza final
-        answer = re.sub(r'Respuesta:?\s*', '', answer, flags=re.IGNORECASE).strip()
+    def _prepare_query(self, question: str, user_lat=None, user_lon=None, session_id: str = DEFAULT_SESSION,
+                       timer: Optional[StageTimer] = None) -> Dict:
+        """Detecta presupuesto y ubicación, recupera contexto y arma el prompt. El timer queda en prepared['timer']."""
+        logger.info(f"💬 Consulta: {question[:50]}...")
+        timer = timer or StageTimer()
+
+        with timer.stage('parse'):
+            # Historial de la sesión (solo los turnos de este usuario): con historial la respuesta
+            # depende de la conversación y no se comparte por caché
+            turns = self.conversations.get_history(session_id, last_n=self.HISTORY_TURNS)
+
+            # 1. Detectar Presupuesto
+            budget_match = BUDGET_RE.search(question.lower())
+            budget_val = float(budget_match.group(1)) if budget_match else None
+
+            # 2. Gestionar Ubicación (GPS vs Texto)
+            target_lat, target_lon = user_lat, user_lon
+            location_name = "Ubicación GPS" if user_lat else None
+            location_alias = None
+
+            if not target_lat:
+                # Buscar en texto con alias
+                found_lat, found_lon, found_name = self.get_coords_from_query(question)
+                if found_lat:
+                    target_lat, target_lon = found_lat, found_lon
+                    location_alias = found_name
+                    location_name = found_name.upper() # Ej: "SERVICIO SOCIAL"
+
+        # 3. Índice único (independiente de la ubicación) + cambios pendientes del admin
+        with timer.stage('index'):
+            index_rebuilt = not self.faiss_index
+            if index_rebuilt: self.build_index()
+            index_updates = self.apply_pending_changes()
+        # Lo que la consulta le costó al índice (va en la metadata y en las métricas)
+        index_info = {'index_rebuilt': index_rebuilt, 'index_updates': index_updates}
+
+        if target_lat is not None and target_lon is not None:
+            target_lat, target_lon = float(target_lat), float(target_lon)
+
+        # 4. Ruta rápida: precio, horario y "lo más barato" salen directo de los datos
+        with timer.stage('fast_path'):
+            fast_answer = self.fast_path.answer(question, budget_val, target_lat, target_lon,
+                                                location=location_alias, has_history=bool(turns))
+        if fast_answer is not None:
+            logger.info("⚡ Respuesta por ruta rápida (sin LLM)")
+            return {
+                'cached': False,
+                'fast_path': True,
+                'answer': fast_answer,
+                'context': [],
+                'budget_detected': budget_val,
+                'location_used': location_name,
+                'timer': timer,
+                **index_info
+            }
+
+        # 5. Recuperar contexto
+        self._load_models()
+        if target_lat is not None:
+            logger.info(f"📍 Re-rank por distancia desde: {location_name}")
+        with timer.stage('embed'):
+            q_emb = self.embedding_model.encode([question])
+
+        # Horario: si se filtran las cerradas, la respuesta solo vale dentro del mismo tramo de horario
+        now = campus_now()
+        closed = self._closed_stores(question, now)
+        open_time = now.strftime('%H:%M') if closed else None
+        open_segment = self.hours.segment(now) if closed else None
+
+        # 6. Caché semántica: misma versión de datos, misma zona, mismo presupuesto y mismo tramo de horario.
+        # Solo preguntas sin historial: un seguimiento de otra conversación no sirve para esta sesión
+        cache_scope = None
+        if not turns:
+            cache_scope = (self.data_version, self._location_bucket(target_lat, target_lon), budget_val, open_segment)
+        if self.answer_cache is not None and cache_scope is not None:
+            with timer.stage('cache'):
+                hit = self.answer_cache.lookup(cache_scope, q_emb[0])
+            if hit is not None:
+                logger.info("⚡ Respuesta desde caché semántica")
+                return {
+                    'cached': True,
+                    'fast_path': False,
+                    'answer': hit['answer'],
+                    'context': hit['context'],
+                    'budget_detected': budget_val,
+                    'location_used': location_name,
+                    'timer': timer,
+                    **index_info
+                }
+
+        retrieved = []
+        with timer.stage('search'):
+            context_docs = self._retrieve_context(question, k=10, ref_lat=target_lat, ref_lon=target_lon, q_emb=q_emb,
+                                                  exclude=closed, budget=budget_val, trace=retrieved)
+        if closed:
+            logger.info(f"🕐 {len(closed)} cafeterías cerradas a las {open_time} fuera del contexto")
+
+        with timer.stage('prompt'):
+            history = [f"Usuario: {q}\nBúho: {a}\n---\n" for q, a in turns]
+
+            # Empaquetar historial y documentos dentro del presupuesto de tokens
+            base_tokens = self.context_packer.count(self._build_prompt(question, location_name, budget_val, "", [], open_time))
+            history, context_docs = self.context_packer.pack(base_tokens, history, context_docs)
+            prompt = self._build_prompt(question, location_name, budget_val, "".join(history), context_docs, open_time)
+            prompt_tokens = self.context_packer.count(prompt)
+        logger.info(f"🧾 Prompt: {prompt_tokens} tokens ({len(context_docs)} documentos, {len(history)} turnos)")
+
+        return {
+            'cached': False,
+            'fast_path': False,
+            'prompt': prompt,
+            'prompt_tokens': prompt_tokens,
+            'q_emb': q_emb,
+            'cache_scope': cache_scope,
+            'context': context_docs,
+            'retrieved': retrieved,
+            'budget_detected': budget_val,
+            'location_used': location_name,
+            'timer': timer,
+            **index_info
+        }
 
-        self.chat_history.append((question, answer))
-        if len(self.chat_history) > 10: self.chat_history = self.chat_history[-10:]
+    def _finish_query(self, question: str, answer: str, prepared: Dict, session_id: str) -> Dict:
+        self.conversations.append(session_id, question, answer)
+        if self.answer_cache is not None and prepared.get('cache_scope') is not None and answer:
+            self.answer_cache.store(prepared['cache_scope'], prepared['q_emb'][0],
+                                    {'answer': answer, 'context': prepared['context']})
 
         logger.info(f"✅ Respuesta: {answer[:50]}...")
-        return {'answer': answer, 'context': context_docs}
+        return {
+            'answer': answer,
+            'context': prepared['context'],
+            'budget_detected': prepared['budget_detected'],
+            'location_used': prepared['location_used'],
+            'cached': prepared['cached'],
+            'fast_path': prepared['fast_path'],
+            # 0 cuando no se generó (ruta rápida o caché)
+            'prompt_tokens': prepared.get('prompt_tokens', 0),
+            'completion_tokens': prepared.get('completion_tokens', 0),
+            'prefill_saved_tokens': prepared.get('prefill_saved_tokens', 0),
+            'prefill_saved_ms': prepared.get('prefill_saved_ms', 0.0),
+            # Instrumentación: milisegundos por etapa (ver stage_timer.QUERY_STAGES) y 'total',
+            # cafeterías recuperadas con su puntaje y si la consulta reconstruyó o actualizó el índice
+            'timings': prepared['timer'].as_ms(),
+            'retrieved': prepared.get('retrieved', []),
+            'index_rebuilt': prepared['index_rebuilt'],
+            'index_updates': prepared['index_updates']
+        }
 
-    def reset_conversation(self):
-        self.chat_history = []
+    def query(self, question: str, user_lat=None, user_lon=None, session_id: str = DEFAULT_SESSION) -> Dict:
+        prepared = self._prepare_query(question, user_lat, user_lon, session_id)
+        if 'answer' in prepared:
+            # Caché semántica o ruta rápida: no hay que generar
+            answer = prepared['answer']
+        else:
+            timer = prepared['timer']
+            with timer.stage('generate'):
+                raw = self._generate(prepared)
+            prepared['completion_tokens'] = self.context_packer.count(raw)
+            with timer.stage('cleanup'):
+                answer = clean_answer(raw)
+        return self._finish_query(question, answer, prepared, session_id)
+
+    def query_stream(self, question: str, user_lat=None, user_lon=None, session_id: str = DEFAULT_SESSION) -> Iterator[Dict]:
+        """
+        Igual que query(), pero va entregando la respuesta mientras se genera.
+        Produce eventos {'type': 'token', 'text': ...} y al final
+        {'type': 'done', ...} con la respuesta completa y la misma metadata que query().
+        """
+        prepared = self._prepare_query(question, user_lat, user_lon, session_id)
+        if 'answer' in prepared:
+            yield {'type': 'token', 'text': prepared['answer']}
+            yield {'type': 'done', **self._finish_query(question, prepared['answer'], prepared, session_id)}
+            return
+
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True,
+                                        timeout=self.stream_timeout)
+        stop = threading.Event()
+
+        if self.scheduler is not None:
+            # Con micro-batching el streaming va en el batch con las demás consultas: un solo generate()
+            prepared['prefill_saved_tokens'], prepared['prefill_saved_ms'] = 0, 0.0
+            generation = self.scheduler.submit(prepared['prompt'], streamer=streamer, stop=stop)
+        else:
+            inputs = self._generation_inputs(prepared)
+            generation = Future()
+
+            def generate():
+                try:
+                    self.llm_model.generate(**inputs, **self.generation_kwargs, streamer=streamer,
+                                            stopping_criteria=StoppingCriteriaList([StopOnEvent([stop])]),
+                                            pad_token_id=self.tokenizer.eos_token_id)
+                except Exception as e:
+                    generation.set_exception(e)
+                else:
+                    generation.set_result(None)
+
+            threading.Thread(target=generate, name='buho-rag-stream', daemon=True).start()
+
+        # Si generate() falla, sin esto el consumidor esperaría fragmentos que nunca llegan
+        generation.add_done_callback(lambda done: streamer.end() if done.exception() is not None else None)
+
+        # En streaming 'generate' incluye la limpieza incremental y el envío de cada fragmento
+        cleaner = IncrementalCleaner()
+        try:
+            with prepared['timer'].stage('generate'):
+                try:
+                    for piece in streamer:
+                        delta = cleaner.feed(piece)
+                        if delta:
+                            yield {'type': 'token', 'text': delta}
+                except queue.Empty:
+                    raise TimeoutError(f"El LLM no produjo texto en {self.stream_timeout:.0f} s") from None
+                # Propaga el error de generate() (si lo hubo) y espera a que termine
+                generation.result()
+        finally:
+            # Cliente desconectado o error: que el hilo deje de generar
+            stop.set()
+        prepared['completion_tokens'] = self.context_packer.count(cleaner.raw)
+
+        answer, delta = cleaner.finish()
+        if delta:
+            yield {'type': 'token', 'text': delta}
+
+        result = self._finish_query(question, answer, prepared, session_id)
+        yield {'type': 'done', **result}
+
+    def conversation_length(self, session_id: str = DEFAULT_SESSION) -> int:
+        return self.conversations.turn_count(session_id)
+
+    def reset_conversation(self, session_id: str = DEFAULT_SESSION):
+        self.conversations.reset(session_id)
         logger.info("🔄 Reset")
\ No newline at end of file
@@ -0,0 +1,244 @@
+"""
+🦉 El Búho Tragón - Servidor de inferencia local
+Un solo proceso dueño de los modelos y del índice; todos los workers de Django le hablan
+con rag_client.RAGClient en lugar de cargar cada uno su propia copia del LLM.
+
+Escucha en un socket Unix o en localhost (HTTP/1.1 con keep-alive, JSON):
+    GET  /health        estado de carga por componente (200 listo / 503 cargando)
+    GET  /stats         micro-batching, caché de respuestas y KV-cache del prefijo
+    POST /query         {"question", "lat", "lon", "session_id"} -> resultado de BuhoRAG.query
+    POST /stream        igual, pero responde NDJSON con eventos token/done
+    POST /reset         {"session_id"}
+    POST /changes       {"model", "action", "record"} (señales de Django)
+
+Uso:
+    python rag_server.py --socket /tmp/buho_rag.sock
+    python rag_server.py --port 8765
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from contextlib import closing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rag_engine_hpc import BuhoRAG
+
+logger = logging.getLogger(__name__)
+
+# Cambios que acepta POST /changes (ver BuhoRAG.enqueue_change)
+CHANGE_MODELS = ('menus', 'tienditas', 'facultades')
+CHANGE_ACTIONS = ('save', 'delete')
+
+
+class RAGService:
+    """Envuelve al BuhoRAG del proceso: warm-up en segundo plano y cola acotada de consultas."""
+
+    def __init__(self, rag: BuhoRAG, max_pending: int = 32):
+        self.rag = rag
+        self.ready = threading.Event()
+        self.error = None
+        # Consultas en curso + en espera; la que no cabe recibe 503 de inmediato
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def start_warm_up(self):
+        def run():
+            try:
+                self.rag.warm_up()
+                self.ready.set()
+            except Exception as e:
+                self.error = str(e)
+                logger.error(f"❌ Falló el warm-up del servidor RAG: {e}", exc_info=True)
+        threading.Thread(target=run, name="buho-rag-warmup", daemon=True).start()
+
+    def try_acquire(self) -> bool:
+        return self._slots.acquire(blocking=False)
+
+    def release(self):
+        self._slots.release()
+
+
+class RAGRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: el cliente reutiliza la conexión
+    service: RAGService = None
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt % args)
+
+    def address_string(self):
+        # En socket Unix client_address es una cadena vacía
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _not_ready(self):
+        state = 'error' if self.service.error else 'loading'
+        self._send_json(503, {'error': 'RAG no está listo', 'state': state}, {'Retry-After': '5'})
+
+    def do_GET(self):
+        rag = self.service.rag
+        if self.path == '/health':
+            ready = self.service.ready.is_set()
+            self._send_json(200 if ready else 503, {
+                'ready': ready,
+                'error': self.service.error,
+                'components': rag.components,
+            })
+        elif self.path == '/stats':
+            self._send_json(200, rag.stats())
+        else:
+            self._send_json(404, {'error': 'Ruta desconocida'})
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            self._send_json(400, {'error': 'JSON inválido'})
+            return
+
+        rag = self.service.rag
+        if self.path == '/changes':
+            error = self._change_error(payload)
+            if error:
+                self._send_json(400, {'error': error})
+                return
+            # Se aceptan aunque el modelo siga cargando: se aplican en la primera consulta
+            rag.enqueue_change(payload['model'], payload['action'], payload['record'])
+            self._send_json(200, {'queued': True})
+            return
+
+        if not self.service.ready.is_set():
+            self._not_ready()
+            return
+
+        if self.path == '/reset':
+            rag.reset_conversation(payload.get('session_id') or BuhoRAG.DEFAULT_SESSION)
+            self._send_json(200, {'reset': True})
+        elif self.path in ('/query', '/stream'):
+            if not self.service.try_acquire():
+                self._send_json(503, {'error': 'Cola de consultas llena', 'state': 'busy'}, {'Retry-After': '2'})
+                return
+            try:
+                if self.path == '/query':
+                    self._handle_query(payload)
+                else:
+                    self._handle_stream(payload)
+            finally:
+                self.service.release()
+        else:
+            self._send_json(404, {'error': 'Ruta desconocida'})
+
+    @staticmethod
+    def _change_error(payload: dict):
+        """Mensaje de error si el cuerpo de /changes no es un cambio válido; None si lo es."""
+        if payload.get('model') not in CHANGE_MODELS:
+            return f"'model' debe ser uno de {', '.join(CHANGE_MODELS)}"
+        if payload.get('action') not in CHANGE_ACTIONS:
+            return f"'action' debe ser uno de {', '.join(CHANGE_ACTIONS)}"
+        if not isinstance(payload.get('record'), dict):
+            return "'record' debe ser un objeto"
+        return None
+
+    def _query_args(self, payload: dict) -> dict:
+        return {
+            'question': payload.get('question', ''),
+            'user_lat': payload.get('lat'),
+            'user_lon': payload.get('lon'),
+            'session_id': payload.get('session_id') or BuhoRAG.DEFAULT_SESSION,
+        }
+
+    def _handle_query(self, payload: dict):
+        args = self._query_args(payload)
+        try:
+            result = self.service.rag.query(**args)
+        except Exception as e:
+            logger.error(f"❌ Error en consulta: {e}", exc_info=True)
+            self._send_json(500, {'error': str(e)})
+            return
+        result['conversation_length'] = self.service.rag.conversation_length(args['session_id'])
+        self._send_json(200, result)
+
+    def _handle_stream(self, payload: dict):
+        args = self._query_args(payload)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            # closing(): si el cliente se desconecta, el generador corta la generación en curso
+            with closing(self.service.rag.query_stream(**args)) as events:
+                for event in events:
+                    if event['type'] == 'done':
+                        event['conversation_length'] = self.service.rag.conversation_length(args['session_id'])
+                    self._send_chunk((json.dumps(event, ensure_ascii=False, default=str) + "\n").encode('utf-8'))
+        except Exception as e:
+            logger.error(f"❌ Error en streaming: {e}", exc_info=True)
+            self._send_chunk((json.dumps({'type': 'error', 'error': str(e)}) + "\n").encode('utf-8'))
+        self._send_chunk(b"")
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+        os.chmod(self.server_address, 0o660)
+
+
+def make_server(service: RAGService, socket_path: str = None, host: str = "127.0.0.1", port: int = 8765):
+    handler = type('BoundRAGRequestHandler', (RAGRequestHandler,), {'service': service})
+    if socket_path:
+        return UnixHTTPServer(socket_path, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de inferencia de El Búho Tragón")
+    parser.add_argument('--socket', default=os.getenv("BUHO_RAG_SOCKET"), help="Ruta del socket Unix")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=int(os.getenv("BUHO_RAG_PORT", 8765)))
+    parser.add_argument('--max-pending', type=int, default=int(os.getenv("BUHO_RAG_MAX_PENDING", 32)),
+                        help="Consultas simultáneas (en curso + en espera) antes de responder 503")
+    args = parser.parse_args()
+
+    service = RAGService(BuhoRAG(), max_pending=args.max_pending)
+    service.start_warm_up()
+    server = make_server(service, args.socket, args.host, args.port)
+    where = args.socket or f"{args.host}:{args.port}"
+    logger.info(f"🦉 Servidor RAG escuchando en {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+🦉 El Búho Tragón - Tiempo por etapa de una consulta
+Cada consulta lleva un StageTimer: las etapas (parseo, embedding, búsqueda, prompt, generación,
+limpieza) se miden con `with timer.stage(nombre):` y el total corre desde que se crea el timer.
+Una etapa que se repite en la misma consulta acumula su tiempo.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+# Etapas de BuhoRAG.query en el orden en que ocurren
+QUERY_STAGES = ('parse', 'index', 'fast_path', 'embed', 'cache', 'search', 'prompt', 'generate', 'cleanup')
+
+
+class StageTimer:
+    def __init__(self):
+        self.seconds = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+
+    def as_ms(self) -> Dict[str, float]:
+        """Milisegundos por etapa medida, más 'total' hasta este momento."""
+        timings = {name: round(s * 1000, 3) for name, s in self.seconds.items()}
+        timings['total'] = round((time.perf_counter() - self._start) * 1000, 3)
+        return timings
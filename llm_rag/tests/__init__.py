@@ -0,0 +1,10 @@
+"""
+Pruebas de los módulos de llm_rag que no necesitan cargar los modelos reales.
+Desde llm_rag/:  python -m unittest discover tests
+"""
+
+import os
+import sys
+
+# Los módulos de llm_rag se importan planos (from fast_path import ...), como en rag_engine_hpc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,76 @@
+import unittest
+from unittest import mock
+
+from answer_cache import SemanticAnswerCache
+from conversation_store import ConversationStore
+from stage_timer import StageTimer
+
+try:
+    import rag_engine_hpc
+except ImportError:  # pragma: no cover - depende del entorno
+    rag_engine_hpc = None
+
+# (versión de datos, zona, presupuesto, tramo de horario), como los arma el motor
+SCOPE = (1, None, None, None)
+TACOS = [1.0, 0.0, 0.0]
+TACOS_PARECIDO = [0.99, 0.1, 0.0]
+POSTRES = [0.0, 1.0, 0.0]
+
+
+class SemanticAnswerCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = SemanticAnswerCache(threshold=0.95, max_entries=2, ttl_seconds=60)
+
+    def test_similar_question_in_the_same_scope_hits(self):
+        self.cache.store(SCOPE, TACOS, 'Tacos en Derecho')
+        self.assertEqual(self.cache.lookup(SCOPE, TACOS_PARECIDO), 'Tacos en Derecho')
+        self.assertIsNone(self.cache.lookup(SCOPE, POSTRES))
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_other_scopes_never_share_answers(self):
+        self.cache.store(SCOPE, TACOS, 'Tacos en Derecho')
+        for scope in [(2, None, None, None), (1, (29.08, -110.96), None, None), (1, None, 50.0, None), (1, None, None, 3)]:
+            with self.subTest(scope=scope):
+                self.assertIsNone(self.cache.lookup(scope, TACOS))
+
+    def test_entries_expire(self):
+        with mock.patch('answer_cache.time.monotonic', return_value=0.0):
+            self.cache.store(SCOPE, TACOS, 'Tacos en Derecho')
+        with mock.patch('answer_cache.time.monotonic', return_value=61.0):
+            self.assertIsNone(self.cache.lookup(SCOPE, TACOS))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.store(SCOPE, TACOS, 'tacos')
+        self.cache.store(SCOPE, POSTRES, 'postres')
+        self.cache.lookup(SCOPE, TACOS)
+        self.cache.store(SCOPE, [0.0, 0.0, 1.0], 'agua')
+        self.assertEqual(self.cache.lookup(SCOPE, TACOS), 'tacos')
+        self.assertIsNone(self.cache.lookup(SCOPE, POSTRES))
+
+
+@unittest.skipIf(rag_engine_hpc is None, "torch/transformers no disponibles")
+class EngineCacheScopeTests(unittest.TestCase):
+    def setUp(self):
+        self.rag = rag_engine_hpc.BuhoRAG.__new__(rag_engine_hpc.BuhoRAG)
+        self.rag.conversations = ConversationStore()
+        self.rag.answer_cache = SemanticAnswerCache()
+
+    def finish(self, cache_scope, session_id):
+        prepared = {'cache_scope': cache_scope, 'q_emb': [TACOS], 'context': [], 'budget_detected': None,
+                    'location_used': None, 'cached': False, 'fast_path': False, 'timer': StageTimer(),
+                    'index_rebuilt': False, 'index_updates': 0}
+        self.rag._finish_query('¿Dónde hay tacos?', 'Tacos en Derecho', prepared, session_id)
+
+    def test_follow_ups_are_not_cached(self):
+        # Con historial el motor no arma cache_scope: la respuesta no debe llegar a otras sesiones
+        self.finish(None, 'sesion-a')
+        self.assertEqual(self.rag.answer_cache.stats()['entries'], 0)
+        self.assertEqual(self.rag.conversations.turn_count('sesion-a'), 1)
+
+        self.finish(SCOPE, 'sesion-b')
+        self.assertEqual(self.rag.answer_cache.lookup(SCOPE, TACOS)['answer'], 'Tacos en Derecho')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import random
+import unittest
+
+from answer_format import IncrementalCleaner, clean_answer
+
+ANSWER = ('Respuesta: Estas son las opciones: • **Torta Cubana** ($70) en Cafetería Artes • Burrito ($30) - Mollete\n\n'
+          'Los horarios son: - Artes: 07:00 - 15:00 - Derecho: 07:00 - 19:00<|im_end|>')
+PIECES = ['Respuesta:', ' ', '\n', '\n\n', '•', ' • ', '**', '-', ' - ', ': ', 'assistant', 'user', 'ass', 'istant',
+          '<|im_end|>', '<|', 'im_end|>', 'Torta', 'cubana', '$70', 'Artes', 'x']
+
+
+def stream(raw, rng):
+    """Alimenta raw en fragmentos al azar; devuelve (texto emitido, respuesta final, cleaner)."""
+    cleaner = IncrementalCleaner()
+    out, i = '', 0
+    while i < len(raw):
+        size = rng.randint(1, 6)
+        out += cleaner.feed(raw[i:i + size])
+        i += size
+    answer, delta = cleaner.finish()
+    return out + delta, answer, cleaner
+
+
+class IncrementalCleanerTests(unittest.TestCase):
+    def test_stream_matches_clean_answer(self):
+        rng = random.Random(0)
+        raw = ANSWER * 20
+        for _ in range(20):
+            streamed, answer, _ = stream(raw, rng)
+            self.assertEqual(answer, clean_answer(raw))
+            self.assertEqual(streamed, answer)
+
+    def test_random_fragments_never_emit_wrong_text(self):
+        rng = random.Random(1)
+        for _ in range(2000):
+            raw = ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 40)))
+            streamed, answer, _ = stream(raw, rng)
+            self.assertEqual(answer, clean_answer(raw))
+            self.assertEqual(streamed, answer, repr(raw))
+
+    def test_only_the_tail_is_recleaned(self):
+        _, _, cleaner = stream(ANSWER * 20, random.Random(2))
+        # Casi todo quedó congelado: lo que se limpia en cada token es corto
+        self.assertLess(len(cleaner.raw) - cleaner._cut, 2 * IncrementalCleaner.HOLDBACK)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from unittest import mock
+
+from conversation_store import ConversationStore
+
+
+class ConversationStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('conversation_store.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sessions_are_isolated_and_bounded(self):
+        store = ConversationStore(max_turns=2)
+        for i in range(3):
+            store.append('a', f'pregunta {i}', f'respuesta {i}')
+        self.assertEqual(store.get_history('a'), [('pregunta 1', 'respuesta 1'), ('pregunta 2', 'respuesta 2')])
+        self.assertEqual(store.get_history('a', last_n=1), [('pregunta 2', 'respuesta 2')])
+        self.assertEqual(store.get_history('b'), [])
+        self.assertEqual(store.stats()['total_chars'], 2 * len('pregunta 1respuesta 1'))
+
+    def test_inactive_sessions_expire(self):
+        store = ConversationStore(ttl_seconds=60)
+        store.append('a', 'hola', 'hola')
+        store.append('b', 'hola', 'hola')
+        self.now += 50
+        store.get_history('b')  # renueva b
+        self.now += 20
+        self.assertEqual(store.get_history('a'), [])
+        self.assertEqual(len(store.get_history('b')), 1)
+        self.assertEqual(store.stats(), {'sessions': 1, 'total_chars': 8})
+
+    def test_least_recently_used_session_is_evicted(self):
+        store = ConversationStore(max_sessions=2)
+        store.append('a', 'hola', 'hola')
+        store.append('b', 'hola', 'hola')
+        store.get_history('a')
+        store.append('c', 'hola', 'hola')
+        self.assertEqual(store.turn_count('b'), 0)
+        self.assertEqual(store.turn_count('a'), 1)
+        self.assertEqual(store.turn_count('c'), 1)
+
+    def test_character_limit_evicts_sessions(self):
+        store = ConversationStore(max_total_chars=100)
+        store.append('a', 'x' * 40, 'y' * 45)
+        store.append('b', 'x' * 10, 'y' * 10)
+        self.assertEqual(store.turn_count('a'), 0)
+        self.assertEqual(store.stats(), {'sessions': 1, 'total_chars': 20})
+
+    def test_turn_count_ignores_expired_sessions(self):
+        store = ConversationStore(ttl_seconds=60)
+        store.append('a', '¿Qué hay?', 'Tortas')
+        self.assertEqual(store.turn_count('a'), 1)
+
+        self.now += 61
+        self.assertEqual(store.turn_count('a'), 0)
+        self.assertEqual(store.get_history('a'), [])
+
+    def test_turn_count_does_not_renew_the_session(self):
+        store = ConversationStore(ttl_seconds=60)
+        store.append('a', '¿Qué hay?', 'Tortas')
+        self.now += 40
+        self.assertEqual(store.turn_count('a'), 1)
+        self.now += 40
+        self.assertEqual(store.turn_count('a'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+from fast_path import FastPathRouter
+from geo import GeoIndex
+
+# Cinco cafeterías en línea, ~1 km entre cada una; la más barata del campus está en la más lejana
+TIENDITAS = [
+    {'id_tiendita': 1, 'nombre': 'Cafeteria Artes', 'latitud': 29.080, 'longitud': -110.960,
+     'hora_apertura': '07:00:00', 'hora_cierre': '15:00:00'},
+    {'id_tiendita': 2, 'nombre': 'Cafeteria Derecho', 'latitud': 29.090, 'longitud': -110.960,
+     'hora_apertura': '07:00:00', 'hora_cierre': '19:00:00'},
+    {'id_tiendita': 3, 'nombre': 'Cafeteria Medicina', 'latitud': 29.100, 'longitud': -110.960,
+     'hora_apertura': '08:00:00', 'hora_cierre': '18:00:00'},
+    {'id_tiendita': 4, 'nombre': 'Cafeteria Geologia', 'latitud': 29.110, 'longitud': -110.960,
+     'hora_apertura': '08:00:00', 'hora_cierre': '16:00:00'},
+    {'id_tiendita': 5, 'nombre': 'Cafeteria Economia', 'latitud': 29.120, 'longitud': -110.960,
+     'hora_apertura': '09:00:00', 'hora_cierre': '14:00:00'},
+]
+MENUS = [
+    {'id_tiendita': 1, 'nombre': 'Torta Cubana', 'precio': 70},
+    {'id_tiendita': 1, 'nombre': 'Burrito', 'precio': 30},
+    {'id_tiendita': 2, 'nombre': 'Torta de Pierna', 'precio': 60},
+    {'id_tiendita': 2, 'nombre': 'Pizza', 'precio': 35},
+    {'id_tiendita': 3, 'nombre': 'Mollete', 'precio': 30},
+    {'id_tiendita': 4, 'nombre': 'Agua', 'precio': 15},
+    {'id_tiendita': 5, 'nombre': 'Paleta', 'precio': 5},
+]
+# Junto a Artes
+LAT, LON = 29.080, -110.960
+
+
+class FastPathTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        data = {'tienditas': TIENDITAS, 'menus': MENUS}
+        cls.router = FastPathRouter(data, GeoIndex.from_records(TIENDITAS))
+
+    def test_cheapest_is_campus_wide_even_with_location(self):
+        answer = self.router.answer('¿Qué es lo más barato?', lat=LAT, lon=LON)
+        self.assertTrue(answer.startswith('Lo más barato:'))
+        self.assertIn('Cafeteria Economia: Paleta ($5)', answer)
+
+    def test_cheapest_nearby_only_when_asked(self):
+        answer = self.router.answer('¿Qué es lo más barato cerca de aquí?', lat=LAT, lon=LON)
+        self.assertNotIn('Economia', answer)
+        self.assertNotIn('Geologia', answer)
+        self.assertIn('Cafeteria Artes: Burrito ($30)', answer)
+
+    def test_location_alias_narrows_to_that_place(self):
+        # El motor pasa el alias que encontró en el texto y sus coordenadas
+        answer = self.router.answer('lo más barato en economía', lat=29.120, lon=-110.960, location='economia')
+        self.assertNotIn('Artes', answer)
+        self.assertIn('Cafeteria Economia: Paleta ($5)', answer)
+
+    def test_hours_nearby_only_when_asked(self):
+        self.assertIsNone(self.router.answer('¿A qué hora cierran?', lat=LAT, lon=LON))
+        answer = self.router.answer('¿A qué hora cierran las cafeterías cercanas?', lat=LAT, lon=LON)
+        self.assertIn('Cafeteria Artes: 07:00 - 15:00', answer)
+        self.assertNotIn('Economia', answer)
+
+    def test_known_forms_are_answered(self):
+        answer = self.router.answer('¿Cuánto cuesta la torta cubana en Artes?')
+        self.assertEqual(answer, 'Torta Cubana está en:\n• Cafeteria Artes: Torta Cubana ($70)')
+        answer = self.router.answer('¿Qué puedo comer con 30 pesos?', budget=30)
+        self.assertTrue(answer.startswith('Lo más barato con $30:'))
+        self.assertNotIn('Pizza', answer)
+
+    def test_uncovered_words_go_to_the_llm(self):
+        for question in ['horario de las cafeterías que venden pizza',
+                         'lo más barato y saludable',
+                         '¿el horario de artes es bueno? ¿y qué venden?',
+                         '¿Cuánto cuesta la torta cubana y qué tan grande es?']:
+            with self.subTest(question=question):
+                self.assertIsNone(self.router.answer(question, lat=LAT, lon=LON))
+
+    def test_history_goes_to_the_llm(self):
+        self.assertIsNotNone(self.router.answer('¿Qué es lo más barato?'))
+        self.assertIsNone(self.router.answer('¿Qué es lo más barato?', has_history=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import threading
+import unittest
+
+from generation_scheduler import GenerationScheduler
+
+
+class GenerationSchedulerTests(unittest.TestCase):
+    def scheduler(self, generate_batch, **kwargs):
+        scheduler = GenerationScheduler(generate_batch, **kwargs)
+        self.addCleanup(scheduler.shutdown)
+        return scheduler
+
+    def submit_together(self, scheduler, prompts):
+        """Encola los prompts dentro de la misma ventana y devuelve sus futures en orden."""
+        futures = [None] * len(prompts)
+        barrier = threading.Barrier(len(prompts))
+
+        def submit(i):
+            barrier.wait()
+            futures[i] = scheduler.submit(prompts[i])
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(prompts))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return futures
+
+    def test_requests_in_the_window_share_a_batch(self):
+        calls = []
+
+        def generate_batch(prompts):
+            calls.append(list(prompts))
+            return [p.upper() for p in prompts]
+
+        scheduler = self.scheduler(generate_batch, max_batch_size=8, max_wait_ms=200)
+        futures = self.submit_together(scheduler, ['tacos', 'tortas', 'agua'])
+        for prompt, future in zip(['tacos', 'tortas', 'agua'], futures):
+            self.assertEqual(future.result(timeout=5), prompt.upper())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(scheduler.stats()['batch_size_histogram'], {3: 1})
+
+    def test_batch_size_is_capped(self):
+        scheduler = self.scheduler(lambda prompts: list(prompts), max_batch_size=2, max_wait_ms=200)
+        futures = self.submit_together(scheduler, ['a', 'b', 'c'])
+        self.assertEqual([f.result(timeout=5) for f in futures], ['a', 'b', 'c'])
+        self.assertEqual(scheduler.stats()['batch_size_histogram'], {1: 1, 2: 1})
+
+    def test_missing_answers_fail_every_request(self):
+        # Menos respuestas que prompts: ningún future debe quedarse esperando ni recibir la respuesta de otro
+        scheduler = self.scheduler(lambda prompts: list(prompts)[:-1], max_batch_size=8, max_wait_ms=200)
+        futures = self.submit_together(scheduler, ['a', 'b', 'c'])
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, '2 respuestas para 3 prompts'):
+                future.result(timeout=5)
+        self.assertEqual(scheduler.stats()['requests'], 0)
+
+    def test_errors_reach_every_request(self):
+        def generate_batch(prompts):
+            raise RuntimeError("OOM simulado")
+
+        scheduler = self.scheduler(generate_batch, max_wait_ms=200)
+        futures = self.submit_together(scheduler, ['a', 'b'])
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, "OOM simulado"):
+                future.result(timeout=5)
+
+    def test_streams_are_passed_only_when_present(self):
+        seen = []
+
+        def generate_batch(prompts, streams=None):
+            seen.append(streams)
+            return list(prompts)
+
+        scheduler = self.scheduler(generate_batch, max_wait_ms=0)
+        scheduler.submit('a').result(timeout=5)
+        stop = threading.Event()
+        streamer = object()
+        scheduler.submit('b', streamer=streamer, stop=stop).result(timeout=5)
+        self.assertEqual(seen, [None, [(streamer, stop)]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+from location_matcher import LocationMatcher
+
+PLACES = [
+    {'name': 'Bellas Artes', 'lat': 29.0816, 'lon': -110.9590, 'aliases': ['artes', 'bellas artes', 'diseño']},
+    {'name': 'Ciencias Exactas', 'lat': 29.0815, 'lon': -110.9610, 'aliases': ['matemáticas', 'mates']},
+    {'name': 'Servicio Social', 'lat': 29.0800, 'lon': -110.9600, 'aliases': ['servicio social']},
+]
+
+
+class LocationMatcherTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.matcher = LocationMatcher(PLACES, exclude=['caborca'])
+
+    def test_accent_and_case_insensitive(self):
+        self.assertEqual(self.matcher.match('¿Qué venden en MATEMATICAS?')['place'], 'Ciencias Exactas')
+        self.assertEqual(self.matcher.match('algo barato por diseno')['place'], 'Bellas Artes')
+
+    def test_longest_match_wins(self):
+        found = self.matcher.find_all('cerca de bellas artes')
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0][2]['alias'], 'bellas artes')
+
+    def test_whole_words_only(self):
+        self.assertIsNone(self.matcher.match('quiero un mate'))
+        self.assertIsNone(self.matcher.match('servicio rápido'))
+
+    def test_first_location_wins(self):
+        self.assertEqual(self.matcher.match('entre mates y artes')['place'], 'Ciencias Exactas')
+
+    def test_other_campus_disables_the_match(self):
+        self.assertIsNone(self.matcher.match('cafeterías de artes en caborca'))
+
+    def test_size_counts_aliases_only(self):
+        self.assertEqual(len(self.matcher), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from datetime import time
+
+from opening_hours import OpeningHoursIndex, asks_open_now, parse_time
+
+TIENDITAS = [
+    {'id_tiendita': 1, 'hora_apertura': '07:00:00', 'hora_cierre': '15:00:00'},
+    # Pasa la medianoche
+    {'id_tiendita': 2, 'hora_apertura': '20:00', 'hora_cierre': '02:00'},
+    # Apertura igual a cierre: todo el día
+    {'id_tiendita': 3, 'hora_apertura': '00:00', 'hora_cierre': '00:00'},
+    {'id_tiendita': 4, 'hora_apertura': None, 'hora_cierre': '15:00'},
+]
+
+
+class OpeningHoursTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.index = OpeningHoursIndex(TIENDITAS)
+
+    def test_after_midnight_hours_split_in_two(self):
+        self.assertEqual(self.index.open_at(time(23, 30)), {2, 3})
+        self.assertEqual(self.index.open_at(time(1, 59)), {2, 3})
+        self.assertEqual(self.index.open_at(time(2, 0)), {3})
+        self.assertEqual(self.index.open_at(time(19, 59)), {3})
+
+    def test_boundaries_are_half_open(self):
+        self.assertTrue(self.index.is_open(1, time(7, 0)))
+        self.assertFalse(self.index.is_open(1, time(15, 0)))
+
+    def test_unknown_hours_are_never_closed(self):
+        self.assertIsNone(self.index.is_open(4, time(12, 0)))
+        self.assertEqual(self.index.closed_at(time(3, 0)), {1, 2})
+
+    def test_parse_time(self):
+        self.assertEqual(parse_time('7:05:00'), 425)
+        self.assertEqual(parse_time('24:00'), 0)
+        self.assertIsNone(parse_time('25:00'))
+        self.assertIsNone(parse_time('cerrado'))
+
+    def test_asks_open_now(self):
+        self.assertTrue(asks_open_now('¿Qué está ABIERTO ahorita?'))
+        self.assertTrue(asks_open_now('¿aún venden tacos?'))
+        self.assertFalse(asks_open_now('¿A qué hora cierran?'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import socket
+import threading
+import time
+import unittest
+
+from rag_client import RAGClient, RAGServerError
+
+
+class FakeServer:
+    """
+    Servidor HTTP mínimo sobre sockets: anota cada petición recibida.
+    drop=True cierra la conexión sin responder; si no, responde y cierra el keep-alive poco después.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.drop = False
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen()
+        self.address = f"http://127.0.0.1:{self.sock.getsockname()[1]}"
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn, conn.makefile('rb') as f:
+            line = f.readline()
+            if not line:
+                return
+            length = 0
+            while True:
+                header = f.readline()
+                if header in (b'\r\n', b''):
+                    break
+                if header.lower().startswith(b'content-length'):
+                    length = int(header.split(b':')[1])
+            f.read(length)
+            self.requests.append(line.split()[0].decode())
+            if self.drop:
+                return
+            body = b'{"ok": true}'
+            conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body))
+            time.sleep(0.05)
+
+    def close(self):
+        self.sock.close()
+
+
+class RAGClientRetryTests(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeServer()
+        self.addCleanup(self.server.close)
+        self.client = RAGClient(self.server.address, timeout=5)
+
+    def test_closed_keep_alive_is_reopened_before_sending(self):
+        self.assertEqual(self.client._json('POST', '/changes', {'a': 1}), {'ok': True})
+        time.sleep(0.2)  # el servidor ya cerró la conexión inactiva
+        self.assertEqual(self.client._json('POST', '/changes', {'a': 2}), {'ok': True})
+        self.assertEqual(self.server.requests, ['POST', 'POST'])
+
+    def test_sent_post_is_not_repeated(self):
+        self.server.drop = True
+        with self.assertRaises(RAGServerError):
+            self.client._json('POST', '/query', {'question': 'tacos'})
+        self.assertEqual(self.server.requests, ['POST'])
+
+    def test_sent_get_is_retried_once(self):
+        self.server.drop = True
+        with self.assertRaises(RAGServerError):
+            self.client._json('GET', '/health')
+        self.assertEqual(self.server.requests, ['GET', 'GET'])
+
+    def test_unreachable_server(self):
+        # Puerto reservado pero sin listen(): la conexión se rechaza
+        with socket.socket() as closed:
+            closed.bind(('127.0.0.1', 0))
+            client = RAGClient(f"http://127.0.0.1:{closed.getsockname()[1]}")
+            with self.assertRaisesRegex(RAGServerError, 'no disponible'):
+                client.health()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Streaming con micro-batching: la consulta en streaming entra al mismo batch que las demás.
+Usa un modelo Qwen2 diminuto con pesos aleatorios y un tokenizer en memoria (no descarga nada).
+"""
+
+import threading
+import unittest
+
+try:
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import PreTrainedTokenizerFast, Qwen2Config, Qwen2ForCausalLM
+
+    import rag_engine_hpc
+    from context_packer import ContextPacker
+    from generation_scheduler import GenerationScheduler
+    from stage_timer import StageTimer
+except ImportError:  # pragma: no cover - depende del entorno
+    rag_engine_hpc = None
+
+WORDS = ['torta', 'cubana', 'mollete', 'frijol', 'agua', 'fresca', 'con', 'de', 'en', 'artes', 'derecho']
+
+
+def tiny_engine(max_new_tokens=8):
+    """BuhoRAG sin cargar datos ni modelos reales: solo lo que usa la generación."""
+    vocab = {'<|endoftext|>': 0, '<|im_end|>': 1, **{w: i + 2 for i, w in enumerate(WORDS)}}
+    backend = Tokenizer(models.WordLevel(vocab, unk_token='<|endoftext|>'))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, pad_token='<|endoftext|>', eos_token='<|im_end|>')
+    tokenizer.padding_side = 'left'
+
+    torch.manual_seed(0)
+    config = Qwen2Config(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=1, num_attention_heads=2,
+                         num_key_value_heads=1, intermediate_size=64, eos_token_id=1, pad_token_id=0)
+    model = Qwen2ForCausalLM(config).eval()
+
+    rag = rag_engine_hpc.BuhoRAG.__new__(rag_engine_hpc.BuhoRAG)
+    rag.tokenizer, rag.llm_model = tokenizer, model
+    rag.generation_kwargs = {'max_new_tokens': max_new_tokens, 'do_sample': False}
+    rag.stream_timeout = 30
+    rag.context_packer = ContextPacker(tokenizer)
+    rag._prepare_query = lambda question, lat, lon, session_id: {'prompt': question, 'timer': StageTimer()}
+    rag._finish_query = lambda question, answer, prepared, session_id: {'answer': answer}
+    return rag
+
+
+@unittest.skipIf(rag_engine_hpc is None, "torch/transformers no disponibles")
+class StreamWithBatchingTests(unittest.TestCase):
+    def setUp(self):
+        self.rag = tiny_engine()
+        self.rag.scheduler = GenerationScheduler(self.rag.generate_batch, max_batch_size=8, max_wait_ms=200)
+        self.addCleanup(self.rag.scheduler.shutdown)
+
+        self.generate_calls = []
+        generate = self.rag.llm_model.generate
+
+        def counting_generate(*args, **kwargs):
+            self.generate_calls.append(kwargs['input_ids'].shape[0])
+            return generate(*args, **kwargs)
+
+        self.rag.llm_model.generate = counting_generate
+
+    def test_stream_and_batched_queries_share_one_generate(self):
+        prompts = ['torta cubana con', 'mollete de frijol', 'agua fresca']
+        answers = {}
+
+        def batched(prompt):
+            answers[prompt] = self.rag.scheduler.submit(prompt).result(timeout=30)
+
+        threads = [threading.Thread(target=batched, args=(p,)) for p in prompts[1:]]
+        for thread in threads:
+            thread.start()
+        events = list(self.rag.query_stream(prompts[0]))
+        for thread in threads:
+            thread.join(timeout=30)
+
+        # Un solo generate() para las tres consultas, y el streaming cuenta en las estadísticas
+        self.assertEqual(self.generate_calls, [3])
+        self.assertEqual(self.rag.scheduler.stats()['batch_size_histogram'], {3: 1})
+
+        streamed = ''.join(event['text'] for event in events if event['type'] == 'token')
+        self.assertEqual(events[-1]['type'], 'done')
+        self.assertTrue(streamed)
+        self.assertEqual(streamed, events[-1]['answer'])
+
+        expected = self.rag.generate_batch(prompts)
+        self.assertEqual(events[-1]['answer'], expected[0].strip())
+        self.assertEqual([answers[p] for p in prompts[1:]], expected[1:])
+
+    def test_batch_failure_reaches_the_stream(self):
+        def failing_generate(*args, **kwargs):
+            raise RuntimeError("OOM simulado")
+
+        self.rag.llm_model.generate = failing_generate
+        with self.assertRaisesRegex(RuntimeError, "OOM simulado"):
+            list(self.rag.query_stream('torta cubana'))
+
+
+if __name__ == '__main__':
+    unittest.main()